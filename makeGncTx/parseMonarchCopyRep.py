@@ -10,14 +10,21 @@
 __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __created__ = '2019-06-22'
-__updated__ = '2020-09-17'
+__updated__ = '2020-09-18'
 
 from sys import path, argv, exc_info
 import re
+import os.path as osp
+from queue import Queue
+from logging.handlers import QueueHandler, QueueListener
 from argparse import ArgumentParser
 path.append('/newdata/dev/git/Python/Gnucash/updateBudgetQtrly')
 # print(path)
 from gnucash_utilities import *
+path.append(osp.join(osp.dirname(osp.abspath(__file__)), 'src'))
+from Configuration import LogSummary
+from perfMetrics import *
+from perfProfile import *
 
 base_run_file = get_base_filename(__file__)
 print(base_run_file)
@@ -25,8 +32,9 @@ print(base_run_file)
 
 # TODO: use investment.TxRecord instead of dicts to store Monarch & Gnucash information?
 class ParseMonarchCopyReport:
-    def __init__(self, p_monfile:str, p_lgr:lg.Logger):
+    def __init__(self, p_monfile:str, p_lgr:lg.Logger, p_metrics:PerfMetrics=None):
         self.mon_file = p_monfile
+        self.metrics = p_metrics if p_metrics is not None else PerfMetrics(base_run_file)
         self._monarch_txs = InvestmentRecord(p_lgr)
         self._gnucash_txs = InvestmentRecord(p_lgr)
 
@@ -69,6 +77,7 @@ class ParseMonarchCopyReport:
         mon_state = FIND_DATE
         plan_type = UNKNOWN
         plan_id = UNKNOWN
+        num_prices = num_trades = 0
         with open(self.mon_file) as mfp:
             ct = 0
             for line in mfp:
@@ -81,7 +90,7 @@ class ParseMonarchCopyReport:
                     re_match = re.match(re_date, words[0])
                     if re_match:
                         doc_date = re_match.group(1)
-                        self._lgr.debug(F"Document date: {doc_date}")
+                        self._lgr.debug("Document date: %s", doc_date)
                         mon_state = FIND_OWNER
                         continue
 
@@ -89,7 +98,7 @@ class ParseMonarchCopyReport:
                     if words[0] == OPEN:
                         owner = MON_MARK if MON_ROBB in words else MON_LULU
                         self._monarch_txs.set_owner(owner)
-                        self._lgr.debug(F"\n\t\u0022Current owner: {owner}\u0022")
+                        self._lgr.debug("\n\t\u0022Current owner: %s\u0022", owner)
                         mon_state = STATE_SEARCH
                         continue
 
@@ -98,7 +107,7 @@ class ParseMonarchCopyReport:
                         if word in PLAN_IDS:
                             plan_type = PLAN_IDS[word][0]
                             plan_id = word
-                            self._lgr.debug(F"\n\t\t\u0022Current plan: type = {plan_type} ; id = {plan_id}\u0022")
+                            self._lgr.debug("\n\t\t\u0022Current plan: type = %s ; id = %s\u0022", plan_type, plan_id)
                             continue
 
                 if mon_state == STATE_SEARCH:
@@ -111,7 +120,7 @@ class ParseMonarchCopyReport:
                     # NOTE: price lines start with a fund name and have enough words to match the accounts header
                     if len(words) >= 11:
                         fd_cpy = words[0]
-                        self._lgr.debug(F"FOUND a NEW Price: {fd_cpy}")
+                        self._lgr.debug("FOUND a NEW Price: %s", fd_cpy)
                         fund = words[-11]
                         if '-' in fund:
                             fund = fund.replace('-', ' ')
@@ -125,7 +134,8 @@ class ParseMonarchCopyReport:
                             raise Exception(F"Did NOT find proper price: {price}!")
                         curr_tx = { DATE:doc_date, DESC:PRICE, FUND_CMPY:fd_cpy, FUND:fund, UNIT_BAL:bal, PRICE:price }
                         self._monarch_txs.add_tx(plan_type, PRICE, curr_tx)
-                        self._lgr.debug(F"ADD current Price Tx:\n\t{curr_tx}")
+                        num_prices += 1
+                        self._lgr.debug("ADD current Price Tx:\n\t%s", curr_tx)
                     continue
 
                 # TRADES
@@ -133,7 +143,7 @@ class ParseMonarchCopyReport:
                 # NOTE: trade lines start with a date and have enough words to match the tx header
                 if re_match and len(words) >= 8:
                     tx_date = re_match.group(1)
-                    self._lgr.debug(F"FOUND a NEW Tx! Date: {tx_date}")
+                    self._lgr.debug("FOUND a NEW Tx! Date: %s", tx_date)
                     fund_cpy = words[-8]
                     if fund_cpy not in FUND_NAME_CODE.values():
                         raise Exception(F"Did NOT find proper Fund company: {fund_cpy}!")
@@ -170,7 +180,12 @@ class ParseMonarchCopyReport:
                         raise Exception(F"Did NOT find proper Load: {curr_tx[LOAD]}!")
 
                     self._monarch_txs.add_tx(plan_type, TRADE, curr_tx)
-                    self._lgr.debug(F"ADD current Trade Tx:\n\t{curr_tx}")
+                    num_trades += 1
+                    self._lgr.debug("ADD current Trade Tx:\n\t%s", curr_tx)
+
+        self.metrics.count(LINES, ct)
+        self.metrics.count(PRICES, num_prices)
+        self.metrics.count(TRADES, num_trades)
 
     def get_trade_info(self, mon_tx:dict, plan_type:str, ast_parent:Account, rev_acct:Account) -> (dict,dict):
         """
@@ -190,7 +205,8 @@ class ParseMonarchCopyReport:
         :param   rev_acct: Revenue account
         :return: one trade tx or both txs of a switch, if available
         """
-        self._lgr.debug(F"plan type = {plan_type}, asset parent = {ast_parent.GetName()}")
+        if self._lgr.isEnabledFor(lg.DEBUG):
+            self._lgr.debug("plan type = %s, asset parent = %s", plan_type, ast_parent.GetName())
 
         # set the regex needed to match the required groups in each value
         # NOTE: re_dollars must match (leading minus sign) OR (amount is in parentheses) to indicate NEGATIVE number
@@ -205,13 +221,15 @@ class ParseMonarchCopyReport:
             trust_acct = TRUST_REV_ACCT if mon_tx[TYPE] == TX_TYPES[REINV] else TRUST_EQY_ACCT
             rev_acct = self.gnc_session.get_account(trust_acct)
 
-        self._lgr.debug(F"get_trade_info(): asset account = {asset_acct.GetName()}; revenue account = {rev_acct.GetName()}")
+        if self._lgr.isEnabledFor(lg.DEBUG):
+            self._lgr.debug("get_trade_info(): asset account = %s; revenue account = %s",
+                            asset_acct.GetName(), rev_acct.GetName())
 
         # get required date fields
         conv_date = dt.strptime(mon_tx[TRADE_DATE], "%d-%b-%Y")
         init_tx = { FUND:fund_name, ACCT:asset_acct, REV:rev_acct, TRADE_DATE:mon_tx[TRADE_DATE],
                     TRADE_DAY:conv_date.day, TRADE_MTH:conv_date.month, TRADE_YR:conv_date.year }
-        self._lgr.debug(F"trade day-month-year = {init_tx[TRADE_DAY]}-{init_tx[TRADE_MTH]}-{init_tx[TRADE_YR]}")
+        self._lgr.debug("trade day-month-year = %s-%s-%s", init_tx[TRADE_DAY], init_tx[TRADE_MTH], init_tx[TRADE_YR])
 
         # different accounts depending if Switch, Redemption, Purchase, Distribution
         init_tx[TYPE] = mon_tx[TYPE]
@@ -226,7 +244,7 @@ class ParseMonarchCopyReport:
             # if match group 1 is not empty, amount is negative
             if re_match.group(1):
                 gross_amt *= -1
-            self._lgr.debug(F"gross amount = {gross_amt}")
+            self._lgr.debug("gross amount = %s", gross_amt)
             init_tx[GROSS] = gross_amt
         else:
             raise Exception(F"PROBLEM: gross amount DID NOT match with value: {mon_tx[GROSS]}!")
@@ -240,7 +258,7 @@ class ParseMonarchCopyReport:
             # if match group 1 is not empty, amount is negative
             if re_match.group(1):
                 net_amount *= -1
-            self._lgr.debug(F"net_amount = {net_amount}")
+            self._lgr.debug("net_amount = %s", net_amount)
             init_tx[NET] = net_amount
         else:
             raise Exception(F"PROBLEM: net amount DID NOT match with value: {mon_tx[NET]}!")
@@ -252,7 +270,7 @@ class ParseMonarchCopyReport:
             # if match group 1 is not empty, units is negative
             if re_match.group(1):
                 units *= -1
-            self._lgr.debug(F"units = {units}")
+            self._lgr.debug("units = %s", units)
             init_tx[UNITS] = units
         else:
             raise Exception(F"PROBLEM: units DID NOT match with value: {mon_tx[UNITS]}!")
@@ -260,12 +278,12 @@ class ParseMonarchCopyReport:
         # assemble the Description string
         descr = "{} {}".format(mon_tx[DESC], fund_name)
         init_tx[DESC] = descr
-        self._lgr.debug(F"descr = {init_tx[DESC]}")
+        self._lgr.debug("descr = %s", init_tx[DESC])
 
         # notes field
         notes = mon_tx[NOTES] if NOTES in mon_tx else F"Load = {mon_tx[LOAD]}"
         init_tx[NOTES] = notes
-        self._lgr.debug(F"notes = {init_tx[NOTES]}")
+        self._lgr.debug("notes = %s", init_tx[NOTES])
 
         pair_tx = None
         have_pair = False
@@ -278,6 +296,7 @@ class ParseMonarchCopyReport:
                     # FOUND THE FIRST ITEM IN THIS PAIR
                     have_pair = True
                     pair_tx = gnc_tx
+                    self.metrics.count(PAIRS)
                     self._lgr.debug('*** Found the MATCH of a Switch pair ***')
                     break
 
@@ -297,7 +316,8 @@ class ParseMonarchCopyReport:
         :param ast_parent: Asset parent account
         :param    p_owner: str name
         """
-        self._lgr.debug(F"plan type = {plan_type}, asset parent = {ast_parent.GetName()}, owner = {p_owner}")
+        if self._lgr.isEnabledFor(lg.DEBUG):
+            self._lgr.debug("plan type = %s, asset parent = %s, owner = %s", plan_type, ast_parent.GetName(), p_owner)
         try:
             rev_acct = self.gnc_session.get_revenue_account(plan_type, p_owner)
 
@@ -310,6 +330,7 @@ class ParseMonarchCopyReport:
 
             # use the Gnucash API to create Transactions and save to a Gnucash file
             self.gnc_session.create_trade_tx(tx1, tx2)
+            self.metrics.count(TRADES_CREATED)
 
         except Exception as pmte:
             pmte_msg = F"EXCEPTION: {repr(pmte)}!\n"
@@ -326,7 +347,7 @@ class ParseMonarchCopyReport:
         """
         self._lgr.info('\n\t\t' + get_current_time())
         for iplan in self._monarch_txs.get_plans():
-            self._lgr.debug(F"plan type = {repr(iplan)}")
+            self._lgr.debug("plan type = %r", iplan)
             plan = self._monarch_txs.get_plan(iplan)
             for tx in plan[PRICE]:
                 indx = 0
@@ -337,7 +358,7 @@ class ParseMonarchCopyReport:
                         trd_date = dt.strptime(trd[TRADE_DATE], '%d-%b-%Y')
                         if latest_dte is None or trd_date > latest_dte:
                             latest_dte = trd_date
-                            self._lgr.debug(F"Latest date for {tx[FUND]} = {latest_dte}")
+                            self._lgr.debug("Latest date for %s = %s", tx[FUND], latest_dte)
                             latest_indx = indx
                     indx += 1
                 if latest_indx > -1:
@@ -355,11 +376,14 @@ class ParseMonarchCopyReport:
         msg = saved_log_info
         try:
             owner = self._monarch_txs.get_owner()
-            self._lgr.debug(F"Owner = {owner}")
+            self._lgr.debug("Owner = %s", owner)
 
-            self.gnc_session.begin_session()
-            self.create_gnucash_info(owner)
-            self.gnc_session.end_session()
+            with self.metrics.stage('open session'):
+                self.gnc_session.begin_session()
+            with self.metrics.stage('create gnucash info'):
+                self.create_gnucash_info(owner)
+            with self.metrics.stage('save session'):
+                self.gnc_session.end_session()
 
         except Exception as itgfe:
             sgfe_msg = F"EXCEPTION: {repr(itgfe)}!"
@@ -376,10 +400,10 @@ class ParseMonarchCopyReport:
         domain = self.gnc_session.get_domain()
         plans = self._monarch_txs.get_plans()
         for plan_type in plans:
-            self._lgr.debug(F"\n\n\t\t\u0022Plan type = {plan_type}\u0022")
+            self._lgr.debug("\n\n\t\t\u0022Plan type = %s\u0022", plan_type)
 
             asset_parent = self.gnc_session.get_asset_account(plan_type, p_owner)
-            self._lgr.debug(F"create_gnucash_info(): asset parent = {asset_parent.GetName()}")
+            self._lgr.debug("create_gnucash_info(): asset parent = %s", asset_parent.GetName())
 
             if domain in (TRADE,BOTH):
                 for mon_tx in plans[plan_type][TRADE]:
@@ -388,6 +412,7 @@ class ParseMonarchCopyReport:
             if domain in (PRICE,BOTH):
                 for mon_tx in plans[plan_type][PRICE]:
                     self.gnc_session.create_price(mon_tx, asset_parent)
+                self.metrics.count(PRICES_CREATED, len(plans[plan_type][PRICE]))
 
 # END class ParseMonarchCopyReport
 
@@ -407,21 +432,27 @@ def process_args():
     # optional arguments
     arg_parser.add_argument('-l', '--level', type=int, default=lg.INFO, help='set LEVEL of logging output')
     arg_parser.add_argument('--json',  action='store_true', help='Write the parsed Monarch data to a JSON file')
+    arg_parser.add_argument(METRICS_OPTION, help='save the time and counts of each stage to this JSON file')
+    arg_parser.add_argument(MEMORY_OPTION, action='store_true',
+                            help='trace memory: peak and top allocation sites of each stage, in the metrics')
+    # handled by the profiled decorator, listed here for the help
+    arg_parser.add_argument(PROFILE_OPTION, action='store_true', help='run under cProfile and save the .pstats file')
+    arg_parser.add_argument(PROFILE_TOP_OPTION, type=int, metavar='N', help='profile and print the N hottest functions')
 
     return arg_parser
 
 
 def process_input_parameters(argx:list, lgr:lg.Logger):
     args = process_args().parse_args(argx)
-    lgr.debug(F"\n\targs = {args}")
+    lgr.debug("\n\targs = %s", args)
 
-    lgr.info(F"logger level set to {args.level}")
+    lgr.info("logger level set to %s", args.level)
 
     if not osp.isfile(args.monarch):
         msg = F"File path '{args.monarch}' does not exist! Exiting..."
         lgr.error(msg)
         raise Exception(msg)
-    lgr.info(F"\n\tMonarch file = {args.monarch}")
+    lgr.info("\n\tMonarch file = %s", args.monarch)
 
     mode = TEST
     domain = BOTH
@@ -432,34 +463,74 @@ def process_input_parameters(argx:list, lgr:lg.Logger):
             lgr.error(msg)
             raise Exception(msg)
         gnc_file = args.filename
-        lgr.info(F"\n\tGnucash file = {gnc_file}")
+        lgr.info("\n\tGnucash file = %s", gnc_file)
         mode = SEND
         domain = args.type
-        lgr.info(F"Inserting '{domain}' transaction types to Gnucash.")
-
-    return args.monarch, args.json, args.level, mode, gnc_file, domain
-
-
-def mon_copy_rep_main(args:list) -> list:
+        lgr.info("Inserting '%s' transaction types to Gnucash.", domain)
+
+    return args.monarch, args.json, args.level, mode, gnc_file, domain, args.metrics, args.trace_memory
+
+
+def start_queue_logging(lgr:lg.Logger) -> QueueListener:
+    """
+    move the handlers of lgr behind a QueueHandler: enabled records are still formatted in this thread,
+    so mutable arguments are captured as they are now, but the handlers write to disk on the listener thread
+    :return: the running listener, or None if lgr has no handlers of its own
+    """
+    handlers = lgr.handlers[:]
+    if not handlers:
+        return None
+    for hdlr in handlers:
+        lgr.removeHandler(hdlr)
+    log_queue = Queue(-1)
+    lgr.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_queue_logging(lgr:lg.Logger, listener:QueueListener):
+    """
+    write out everything still queued and give the handlers back to lgr, e.g. before finish_logging() moves the log
+    """
+    if listener is None:
+        return
+    listener.stop()
+    for hdlr in lgr.handlers[:]:
+        if isinstance(hdlr, QueueHandler):
+            lgr.removeHandler(hdlr)
+    for hdlr in listener.handlers:
+        lgr.addHandler(hdlr)
+
+
+@profiled(base_run_file)
+def mon_copy_rep_main(args:list) -> dict:
+    """
+    :return: summary of the run log: counts, first and last messages -- NOT every message
+    """
     lgr = get_logger(base_run_file)
 
-    mon_file, save_monarch, level, mode, gnc_file, domain = process_input_parameters(args, lgr)
+    mon_file, save_monarch, level, mode, gnc_file, domain, metrics_file, trace_memory = process_input_parameters(args, lgr)
+    metrics = PerfMetrics(base_run_file, trace_memory)
 
     # construct log name from monarch file name
     _, fname = osp.split(mon_file)
     basename, _ = osp.splitext(fname)
 
     lgr.setLevel(level)
-    lgr.info(F"\n\t\tRuntime = {get_current_time()}")
-    lgr.debug(str(lgr.handlers))
+    lgr.info("\n\t\tRuntime = %s", get_current_time())
+    lgr.debug('%s', lgr.handlers)
+    listener = start_queue_logging(lgr)
 
     gnc_session = None
     try:
         # parse an external Monarch COPIED report file
-        parser = ParseMonarchCopyReport(mon_file, lgr)
+        parser = ParseMonarchCopyReport(mon_file, lgr, metrics)
 
-        parser.parse_report_info()
-        parser.add_balance_to_trade()
+        with metrics.stage('parse report info'):
+            parser.parse_report_info()
+        with metrics.stage('add balance to trade'):
+            parser.add_balance_to_trade()
 
         parser.set_filename(mon_file)
 
@@ -469,25 +540,36 @@ def mon_copy_rep_main(args:list) -> list:
             gname, _ = osp.splitext(fname)
             basename += '_' + gname
 
-            gnc_session = GnucashSession(mode, gnc_file, domain, lgr)
+            with metrics.stage('create session'):
+                gnc_session = GnucashSession(mode, gnc_file, domain, lgr)
             parser.insert_txs_to_gnucash_file(gnc_session)
 
         msg = saved_log_info
 
         if save_monarch:
-            out_file = save_to_json(basename, parser.get_monarch_record().to_json(), get_current_time(FILE_DATETIME_FORMAT))
-            lgr.info(F"Created Monarch JSON file: {out_file}")
+            with metrics.stage('save json'):
+                out_file = save_to_json(basename, parser.get_monarch_record().to_json(),
+                                        get_current_time(FILE_DATETIME_FORMAT))
+            lgr.info("Created Monarch JSON file: %s", out_file)
 
     except Exception as mcre:
         mcre_msg = repr(mcre)
         lgr.error(mcre_msg)
         msg = [mcre_msg]
         if gnc_session:
+            metrics.count(ROLLBACKS)
             gnc_session.end_session(False)
 
+    metrics.finish()
+    for line in metrics.report():
+        lgr.info(line)
+    if metrics_file:
+        lgr.info("Saved metrics to: %s", metrics.save(metrics_file))
+
     lgr.warning('\n >>> PROGRAM ENDED.')
+    stop_queue_logging(lgr, listener)
     finish_logging(base_run_file, basename, get_current_time(FILE_DATETIME_FORMAT), sfx='gncout')
-    return msg
+    return LogSummary.from_lines(msg).to_json()
 
 
 if __name__ == '__main__':
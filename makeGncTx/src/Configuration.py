@@ -10,17 +10,28 @@ __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __python_version__ = 3.6
 __created__ = '2018'
-__updated__ = '2019-07-27'
+__updated__ = '2019-08-27'
 
+import os
+import sys
 import json
-import inspect
 import os.path as osp
+from collections import deque
+from contextlib import contextmanager
+from logging import makeLogRecord
+from logging.handlers import RotatingFileHandler
 from datetime import datetime as dt
 
 DATE_STR_FORMAT = "\u0023%Y-%m-%d\u0025\u0025%H-%M-%S"
 dtnow = dt.now()
 strnow = dtnow.strftime(DATE_STR_FORMAT)
 
+# option for the entry points that save a record: indented JSON instead of compact
+PRETTY_OPTION: str = '--pretty'
+JSON_INDENT: int = 4
+# option for the entry points that load a record: read the txs one at a time instead of loading the whole file
+STREAM_OPTION: str = '--stream'
+
 # constant strings
 TEST: str = 'test'
 PROD: str = 'PROD'
@@ -84,6 +95,17 @@ INTRF_OUT: str  = INTRF + "-Out"
 REINV: str      = 'Reinvested'
 INTRCL: str     = 'Inter-Class'
 
+# credit card and bank statements
+STMT_DATA: str = "Statement Data"
+CARD: str      = "Card"
+CARD_EXP: str  = CARD + " Expense"
+AMOUNT: str    = "Amount"    # integer cents: negative is a charge
+TX_ID: str     = "Tx Id"
+TX_KIND: str   = "Tx Type"
+MEMO: str      = "Memo"
+CURRENCY: str  = "Currency"
+DEF_CURR: str  = "CAD"
+
 COLOR_FLAG:str = '\x1b['
 COLOR_OFF:str = COLOR_FLAG + '0m'
 BLACK:str   = COLOR_FLAG + '30m'
@@ -96,72 +118,241 @@ CYAN:str    = COLOR_FLAG + '36m'
 WHITE:str   = COLOR_FLAG + '37m'
 
 
+# Gnulog levels, same values as the logging module
+LOG_DEBUG: int = 10
+LOG_INFO: int  = 20
+LOG_ERROR: int = 40
+LOG_OFF: int   = 100
+LOG_LEVELS = {'debug': LOG_DEBUG, 'info': LOG_INFO, 'error': LOG_ERROR, 'off': LOG_OFF}
+
+SEPARATOR:str = '==============================================================================================================='
+
+
+LOG_LEVEL_NAMES = {v: k for k, v in LOG_LEVELS.items()}
+# default size of the in-memory session log and number of first/last entries in a summary
+LOG_BUFFER_SIZE: int  = 4096
+LOG_SUMMARY_SIZE: int = 20
+LOG_SPILL_FILE: str   = osp.join(osp.dirname(osp.dirname(osp.abspath(__file__))), 'logs', 'gnulog_spill.log')
+
+
+class LogSummary:
+    """
+    What callers and the UI get back from a session instead of every log message
+    """
+    def __init__(self, p_counts:dict, p_first:list, p_last:list, p_spilled:int=0, p_spill_file:str=None):
+        self.counts = p_counts
+        self.first = p_first
+        self.last = p_last
+        self.spilled = p_spilled
+        self.spill_file = p_spill_file
+
+    @staticmethod
+    def from_lines(lines:list, p_num:int=LOG_SUMMARY_SIZE, p_level:int=LOG_INFO):
+        """
+        summarize a plain list of messages all at one level
+        """
+        return LogSummary({LOG_LEVEL_NAMES[p_level]: len(lines)}, list(lines[:p_num]),
+                          list(lines[max(p_num, len(lines) - p_num):]))
+
+    def get_total(self) -> int:
+        return sum(self.counts.values())
+
+    def to_json(self) -> dict:
+        return {"total": self.get_total(), "counts": self.counts, "spilled": self.spilled,
+                "spill file": self.spill_file, "first": self.first, "last": self.last}
+
+# END class LogSummary
+
+
+class SessionLog:
+    """
+    Bounded ring buffer of (level, text) entries: when it is full the oldest half is appended to a rotating spill file,
+    so memory stays fixed however many messages a session produces
+    """
+    def __init__(self, p_size:int=LOG_BUFFER_SIZE, p_spill_file:str=LOG_SPILL_FILE, p_num:int=LOG_SUMMARY_SIZE,
+                 p_max_bytes:int=8*1024*1024, p_backups:int=3):
+        self.buffer = deque(maxlen=max(p_size, 2))
+        self.first = []
+        self.num = p_num
+        self.counts = {}
+        self.spilled = 0
+        self.spill_file = p_spill_file
+        self.max_bytes = p_max_bytes
+        self.backups = p_backups
+        self.spill_handler = None
+
+    def append(self, text, p_level:int=LOG_INFO):
+        name = LOG_LEVEL_NAMES.get(p_level, str(p_level))
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if len(self.first) < self.num:
+            self.first.append(text)
+        if len(self.buffer) == self.buffer.maxlen:
+            self.spill(len(self.buffer) // 2)
+        self.buffer.append((p_level, text))
+
+    def spill(self, p_count:int):
+        if self.spill_file is None:
+            for _ in range(p_count):
+                self.buffer.popleft()
+            return
+        if self.spill_handler is None:
+            os.makedirs(osp.dirname(self.spill_file), exist_ok=True)
+            self.spill_handler = RotatingFileHandler(self.spill_file, maxBytes=self.max_bytes,
+                                                     backupCount=self.backups, encoding='utf-8')
+        for _ in range(p_count):
+            level, text = self.buffer.popleft()
+            self.spill_handler.emit(makeLogRecord({'msg': text, 'levelno': level}))
+        self.spilled += p_count
+
+    def get_entries(self) -> list:
+        return [text for _, text in self.buffer]
+
+    def get_summary(self) -> LogSummary:
+        last = [text for _, text in list(self.buffer)[-self.num:]]
+        if self.spill_handler is not None:
+            self.spill_handler.flush()
+        return LogSummary(dict(self.counts), list(self.first), last, self.spilled,
+                          self.spill_file if self.spilled else None)
+
+    def close(self):
+        if self.spill_handler is not None:
+            self.spill_handler.close()
+            self.spill_handler = None
+
+# END class SessionLog
+
+
 class Gnulog:
-    def __init__(self, p_debug):
+    """
+    Print with the level checked BEFORE any formatting:
+     - info can be a format string with args, OR a callable returning the text, so nothing is built when disabled
+     - the calling file and line are only looked up for printed messages, and cached for each call site
+    """
+    # level for the module-level print functions and print_text; each Gnulog object has its own level
+    level: int = LOG_INFO
+    # (code object, line number) -> '[file@line]: '
+    call_sites = {}
+
+    def __init__(self, p_debug, p_level:int=None, p_size:int=LOG_BUFFER_SIZE, p_spill_file:str=LOG_SPILL_FILE):
         self.debug = p_debug
-        self.log_text = []
+        self.level = p_level if p_level is not None else (LOG_INFO if p_debug else LOG_OFF)
+        self.log_text = SessionLog(p_size, p_spill_file)
 
-    def append(self, obj):
-        self.log_text.append(obj)
+    def append(self, obj, p_level:int=LOG_INFO):
+        self.log_text.append(obj, p_level)
 
     def clear_log(self):
-        self.log_text = []
+        self.log_text.close()
+        self.log_text = SessionLog(self.log_text.buffer.maxlen, self.log_text.spill_file)
+
+    def get_log(self) -> list:
+        """
+        :return: the most recent messages still in memory
+        """
+        return self.log_text.get_entries()
 
-    def get_log(self):
-        return self.log_text
+    def get_summary(self) -> LogSummary:
+        return self.log_text.get_summary()
 
-    def print_info(self, info, color='', inspector=True, newline=True):
+    def is_enabled(self, p_level:int) -> bool:
+        return p_level >= self.level
+
+    def print_debug(self, info, color='', inspector=True, newline=True, args=None):
+        if LOG_DEBUG >= self.level:
+            self.append(Gnulog.emit(info, color, inspector, newline, args), LOG_DEBUG)
+
+    def print_info(self, info, color='', inspector=True, newline=True, args=None):
         """
         Print information with choices of color, inspection info, newline
         """
-        if self.debug:
-            text = self.print_text(info, color, inspector, newline)
-            self.append(text)
+        if LOG_INFO >= self.level:
+            self.append(Gnulog.emit(info, color, inspector, newline, args))
 
-    def print_error(self, text, newline=True):
+    def print_error(self, text, newline=True, args=None):
         """
         Print Error information in RED with inspection info
         """
-        if self.debug:
-            self.print_text(text, RED, True, newline)
+        if LOG_ERROR >= self.level:
+            self.append(Gnulog.emit(text, RED, True, newline, args), LOG_ERROR)
 
     @staticmethod
-    def print_text(info, color='', inspector=True, newline=True):
+    def set_level(p_level):
         """
-        Print information with choices of color, inspection info, newline
+        :param p_level: int OR name in LOG_LEVELS: level of the module-level print functions
+        """
+        Gnulog.level = LOG_LEVELS[p_level.lower()] if isinstance(p_level, str) else p_level
+
+    @staticmethod
+    def call_site(frame) -> str:
+        key = (frame.f_code, frame.f_lineno)
+        site = Gnulog.call_sites.get(key)
+        if site is None:
+            site = '[' + osp.basename(frame.f_code.co_filename) + '@' + str(frame.f_lineno) + ']: '
+            Gnulog.call_sites[key] = site
+        return site
+
+    @staticmethod
+    def emit(info, color='', inspector=True, newline=True, args=None, p_depth:int=2) -> str:
+        """
+        format and print -- only called once the level is known to be enabled
+        :param p_depth: frames between here and the caller to report
         """
-        inspect_line = ''
         if info is None:
-            info = '==============================================================================================================='
+            info = SEPARATOR
             inspector = False
-        text = str(info)
-        if inspector:
-            calling_frame = inspect.currentframe().f_back
-            calling_file  = inspect.getfile(calling_frame).split('/')[-1]
-            calling_line  = str(inspect.getlineno(calling_frame))
-            inspect_line  = '[' + calling_file + '@' + calling_line + ']: '
+        elif callable(info):
+            info = info()
+        text = str(info).format(*args) if args else str(info)
+        inspect_line = Gnulog.call_site(sys._getframe(p_depth)) if inspector else ''
         print(inspect_line + color + text + COLOR_OFF, end=('\n' if newline else ''))
         return text
 
+    @staticmethod
+    def print_text(info, color='', inspector=True, newline=True):
+        """
+        Print information with choices of color, inspection info, newline
+        """
+        return Gnulog.emit(info, color, inspector, newline)
+
+# END class Gnulog
+
+
+def print_debug(info, color='', inspector=True, newline=True, args=None):
+    if LOG_DEBUG >= Gnulog.level:
+        Gnulog.emit(info, color, inspector, newline, args)
+
+
+def print_info(info, color='', inspector=True, newline=True, args=None):
+    if LOG_INFO >= Gnulog.level:
+        Gnulog.emit(info, color, inspector, newline, args)
+
+
+def print_error(text, newline=True, args=None):
+    if LOG_ERROR >= Gnulog.level:
+        Gnulog.emit(text, RED, True, newline, args)
+
 
 class GncUtilities:
     @staticmethod
-    def save_to_json(fname, json_data, t_str=None, p_color=BLACK, p_indent=4):
+    def save_to_json(fname, json_data, t_str=None, p_color=BLACK, p_indent=None):
         """
         print json data to a file -- add a time string to get a unique file name each run
         :param     fname: str: file path and name
-        :param json_data: json compatible struct
+        :param json_data: json compatible struct OR an InvestmentRecord, which is streamed
         :param     t_str: str: timestamp to use
         :param   p_color: str: color constant for Gnulog printing
-        :param  p_indent: int: indentation level for json dump
+        :param  p_indent: int: indentation level for json dump; default is compact
         :return: string with file name
         """
         out_file = fname + '_' + t_str + ".json"
         Gnulog.print_text("\nJSON file: \u0022{}\u0022".format(out_file), p_color)
         try:
-            fp = open(out_file, 'w', encoding='utf-8')
-            json.dump(json_data, fp, indent=p_indent)
-            fp.close()
+            with open(out_file, 'w', encoding='utf-8') as fp:
+                if isinstance(json_data, InvestmentRecord):
+                    json_data.write_json(fp, p_indent)
+                else:
+                    # json.dumps, NOT json.dump, to get the C encoder when compact
+                    fp.write(json.dumps(json_data, indent=p_indent))
         except Exception as sje:
             Gnulog.print_text("save_to_json EXCEPTION: {}".format(repr(sje)))
             raise sje
@@ -207,6 +398,34 @@ class GncUtilities:
             # for subAcct in descendants:
             # print_info("{}".format(subAcct.GetName()))
 
+    @staticmethod
+    @contextmanager
+    def line_source(source):
+        """
+        lines to parse from a file OR straight from any iterable of lines, e.g. a pdf extraction generator
+        :param source: str: file path and name OR iterable of str
+        :return: iterable of lines
+        """
+        if isinstance(source, str):
+            with open(source) as fp:
+                yield fp
+        else:
+            yield source
+
+    @staticmethod
+    def last_match(pattern, line:str):
+        """
+        rightmost match of a lookahead pattern, e.g. (?=(X)): the same captures as re.match(".*(X).*", line)
+        but each position is only tried once, so the time stays linear in the length of the line
+        :param pattern: compiled pattern that is ONLY a lookahead
+        :param    line: str: text to search
+        :return: last Match object or None
+        """
+        found = None
+        for found in pattern.finditer(line):
+            pass
+        return found
+
 # END class GncUtilities
 
 
@@ -300,20 +519,338 @@ class InvestmentRecord:
             if obj is not None:
                 self.plans[plan][tx_type].append(obj)
 
-    def to_json(self):
+    def iter_txs(self, plan:str, tx_type:str):
+        return iter(self.plans[plan][tx_type])
+
+    def iter_all_txs(self):
+        """
+        :return: iterator of (plan, tx type, tx) in the order they are saved; same as InvestmentRecordReader.iter_all_txs()
+        """
+        for plan in self.plans:
+            for tx_type in self.plans[plan]:
+                for tx in self.iter_txs(plan, tx_type):
+                    yield plan, tx_type, tx
+
+    def get_header(self) -> dict:
         return {
             "__class__"    : self.__class__.__name__ ,
             "__module__"   : self.__module__         ,
             OWNER          : self.get_owner()        ,
             "Source File"  : self.get_filename()     ,
             "Date"         : self.get_date_str()     ,
-            "Size"         : self.get_size_str()     ,
-            PLAN_DATA      : self.plans
+            "Size"         : self.get_size_str()
         }
 
+    def to_json(self):
+        json_data = self.get_header()
+        json_data[PLAN_DATA] = self.plans
+        return json_data
+
+    def write_json(self, fp, p_indent:int=None):
+        """
+        write the same JSON as json.dump(self.to_json(), fp, indent=p_indent) but one tx at a time,
+        so memory does not grow with the number of txs; compact, the default, uses the C encoder for each tx
+        :param       fp: text file to write to
+        :param p_indent: int: indentation level; None for compact
+        """
+        newline = '' if p_indent is None else '\n'
+        sep = ', ' if p_indent is None else ','
+
+        def pad(depth:int) -> str:
+            return newline + ' ' * ((p_indent or 0) * depth)
+
+        # the default encoder when compact; ONE indenting encoder, rather than a new one for each json.dumps(indent=)
+        encode = json.dumps if p_indent is None else json.JSONEncoder(indent=p_indent).encode
+
+        def dumps(value, depth:int) -> str:
+            text = encode(value)
+            return text if p_indent is None else text.replace('\n', pad(depth))
+
+        fp.write('{')
+        for key, value in self.get_header().items():
+            fp.write(pad(1) + json.dumps(key) + ': ' + dumps(value, 1) + sep)
+        fp.write(pad(1) + json.dumps(PLAN_DATA) + ': {')
+        for i, plan in enumerate(self.plans):
+            fp.write((sep if i else '') + pad(2) + json.dumps(plan) + ': {')
+            for j, tx_type in enumerate(self.plans[plan]):
+                fp.write((sep if j else '') + pad(3) + json.dumps(tx_type) + ': [')
+                num = 0
+                for tx in self.iter_txs(plan, tx_type):
+                    fp.write((sep if num else '') + pad(4) + dumps(tx, 4))
+                    num += 1
+                fp.write((pad(3) if num else '') + ']')
+            fp.write(pad(2) + '}')
+        fp.write(pad(1) + '}' + pad(0) + '}')
+
+    @staticmethod
+    def from_json(json_data:dict):
+        """
+        rebuild the record saved by to_json() or write_json()
+        :param json_data: dict: loaded json; older files have a list of trades for each plan instead of Trade and Price
+        :return: InvestmentRecord
+        """
+        record = InvestmentRecord()
+        owner = json_data.get(OWNER)
+        if owner and owner != UNKNOWN:
+            record.set_owner(owner)
+        if json_data.get("Date"):
+            record.set_date(dt.strptime(json_data["Date"], DATE_STR_FORMAT))
+        if json_data.get("Source File") and json_data["Source File"] != UNKNOWN:
+            record.set_filename(json_data["Source File"])
+        for plan, txs in json_data.get(PLAN_DATA, {}).items():
+            tx_lists = {TRADE: txs} if isinstance(txs, list) else txs
+            for tx_type, tx_list in tx_lists.items():
+                for tx in tx_list:
+                    record.add_tx(plan, tx_type, tx)
+        return record
+
 # END class InvestmentRecord
 
 
+class InvestmentRecordReader:
+    """
+    Read an InvestmentRecord json file one tx at a time: only the header fields and the current tx are in memory,
+    so a file of any size can be replayed. Has the InvestmentRecord methods that a Gnucash session uses.
+    The txs can only be read ONCE, in the order they are saved.
+    """
+    def __init__(self, p_fp, p_chunk:int=64*1024):
+        self.fp = p_fp
+        self.chunk = p_chunk
+        self.buffer = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+        self.header = {}
+        self.has_plans = False
+
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            if key == PLAN_DATA:
+                # the header fields are all before the plans, as saved by to_json() or write_json()
+                self.has_plans = True
+                return
+            self.header[key] = self.read_value()
+            if self.expect(',}') == '}':
+                return
+
+    def fill(self) -> bool:
+        more = self.fp.read(self.chunk)
+        if not more:
+            return False
+        self.buffer = self.buffer[self.pos:] + more
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        :return: next character that is not whitespace, WITHOUT using it; '' at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars:str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise Exception("json file: found '{}' instead of one of '{}'!".format(char, chars))
+        self.pos += 1
+        return char
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # value not all in the buffer yet
+                if not self.fill():
+                    raise
+                continue
+            # a number at the end of the buffer may go on in the next chunk
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def read_array(self, plan:str, tx_type:str):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield plan, tx_type, self.read_value()
+            if self.expect(',]') == ']':
+                return
+
+    def iter_all_txs(self):
+        """
+        :return: iterator of (plan, tx type, tx) as read from the file; older files have a list of trades for each plan
+        """
+        if not self.has_plans:
+            return
+        self.has_plans = False
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            plan = self.read_value()
+            self.expect(':')
+            if self.peek() == '[':
+                yield from self.read_array(plan, TRADE)
+            else:
+                self.expect('{')
+                while self.peek() != '}':
+                    tx_type = self.read_value()
+                    self.expect(':')
+                    yield from self.read_array(plan, tx_type)
+                    if self.peek() == ',':
+                        self.pos += 1
+                self.pos += 1
+            if self.expect(',}') == '}':
+                return
+
+    def get_owner(self):
+        owner = self.header.get(OWNER)
+        return UNKNOWN if owner is None or owner == '' else owner
+
+    def get_filename(self):
+        return self.header.get("Source File", UNKNOWN)
+
+    def get_date_str(self):
+        return self.header.get("Date")
+
+    def load(self) -> InvestmentRecord:
+        """
+        :return: the whole record, for when it fits in memory
+        """
+        record = InvestmentRecord.from_json(self.header)
+        for plan, tx_type, tx in self.iter_all_txs():
+            record.add_tx(plan, tx_type, tx)
+        return record
+
+# END class InvestmentRecordReader
+
+
+def to_cents(amount:str) -> int:
+    """
+    :param amount: e.g. '-164.70', '1,234.5', '$12', '(3.05)' -- parentheses are negative
+    :return: integer cents, rounded half away from zero if there are more than 2 decimals
+    """
+    text = amount.strip()
+    # the usual case, e.g. '-164.70', without the general parsing
+    if text[-3:-2] == '.' and (text[1:-3] if text[:1] == '-' else text[:-3]).isdigit() and text[-2:].isdigit():
+        return int(text[:-3] + text[-2:])
+    text = text.replace('$', '').replace(',', '')
+    neg = text[:1] in ('-', '(')
+    if text[:1] in ('-', '+', '('):
+        text = text[1:]
+    if text.endswith(')'):
+        text = text[:-1]
+    whole, _, frac = text.partition('.')
+    if not (whole or frac) or not (whole + frac).isdigit():
+        raise Exception("'{}' is NOT an amount!".format(amount))
+    cents = int(whole or '0') * 100 + int((frac + '00')[:2])
+    if len(frac) > 2 and frac[2] >= '5':
+        cents += 1
+    return -cents if neg else cents
+
+
+class StatementRecord:
+    """
+    All transactions from a credit card or bank statement, the same for each type of statement file:
+    DATE is 'YYYY-MM-DD', AMOUNT is integer cents, DESC is trimmed; TX_ID, TX_KIND, MEMO and CARD if the file has them
+    """
+    def __init__(self, p_account:str=None, p_fname:str=None, p_curr:str=DEF_CURR):
+        self.account = p_account
+        self.filename = p_fname
+        self.currency = p_curr
+        self.date = dtnow
+        self.txs = []
+
+    def set_account(self, acct:str):
+        self.account = str(acct)
+
+    def get_account(self):
+        return UNKNOWN if not self.account else self.account
+
+    def set_currency(self, curr:str):
+        self.currency = str(curr)
+
+    def get_currency(self):
+        return self.currency
+
+    def set_filename(self, fn):
+        self.filename = str(fn)
+
+    def get_filename(self):
+        return UNKNOWN if not self.filename else self.filename
+
+    def get_date_str(self):
+        return self.date.strftime(DATE_STR_FORMAT)
+
+    def add_tx(self, tx:dict):
+        self.txs.append(tx)
+
+    def iter_txs(self):
+        return iter(self.txs)
+
+    def get_size(self):
+        return len(self.txs)
+
+    def get_header(self) -> dict:
+        return {
+            "__class__"   : self.__class__.__name__ ,
+            "__module__"  : self.__module__         ,
+            CARD          : self.get_account()      ,
+            CURRENCY      : self.get_currency()     ,
+            "Source File" : self.get_filename()     ,
+            "Date"        : self.get_date_str()     ,
+            "Size"        : self.get_size()
+        }
+
+    def to_json(self):
+        json_data = self.get_header()
+        json_data[STMT_DATA] = self.txs
+        return json_data
+
+    def write_json(self, fp, p_indent:int=None):
+        """
+        same JSON as json.dump(self.to_json(), fp, indent=p_indent), one tx at a time
+        """
+        newline = '' if p_indent is None else '\n'
+        sep = ', ' if p_indent is None else ','
+        pad = [newline + ' ' * ((p_indent or 0) * depth) for depth in range(3)]
+        encode = json.dumps if p_indent is None else json.JSONEncoder(indent=p_indent).encode
+
+        fp.write('{')
+        for key, value in self.get_header().items():
+            fp.write(pad[1] + json.dumps(key) + ': ' + json.dumps(value) + sep)
+        fp.write(pad[1] + json.dumps(STMT_DATA) + ': [')
+        for num, tx in enumerate(self.iter_txs()):
+            text = encode(tx)
+            fp.write((sep if num else '') + pad[2] + (text if p_indent is None else text.replace('\n', pad[2])))
+        fp.write((pad[1] if self.txs else '') + ']' + pad[0] + '}')
+
+    @staticmethod
+    def from_json(json_data:dict):
+        record = StatementRecord(json_data.get(CARD), json_data.get("Source File"), json_data.get(CURRENCY, DEF_CURR))
+        if json_data.get("Date"):
+            record.date = dt.strptime(json_data["Date"], DATE_STR_FORMAT)
+        for tx in json_data.get(STMT_DATA, []):
+            record.add_tx(tx)
+        return record
+
+# END class StatementRecord
+
+
 # Fund companies
 ATL: str = "ATL"
 CIG: str = "CIG"
@@ -427,7 +964,9 @@ ACCT_PATHS = {
     ASSET    : ["FAMILY", "INVEST"] ,  # + planType [+ Owner]
     MON_MARK : GNC_MARK ,
     MON_LULU : GNC_LULU ,
-    TRUST    : [TRUST, "Trust Assets", "Monarch ITF", COMPANY_NAME[CIG]]
+    TRUST    : [TRUST, "Trust Assets", "Monarch ITF", COMPANY_NAME[CIG]] ,
+    CARD     : ["LIAB", "Credit Cards"] ,  # + card account
+    CARD_EXP : ["EXP", "Unsorted"]
 }
 
 # parsing states
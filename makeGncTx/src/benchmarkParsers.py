@@ -0,0 +1,70 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# benchmarkParsers.py -- time the Monarch text report parsers at each Gnulog level,
+#                        to check the logging cost when debug is off
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-07-28'
+__updated__ = '2019-07-28'
+
+import os
+from contextlib import redirect_stdout
+from time import perf_counter
+from argparse import ArgumentParser
+from Configuration import *
+from parseMonarchTxRep import parse_pdf_txs
+
+SRC_DIR = osp.dirname(osp.abspath(__file__))
+CORPUS_DIR = osp.join(osp.dirname(SRC_DIR), 'txtFromPdf')
+
+
+def time_parser(files:list, level:int, repeat:int) -> (float, int):
+    """
+    :return: best total seconds of repeat runs over all the files, number of trades found
+    """
+    Gnulog.set_level(level)
+    best = None
+    trades = 0
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            trades = 0
+            start = perf_counter()
+            for mon_file in files:
+                trades += parse_pdf_txs(mon_file, strnow).get_size()
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return best, trades
+
+
+def benchmark_parsers_main(args:list) -> dict:
+    arg_parser = ArgumentParser(description='Time parse_pdf_txs on the Monarch text reports at each log level',
+                                prog='benchmarkParsers.py')
+    arg_parser.add_argument('-c', '--corpus', default=CORPUS_DIR, help='folder of Monarch TxRep text files')
+    arg_parser.add_argument('-n', '--repeat', type=int, default=5, help='runs at each level, best is reported')
+    opts = arg_parser.parse_args(args)
+
+    files = sorted(osp.join(opts.corpus, f) for f in os.listdir(opts.corpus) if 'txrep' in f.lower())
+    saved_level = Gnulog.level
+    results = {}
+    try:
+        for name in ('off', 'info', 'debug'):
+            secs, trades = time_parser(files, LOG_LEVELS[name], opts.repeat)
+            results[name] = {"seconds": round(secs, 4), "trades": trades}
+    finally:
+        Gnulog.level = saved_level
+
+    off_secs = results['off']["seconds"]
+    for name, res in results.items():
+        res["vs off"] = round(res["seconds"] / off_secs, 2) if off_secs else None
+        print_info("{:>6}: {}".format(name, res), GREEN)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_parsers_main(sys.argv[1:])
@@ -0,0 +1,234 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# benchmarkReports.py -- time each Monarch report parser on synthetic reports of increasing size
+#                        and print a table of the best time and records per second
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-16'
+__updated__ = '2019-08-16'
+
+import os
+import json
+import timeit
+import logging as lg
+import tempfile
+from sys import path
+from contextlib import redirect_stdout
+from argparse import ArgumentParser
+from Configuration import *
+from genMonarchReports import MonarchReportGenerator, report_file_name, TXREP, COPY, FUNDS, QTREP
+
+SRC_DIR = osp.dirname(osp.abspath(__file__))
+# parseMonarchCopyRep is in the folder above
+path.append(osp.dirname(SRC_DIR))
+
+SIZES = [1000, 10000, 100000]
+# a size that takes longer than this for one run is the last size tried for that parser
+BUDGET_SECS: float = 60.0
+UNAVAILABLE: str = 'unavailable'
+SKIPPED: str     = 'skipped'
+
+
+def quiet_logger() -> lg.Logger:
+    lgr = lg.getLogger('benchmarkReports')
+    lgr.setLevel(lg.WARNING)
+    return lgr
+
+
+def copy_parser(report:str):
+    from parseMonarchCopyRep import ParseMonarchCopyReport
+    return ParseMonarchCopyReport(report, quiet_logger())
+
+
+# each case: (import and prepare) -> (function to time, function that gives the number of records found)
+
+def case_pdf_txs(report:str, _):
+    from parseMonarchTxRep import parse_pdf_txs
+    result = {}
+
+    def run():
+        result['rec'] = parse_pdf_txs(report, strnow)
+    return run, lambda: result['rec'].get_size()
+
+
+def case_copy_txs(report:str, _):
+    from parseMonarchTxRep import parse_copy_txs
+    result = {}
+
+    def run():
+        result['rec'] = parse_copy_txs(report, strnow)
+    return run, lambda: result['rec'].get_size()
+
+
+def case_funds_info(report:str, _):
+    from parseMonarchFundsRep import ParseMonarchFundsReport
+    result = {}
+
+    def run():
+        result['rec'] = ParseMonarchFundsReport().parse_funds_info(report, strnow)
+    return run, lambda: result['rec'].get_size()
+
+
+def case_monarch_qtrep(report:str, _):
+    from parseMonarchQtrRep import MonarchQrepToGncPrices
+    from perfMetrics import PerfMetrics
+    # parsing only: skip __init__, which opens the Gnucash session
+    qtrep = object.__new__(MonarchQrepToGncPrices)
+    qtrep.mon_file = report
+    qtrep.prod = False
+    qtrep.metrics = PerfMetrics(MON)
+    result = {}
+
+    def run():
+        result['rec'] = qtrep.parse_monarch_qtrep()
+    return run, lambda: result['rec'].get_size()
+
+
+def case_report_info(report:str, _):
+    # fail here if the parser cannot be imported, not in the timing
+    copy_parser(report)
+    result = {}
+
+    def run():
+        parser = result['parser'] = copy_parser(report)
+        parser.parse_report_info()
+    return run, lambda: result['parser'].get_monarch_record().get_size()
+
+
+def case_balance_to_trade(report:str, _):
+    # add_balance_to_trade only sets the balance and notes of the latest trades, so the same record can be re-used
+    parser = copy_parser(report)
+    parser.parse_report_info()
+    return parser.add_balance_to_trade, lambda: parser.get_monarch_record().get_size()
+
+
+def case_trade_info(report:str, gnc_file:str):
+    if not gnc_file:
+        raise ImportError("needs a Gnucash file: use -g")
+    from parseMonarchCopyRep import GnucashSession, SEND
+    parser = copy_parser(report)
+    parser.parse_report_info()
+    record = parser.get_monarch_record()
+    owner = record.get_owner()
+    counts = {}
+
+    def run():
+        # a new parser each time so the switch pairs are matched from the start
+        trader = copy_parser(report)
+        trader.gnc_session = GnucashSession(SEND, gnc_file, TRADE, trader._lgr)
+        trader.gnc_session.begin_session()
+        counts['num'] = 0
+        try:
+            plans = record.get_plans()
+            for plan_type in plans:
+                ast_parent = trader.gnc_session.get_asset_account(plan_type, owner)
+                rev_acct = trader.gnc_session.get_revenue_account(plan_type, owner)
+                for mon_tx in plans[plan_type][TRADE]:
+                    trader.get_trade_info(mon_tx, plan_type, ast_parent, rev_acct)
+                    counts['num'] += 1
+        finally:
+            # NEVER save
+            trader.gnc_session.end_session(False)
+    return run, lambda: counts['num']
+
+
+CASES = [
+    ('parse_pdf_txs',        TXREP, case_pdf_txs),
+    ('parse_copy_txs',       COPY,  case_copy_txs),
+    ('parse_funds_info',     FUNDS, case_funds_info),
+    ('parse_monarch_qtrep',  QTREP, case_monarch_qtrep),
+    ('parse_report_info',    COPY,  case_report_info),
+    ('add_balance_to_trade', COPY,  case_balance_to_trade),
+    ('get_trade_info',       COPY,  case_trade_info)
+]
+CASE_NAMES = [name for name, _, _ in CASES]
+
+
+def time_case(make_case, report:str, gnc_file:str, repeat:int) -> dict:
+    """
+    :return: best seconds of repeat runs, records found and records per second; OR the reason it could not run
+    """
+    try:
+        run, get_records = make_case(report, gnc_file)
+    except ImportError as ie:
+        return {"status": UNAVAILABLE, "reason": str(ie)}
+    secs = min(timeit.Timer(run).repeat(repeat=repeat, number=1))
+    records = get_records()
+    return {"seconds": round(secs, 4), "records": records, "rate": int(records / secs) if secs else None}
+
+
+def results_table(results:dict, sizes:list) -> list:
+    """
+    :return: text lines: one row per parser, one column per size, with seconds and records per second
+    """
+    lines = ["{:<22}".format('parser') + ''.join("{:>26}".format(num) for num in sizes)]
+    for name, by_size in results.items():
+        row = "{:<22}".format(name)
+        for num in sizes:
+            res = by_size.get(num, {"status": SKIPPED})
+            cell = res["status"] if "status" in res else "{:.4f}s {:>9}/s".format(res["seconds"], res["rate"])
+            row += "{:>26}".format(cell)
+        lines.append(row)
+    return lines
+
+
+def benchmark_reports_main(args:list) -> dict:
+    arg_parser = ArgumentParser(description='Time the Monarch report parsers on synthetic reports of each size',
+                                prog='benchmarkReports.py')
+    arg_parser.add_argument('-n', '--records', nargs='+', type=int, default=SIZES, help='records in each report')
+    arg_parser.add_argument('-p', '--parsers', nargs='+', default=CASE_NAMES, choices=CASE_NAMES, help='parsers to time')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=3, help='runs of each parser, best is reported')
+    arg_parser.add_argument('-b', '--budget', type=float, default=BUDGET_SECS,
+                            help='stop trying larger sizes for a parser once a run takes more seconds than this')
+    arg_parser.add_argument('-g', '--gnucash', help='Gnucash file for get_trade_info: is NEVER saved')
+    arg_parser.add_argument('-o', '--out', help='folder for the generated reports; default is a temporary folder')
+    arg_parser.add_argument('-s', '--seed', type=int, default=0, help='random seed for the reports')
+    arg_parser.add_argument('--json', help='also save the results to this JSON file')
+    opts = arg_parser.parse_args(args)
+
+    out_dir = opts.out or tempfile.mkdtemp(prefix='monarch_bench_')
+    os.makedirs(out_dir, exist_ok=True)
+    sizes = sorted(opts.records)
+    saved_level = Gnulog.level
+    Gnulog.set_level(LOG_OFF)
+    results = {}
+    try:
+        for name, kind, make_case in CASES:
+            if name not in opts.parsers:
+                continue
+            results[name] = {}
+            for num in sizes:
+                report = report_file_name(out_dir, kind, num, opts.seed)
+                if not osp.isfile(report):
+                    MonarchReportGenerator(opts.seed).write_report(kind, num, report)
+                with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                    res = time_case(make_case, report, opts.gnucash, opts.repeat)
+                results[name][num] = res
+                if res.get("status") == UNAVAILABLE or res["seconds"] > opts.budget:
+                    break
+    finally:
+        Gnulog.level = saved_level
+
+    for line in results_table(results, sizes):
+        print_info(line, GREEN)
+    for name, by_size in results.items():
+        for res in by_size.values():
+            if res.get("status") == UNAVAILABLE:
+                print_info("{}: {}".format(name, res["reason"]), YELLOW)
+                break
+
+    if opts.json:
+        with open(opts.json, 'w', encoding='utf-8') as jfp:
+            json.dump({"sizes": sizes, "seed": opts.seed, "results": results}, jfp, indent=4)
+        print_info("Saved results to {}".format(opts.json), CYAN)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_reports_main(sys.argv[1:])
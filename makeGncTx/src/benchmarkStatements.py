@@ -0,0 +1,131 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# benchmarkStatements.py -- time the statement CSV reader on synthetic statements in each bank layout,
+#                           against just reading the lines and just splitting them with csv, to see where the time goes
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-27'
+__updated__ = '2019-08-27'
+
+import os
+import csv
+import random
+import tempfile
+from time import perf_counter, process_time
+from datetime import timedelta
+from argparse import ArgumentParser
+from Configuration import *
+from parseCardCsv import CsvStatementReader
+
+NUM_ROWS: int = 1000000
+MERCHANTS = ["QUICKIE #60", "LOBLAWS #170", "PHARMACIE CAMPUS PHARMACY", "SABAI THAI CUISINE", "VIRGIN MOBILE",
+             "THE FROCK EXCHANGE", "Amazon Downloads", "MIKE GALAZKA SERVICE CENT"]
+CITIES = [("OTTAWA", "ON"), ("KANATA", "ON"), ("VERDUN", "QC"), ("www.Amazon.ca", "ON")]
+CARDS = ["4500********7414", "4500********7406"]
+
+
+def cibc_row(date:dt, amount:int) -> list:
+    """date, 'merchant city, province', debit, credit, card"""
+    merchant = random.choice(MERCHANTS)
+    city, prov = random.choice(CITIES)
+    money = "{}.{:02d}".format(*divmod(abs(amount), 100))
+    return [date.strftime('%Y-%m-%d'), "{} {}, {}".format(merchant, city, prov),
+            money if amount < 0 else '', money if amount >= 0 else '', random.choice(CARDS)]
+
+
+def pcbanking_row(date:dt, amount:int) -> list:
+    """M/D/YYYY, fixed width merchant and city, signed amount"""
+    merchant = random.choice(MERCHANTS)
+    city, prov = random.choice(CITIES)
+    sign = '-' if amount < 0 else ''
+    return ["{}/{}/{}".format(date.month, date.day, date.year),
+            "{:25}{:13}{} ".format(merchant[:25], city[:13], prov), sign + "{}.{:02d}".format(*divmod(abs(amount), 100))]
+
+
+LAYOUTS = {'cibc': cibc_row, 'pcbanking': pcbanking_row}
+
+
+def write_statement(file_name:str, make_row, rows:int):
+    random.seed(rows)
+    start = dt(2018, 1, 1)
+    with open(file_name, 'w', encoding='utf-8', newline='') as cfp:
+        writer = csv.writer(cfp, lineterminator='\n')
+        for i in range(rows):
+            amount = random.randint(1, 50000) if i % 20 == 0 else -random.randint(1, 30000)
+            writer.writerow(make_row(start + timedelta(days=i % 365), amount))
+
+
+def time_stage(run) -> dict:
+    """
+    :return: wall and cpu seconds of run(), the number it returns
+    """
+    wall = perf_counter()
+    cpu = process_time()
+    num = run()
+    cpu = process_time() - cpu
+    wall = perf_counter() - wall
+    return {"wall": round(wall, 3), "cpu": round(cpu, 3), "rows": num}
+
+
+def read_bytes(file_name:str) -> int:
+    num = 0
+    with open(file_name, 'rb') as bfp:
+        for block in iter(lambda: bfp.read(1 << 20), b''):
+            num += block.count(b'\n')
+    return num
+
+
+def read_lines(file_name:str) -> int:
+    with open(file_name, 'r', encoding='utf-8', newline='') as cfp:
+        return sum(1 for _ in cfp)
+
+
+def split_rows(file_name:str) -> int:
+    with open(file_name, 'r', encoding='utf-8', newline='') as cfp:
+        return sum(1 for _ in csv.reader(cfp))
+
+
+def parse_rows(file_name:str) -> int:
+    return sum(map(len, CsvStatementReader(file_name).iter_batches()))
+
+
+STAGES = [('bytes', read_bytes), ('lines', read_lines), ('csv', split_rows), ('parse', parse_rows)]
+
+
+def benchmark_statements_main(args:list) -> dict:
+    arg_parser = ArgumentParser(description='Time the statement CSV reader on synthetic statements',
+                                prog='benchmarkStatements.py')
+    arg_parser.add_argument('-r', '--rows', type=int, default=NUM_ROWS, help='rows in each statement')
+    arg_parser.add_argument('-d', '--dir', help='keep the statements in this folder; default is a temporary folder')
+    opts = arg_parser.parse_args(args)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='statements_') as tmp_dir:
+        folder = opts.dir if opts.dir else tmp_dir
+        os.makedirs(folder, exist_ok=True)
+        for name, make_row in LAYOUTS.items():
+            file_name = osp.join(folder, "{}_{}.csv".format(name, opts.rows))
+            write_statement(file_name, make_row, opts.rows)
+            # the first read is from the disk, the stages after it from the page cache
+            results[name] = {"MB": round(osp.getsize(file_name) / 1e6, 1), "first read": time_stage(lambda: read_bytes(file_name))}
+            for stage, run in STAGES:
+                results[name][stage] = time_stage(lambda: run(file_name))
+
+            res = results[name]
+            parse = res['parse']
+            # cpu close to wall: the reader is waiting on python, NOT on the disk
+            res["cpu share"] = round(parse["cpu"] / parse["wall"], 2) if parse["wall"] else None
+            res["io share"] = round(res["first read"]["wall"] / parse["wall"], 3) if parse["wall"] else None
+            res["rows/s"] = round(parse["rows"] / parse["wall"]) if parse["wall"] else None
+            print_info("{:>10}: {}".format(name, res), GREEN)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_statements_main(sys.argv[1:])
@@ -10,7 +10,7 @@ __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __python_version__ = 3.6
 __created__ = '2018'
-__updated__ = '2019-06-02'
+__updated__ = '2019-08-29'
 
 import copy
 import json
@@ -18,6 +18,8 @@ import re
 from gnucash import Session, Transaction, Split, GncNumeric, GncPrice
 from gnucash.gnucash_core_c import CREC
 from Configuration import *
+from perfMetrics import *
+from recordSnapshot import is_snapshot, load_snapshot
 
 
 # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
@@ -25,8 +27,9 @@ class GncTxCreator:
     """
     create Gnucash transactions and prices from Monarch json
     """
-    def __init__(self, tx_colxn, gnc_f, md, pdb=None, bk=None, rt=None, cur=None, rpinfo=None):
+    def __init__(self, tx_colxn, gnc_f, md, pdb=None, bk=None, rt=None, cur=None, rpinfo=None, metrics=None):
         print_info("createGnucashTxs:GncTxCreator()\nRuntime = {}\n".format(strnow), MAGENTA)
+        self.metrics = metrics if metrics is not None else PerfMetrics(GNC)
         self.tx_coll  = tx_colxn
         self.gnc_file = gnc_f
         self.mode     = md
@@ -141,6 +144,7 @@ class GncTxCreator:
                     # ALREADY HAVE THE FIRST ITEM OF THE PAIR
                     have_pair = True
                     pair_tx = itx
+                    self.metrics.count(PAIRS)
                     print_info('Found the MATCH of a pair...', YELLOW)
                     break
 
@@ -253,6 +257,7 @@ class GncTxCreator:
                     # ALREADY HAVE THE FIRST ITEM OF THE PAIR
                     have_pair = True
                     pair_tx = itx
+                    self.metrics.count(PAIRS)
                     print_info('Found the MATCH of a pair...', YELLOW)
                     break
 
@@ -384,14 +389,17 @@ class GncTxCreator:
         # ROLL BACK if something went wrong and the two splits DO NOT balance
         if not gtx.GetImbalanceValue().zero_p():
             print_error("gtx Imbalance = {}!! Roll back transaction changes!".format(gtx.GetImbalanceValue().to_string()))
+            self.metrics.count(ROLLBACKS)
             gtx.RollbackEdit()
             return
 
         if self.mode == PROD:
             print_info("Mode = {}: Commit transaction changes.\n".format(self.mode), GREEN)
             gtx.CommitEdit()
+            self.metrics.count(TRADES_CREATED)
         else:
             print_info("Mode = {}: Roll back transaction changes!\n".format(self.mode), RED)
+            self.metrics.count(ROLLBACKS)
             gtx.RollbackEdit()
 
     def process_monarch_txs(self, mtx, plan_type, ast_parent, rev_acct):
@@ -441,13 +449,17 @@ class GncTxCreator:
         commod_tab = self.book.get_table()
         self.curr = commod_tab.lookup("ISO4217", "CAD")
 
-        for plan_type in self.tx_coll[PLAN_DATA]:
-            print_info("\n\t\u0022Plan type = {}\u0022".format(plan_type), YELLOW)
+        # one tx at a time, so the collection can be an InvestmentRecordReader on a file of any size
+        plan_accounts = {}
+        for plan_type, tx_type, mon_tx in self.tx_coll.iter_all_txs():
+            if tx_type != TRADE:
+                continue
+            if plan_type not in plan_accounts:
+                print_info("\n\t\u0022Plan type = {}\u0022".format(plan_type), YELLOW)
+                plan_accounts[plan_type] = self.get_plan_info(plan_type)
+            asset_parent, rev_acct = plan_accounts[plan_type]
 
-            asset_parent, rev_acct = self.get_plan_info(plan_type)
-
-            for mon_tx in self.tx_coll[PLAN_DATA][plan_type]:
-                self.process_monarch_txs(mon_tx, plan_type, asset_parent, rev_acct)
+            self.process_monarch_txs(mon_tx, plan_type, asset_parent, rev_acct)
 
     def get_plan_info(self, plan_type):
         """
@@ -487,23 +499,26 @@ class GncTxCreator:
         print_info("prepare_session()", MAGENTA)
         msg = TEST
         try:
-            session = Session(self.gnc_file)
-            self.book = session.book
+            with self.metrics.stage('open session'):
+                session = Session(self.gnc_file)
+                self.book = session.book
 
-            print_info("Owner = {}".format(self.tx_coll[OWNER]), GREEN)
-            self.report_info = InvestmentRecord(self.tx_coll[OWNER])
+            print_info("Owner = {}".format(self.tx_coll.get_owner()), GREEN)
+            self.report_info = InvestmentRecord(self.tx_coll.get_owner())
 
-            self.create_gnucash_info()
+            with self.metrics.stage('create gnucash info'):
+                self.create_gnucash_info()
 
-            if self.mode == PROD:
-                msg = "Mode = {}: COMMIT Price DB edits and Save session.".format(self.mode)
-                print_info(msg, GREEN)
-                self.price_db.commit_edit()
-                # only ONE session save for the entire run
-                session.save()
+            with self.metrics.stage('save session'):
+                if self.mode == PROD:
+                    msg = "Mode = {}: COMMIT Price DB edits and Save session.".format(self.mode)
+                    print_info(msg, GREEN)
+                    self.price_db.commit_edit()
+                    # only ONE session save for the entire run
+                    session.save()
 
-            session.end()
-            session.destroy()
+                session.end()
+                session.destroy()
 
         except Exception as e:
             msg = "prepare_session() EXCEPTION!! '{}'".format(repr(e))
@@ -517,7 +532,11 @@ class GncTxCreator:
 
 
 def create_gnc_txs_main(args):
-    usage = "usage: py36 createGnucashTxs.py <monarch JSON file> <gnucash file> <mode: prod|test>"
+    usage = "usage: py36 createGnucashTxs.py <monarch JSON OR snapshot file> <gnucash file> <mode: prod|test> [{} <JSON file>]"\
+            " [{}]".format(METRICS_OPTION, STREAM_OPTION)
+    metrics_file, args = pop_option(args, METRICS_OPTION)
+    stream, args = pop_option(args, STREAM_OPTION, False)
+    metrics = PerfMetrics('createGnucashTxs.py')
     if len(args) < 3:
         print_error("NOT ENOUGH parameters!")
         print_info(usage, MAGENTA)
@@ -530,10 +549,6 @@ def create_gnc_txs_main(args):
         exit(530)
     print_info("\nMonarch file = {}".format(mon_file), GREEN)
 
-    # get Monarch transactions from the Monarch json file
-    with open(mon_file, 'r') as fp:
-        tx_coll = json.load(fp)
-
     gnc_file = args[1]
     if not osp.isfile(gnc_file):
         print_error("File path '{}' does not exist. Exiting...".format(gnc_file))
@@ -545,8 +560,24 @@ def create_gnc_txs_main(args):
     global strnow
     strnow = dt.now().strftime(DATE_STR_FORMAT)
 
-    gtc = GncTxCreator(tx_coll, gnc_file, mode)
-    msg = gtc.prepare_session()
+    # get Monarch transactions from the Monarch json file: all at once OR one at a time while creating them
+    # OR all at once from a binary snapshot
+    with open(mon_file, 'r', encoding='utf-8') as fp:
+        if is_snapshot(mon_file):
+            with metrics.stage('load snapshot'):
+                tx_coll = load_snapshot(mon_file)
+        else:
+            with metrics.stage('load json'):
+                tx_coll = InvestmentRecordReader(fp) if stream else InvestmentRecord.from_json(json.load(fp))
+
+        gtc = GncTxCreator(tx_coll, gnc_file, mode, metrics=metrics)
+        msg = gtc.prepare_session()
+
+    metrics.finish()
+    for line in metrics.report():
+        print_info(line, CYAN, False)
+    if metrics_file:
+        print_info("Saved metrics to: {}".format(metrics.save(metrics_file)), CYAN)
 
     print_info("\n >>> PROGRAM ENDED.", MAGENTA)
     return msg
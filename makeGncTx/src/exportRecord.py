@@ -0,0 +1,208 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# exportRecord.py -- export the trades and prices of an InvestmentRecord as flat columns, one row per tx:
+#                    a CSV file OR a NumPy .npz file with typed columns; numpy is only needed for .npz
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-25'
+__updated__ = '2019-08-29'
+
+import csv
+import shutil
+import zipfile
+import tempfile
+from array import array
+from Configuration import *
+from recordArchive import tx_date
+from recordSnapshot import encode_amount, is_snapshot, load_snapshot, AMT_DECIMALS, AMT_POINT
+
+CSV_SUFFIX: str = '.csv'
+NPZ_SUFFIX: str = '.npz'
+
+EXPORT_COLUMNS = ['date', 'owner', 'plan', 'fund_code', 'company', 'type',
+                  'gross', 'net', 'units', 'price', 'unit_balance']
+STR_COLUMNS = ['owner', 'plan', 'fund_code', 'company', 'type']
+NUM_COLUMNS = ['gross', 'net', 'units', 'price', 'unit_balance']
+# tx key of each number column
+NUM_KEYS = [GROSS, NET, UNITS, PRICE, UNIT_BAL]
+
+# rows held in memory at once when writing the .npz columns
+NPZ_CHUNK: int = 64 * 1024
+EPOCH = dt(1970, 1, 1).date()
+
+
+def amount_text(text) -> str:
+    """
+    :return: the amount as a plain decimal, e.g. '($1,234.50)' -> '-1234.50'; '' if NOT an amount
+    """
+    amount = encode_amount(text.strip()) if isinstance(text, str) else None
+    if amount is None:
+        return ''
+    value, fmt = amount
+    decimals = fmt & AMT_DECIMALS
+    whole, frac = divmod(-value - 1 if value < 0 else value, 10 ** decimals)
+    number = "{}.{:0{}d}".format(whole, frac, decimals) if fmt & AMT_POINT else str(whole)
+    return '-' + number if value < 0 else number
+
+
+def tx_fund(tx:dict) -> (str, str):
+    """
+    :return: fund code, company; the funds report has them together in FUND, e.g. 'CIG 11461'
+    """
+    if FUND_CODE in tx:
+        return tx[FUND_CODE], tx.get(FUND_CMPY, '')
+    if FUND in tx:
+        company, _, code = tx[FUND].partition(' ')
+        return code, company
+    return '', tx.get(FUND_CMPY, '')
+
+
+def iter_rows(record):
+    """
+    :param record: InvestmentRecord OR InvestmentRecordReader
+    :return: iterator of one row for each tx: date, then the str columns, then the number columns as decimal text
+    """
+    owner = record.get_owner()
+    record_date = dt.strptime(record.get_date_str(), DATE_STR_FORMAT)
+    for plan, tx_type, tx in record.iter_all_txs():
+        code, company = tx_fund(tx)
+        numbers = [amount_text(tx.get(key)) for key in NUM_KEYS]
+        # the quarterly report prices are in dollars and cents
+        if DOLLARS in tx:
+            numbers[NUM_KEYS.index(PRICE)] = amount_text(tx[DOLLARS] + '.' + tx[CENTS])
+        yield [tx_date(tx, record_date).date(), owner, plan, code, company, tx_type] + numbers
+
+
+def export_csv(record, out_file:str) -> int:
+    """
+    write the rows as they are read
+    :return: number of rows
+    """
+    num = 0
+    with open(out_file, 'w', encoding='utf-8', newline='') as cfp:
+        writer = csv.writer(cfp)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in iter_rows(record):
+            writer.writerow(row)
+            num += 1
+    return num
+
+
+def export_npz(record, out_file:str, p_chunk:int=NPZ_CHUNK) -> int:
+    """
+    same columns as the csv, typed: date is datetime64[D], numbers are float64 with NaN if missing, the rest unicode.
+    The rows are streamed to one temporary file per column, then each column is copied into the .npz a chunk at a time.
+    :return: number of rows
+    """
+    try:
+        import numpy as np
+        from numpy.lib import format as npy_format
+    except ImportError:
+        raise Exception("numpy is needed to export '{}': use {} instead".format(out_file, CSV_SUFFIX))
+
+    num = 0
+    str_len = {name: 1 for name in STR_COLUMNS}
+    with tempfile.TemporaryDirectory(prefix='monarch_export_') as tmp_dir:
+        col_files = {name: osp.join(tmp_dir, name) for name in EXPORT_COLUMNS}
+        dates = array('q')
+        numbers = {name: array('d') for name in NUM_COLUMNS}
+        str_fps = {name: open(col_files[name], 'w', encoding='utf-8', newline='\n') for name in STR_COLUMNS}
+        with open(col_files['date'], 'wb') as date_fp:
+            num_fps = {name: open(col_files[name], 'wb') for name in NUM_COLUMNS}
+
+            def flush():
+                dates.tofile(date_fp)
+                del dates[:]
+                for n_name in NUM_COLUMNS:
+                    numbers[n_name].tofile(num_fps[n_name])
+                    del numbers[n_name][:]
+
+            try:
+                for row in iter_rows(record):
+                    dates.append((row[0] - EPOCH).days)
+                    for name, value in zip(STR_COLUMNS, row[1:6]):
+                        value = value.replace('\n', ' ')
+                        str_fps[name].write(value + '\n')
+                        str_len[name] = max(str_len[name], len(value))
+                    for name, value in zip(NUM_COLUMNS, row[6:]):
+                        numbers[name].append(float(value) if value else float('nan'))
+                    num += 1
+                    if len(dates) >= p_chunk:
+                        flush()
+                flush()
+            finally:
+                for fp in list(str_fps.values()) + list(num_fps.values()):
+                    fp.close()
+
+        types = {'date': np.dtype('datetime64[D]')}
+        types.update({name: np.dtype('U{}'.format(str_len[name])) for name in STR_COLUMNS})
+        types.update({name: np.dtype('float64') for name in NUM_COLUMNS})
+
+        with zipfile.ZipFile(out_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as zfp:
+            for name in EXPORT_COLUMNS:
+                with zfp.open(name + '.npy', 'w', force_zip64=True) as npy:
+                    npy_format.write_array_header_1_0(npy, {'descr': npy_format.dtype_to_descr(types[name]),
+                                                            'fortran_order': False, 'shape': (num,)})
+                    if name in STR_COLUMNS:
+                        with open(col_files[name], 'r', encoding='utf-8', newline='\n') as sfp:
+                            lines = []
+                            for line in sfp:
+                                lines.append(line[:-1])
+                                if len(lines) >= p_chunk:
+                                    npy.write(np.array(lines, dtype=types[name]).tobytes())
+                                    lines = []
+                            npy.write(np.array(lines, dtype=types[name]).tobytes())
+                    else:
+                        # the dates and numbers are already the native int64 and float64 bytes
+                        with open(col_files[name], 'rb') as nfp:
+                            shutil.copyfileobj(nfp, npy)
+    return num
+
+
+def export_record(record, out_file:str) -> int:
+    """
+    :return: number of rows; the file type is from the suffix of out_file
+    """
+    if out_file.endswith(NPZ_SUFFIX):
+        return export_npz(record, out_file)
+    if out_file.endswith(CSV_SUFFIX):
+        return export_csv(record, out_file)
+    raise Exception("export file '{}' MUST end with {} or {}!".format(out_file, CSV_SUFFIX, NPZ_SUFFIX))
+
+
+def export_record_main(args:list) -> str:
+    usage = "usage: py36 exportRecord.py <record JSON OR snapshot file> <export file: {} OR {}> [{}]"\
+            .format(CSV_SUFFIX, NPZ_SUFFIX, STREAM_OPTION)
+    stream = STREAM_OPTION in args
+    args = [arg for arg in args if arg != STREAM_OPTION]
+    if len(args) < 2:
+        print_error("NOT ENOUGH parameters!")
+        print_info(usage, MAGENTA)
+        exit(187)
+
+    rec_file = args[0]
+    if not osp.isfile(rec_file):
+        print_error("File path '{}' does not exist! Exiting...".format(rec_file))
+        exit(192)
+    out_file = args[1]
+
+    # the JSON can be read one tx at a time, so only the current chunk of rows is in memory
+    with open(rec_file, 'r', encoding='utf-8') as fp:
+        if is_snapshot(rec_file):
+            record = load_snapshot(rec_file)
+        else:
+            record = InvestmentRecordReader(fp) if stream else InvestmentRecord.from_json(json.load(fp))
+        num = export_record(record, out_file)
+
+    msg = "exportRecord wrote {} rows to: {}".format(num, out_file)
+    print_info(msg, GREEN)
+    return msg
+
+
+if __name__ == '__main__':
+    export_record_main(sys.argv[1:])
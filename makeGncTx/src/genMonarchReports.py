@@ -0,0 +1,259 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# genMonarchReports.py -- write synthetic Monarch report text files of any size, in the formats read by the parsers:
+#                         transaction report, copied report, funds report and quarterly report
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-16'
+__updated__ = '2019-08-16'
+
+import os
+import random
+from datetime import timedelta
+from argparse import ArgumentParser
+from Configuration import *
+
+# report kinds
+TXREP: str  = 'txrep'    # pdf-text Transaction Report: parseMonarchTxRep.parse_pdf_txs
+COPY: str   = 'copy'     # copied report: parseMonarchCopyRep.parse_report_info AND parseMonarchTxRep.parse_copy_txs
+FUNDS: str  = 'funds'    # copied funds report: parseMonarchFundsRep.parse_funds_info
+QTREP: str  = 'qtrep'    # pdf-text Quarterly Report: parseMonarchQtrRep.parse_monarch_qtrep
+REPORT_KINDS = [TXREP, COPY, FUNDS, QTREP]
+
+# plan ids as in the sample reports
+GEN_PLAN_IDS = {PL_OPEN: JOINT_PLAN_ID, PL_TFSA: '300787', PL_RRSP: '278827'}
+GEN_PLANS = [PL_OPEN, PL_TFSA, PL_RRSP]
+GEN_OWNERS = [MON_MARK, MON_LULU]
+# trade types that both copied-report parsers know
+GEN_TYPES = [REINV, REINV, REINV, AUTO_SYS, FEE]
+LOADS = ['FEL', 'DSC', 'NL']
+ACCOUNT_NUM: str = '106035991'
+START_DATE = dt(2015, 1, 1)
+# fraction of the trades that are one half of a switch pair
+SWITCH_RATE: float = 0.15
+SWITCH_PAIRS = [(a, b) for a in FUNDS_LIST for b in FUNDS_LIST if a != b and a.split()[0] == b.split()[0]]
+
+
+def name_key(company:str) -> str:
+    """
+    :return: first word of the fund name, e.g. 'Signature' for CIG, as looked up in FUND_NAME_CODE
+    """
+    return [key for key, code in FUND_NAME_CODE.items() if code == company][-1]
+
+
+def dollars(amount:float, p_parens:bool=False) -> str:
+    """
+    :param p_parens: negative amounts in parentheses, as in the pdf reports, instead of a leading minus
+    """
+    text = "${:,.2f}".format(abs(amount))
+    if amount >= 0:
+        return text
+    return "(" + text + ")" if p_parens else '-' + text
+
+
+class MonarchReportGenerator:
+    """
+    Make random but consistent trades and prices, then write them as the lines of each kind of report
+    """
+    def __init__(self, p_seed:int=0):
+        self.rand = random.Random(p_seed)
+        self.prices = {fund: round(self.rand.uniform(5.0, 40.0), 4) for fund in FUNDS_LIST}
+        self.balances = {}
+
+    def make_trade(self, plan:str, date:dt, tx_type:str, fund:str, gross:float) -> dict:
+        price = self.prices[fund] = round(max(1.0, self.prices[fund] * self.rand.uniform(0.98, 1.02)), 4)
+        units = round(gross / price, 4)
+        key = (plan, fund)
+        self.balances[key] = round(self.balances.get(key, 1000.0) + units, 4)
+        return {PLAN_DATA: plan, DATE: date, DESC: tx_type, FUND: fund, GROSS: gross, UNITS: units, PRICE: price,
+                UNIT_BAL: self.balances[key], LOAD: self.rand.choice(LOADS)}
+
+    def gen_trades(self, num:int) -> list:
+        """
+        :return: num trades in date order, some of them in switch pairs; each plan section has its own owner
+        """
+        trades = []
+        date = START_DATE
+        while len(trades) < num:
+            date += timedelta(days=self.rand.randint(0, 2))
+            plan = self.rand.choice(GEN_PLANS)
+            if num - len(trades) >= 2 and self.rand.random() < SWITCH_RATE:
+                fund_out, fund_in = self.rand.choice(SWITCH_PAIRS)
+                gross = round(self.rand.uniform(100.0, 5000.0), 2)
+                trades.append(self.make_trade(plan, date, SW_OUT, fund_out, -gross))
+                trades.append(self.make_trade(plan, date, SW_IN, fund_in, gross))
+                continue
+            tx_type = self.rand.choice(GEN_TYPES)
+            gross = round(self.rand.uniform(1.0, 800.0), 2) * (-1 if tx_type in (AUTO_SYS, FEE) else 1)
+            trades.append(self.make_trade(plan, date, tx_type, self.rand.choice(FUNDS_LIST), gross))
+        return trades
+
+    def gen_prices(self, num:int) -> list:
+        """
+        :return: num (plan, fund, unit balance, price), cycling through the plans and all the funds
+        """
+        prices = []
+        while len(prices) < num:
+            plan = GEN_PLANS[(len(prices) // len(FUNDS_LIST)) % len(GEN_PLANS)]
+            fund = FUNDS_LIST[len(prices) % len(FUNDS_LIST)]
+            prices.append((plan, fund, round(self.rand.uniform(10.0, 3000.0), 4), self.prices[fund]))
+        return prices
+
+    def iter_txrep(self, num:int):
+        """
+        lines as pdftotext gives them for a Monarch Transaction Report: one value per line
+        """
+        owner = self.rand.choice(GEN_OWNERS)
+        yield owner
+        yield "January 01, 2015 - December 31, 2019"
+        yield CLIENT_TX
+        trades = sorted(self.gen_trades(num), key=lambda tx: GEN_PLANS.index(tx[PLAN_DATA]))
+        plan = fund = None
+        for tx in trades:
+            if tx[PLAN_DATA] != plan:
+                plan = tx[PLAN_DATA]
+                fund = None
+                yield PLAN_TYPE
+                yield "{} ({})".format(plan, 'Joint' if plan == PL_OPEN else 'Individual')
+                yield "Plan ID:"
+                yield GEN_PLAN_IDS[plan]
+                yield "Owner(s):"
+                yield owner if plan != PL_OPEN else "{}, {}".format(MON_MARK, MON_LULU)
+            if tx[FUND] != fund:
+                fund = tx[FUND]
+                company, code = fund.split()
+                yield "{}/{} {}-{} Fund A   Account # {}".format(COMPANY_NAME[company], company, code,
+                                                                 name_key(company), ACCOUNT_NUM)
+                for header in (TRADE_DATE, DESC, GROSS, NET, UNITS, PRICE, UNIT_BAL):
+                    yield header
+            yield tx[DATE].strftime('%m/%d/%Y')
+            # the parser expects one description line for these, three for AUTO_SYS and two for the others
+            if tx[DESC] in (SW_IN, SW_OUT, FEE):
+                yield tx[DESC]
+            elif tx[DESC] == AUTO_SYS:
+                yield tx[DESC] + " "
+                yield "Withdrawal Plan "
+                yield "(AWD/SWP)"
+            else:
+                yield tx[DESC] + " "
+                yield "Distribution/Interest"
+            yield dollars(tx[GROSS], True)
+            yield dollars(tx[GROSS], True)
+            yield "{:.4f}".format(tx[UNITS])
+            yield "${:.4f}".format(tx[PRICE])
+            yield "{:.4f}".format(tx[UNIT_BAL])
+
+    def iter_copy(self, num:int):
+        """
+        lines copied from the Monarch web page: owner, date, then for each plan the fund holdings and the trades
+        about one record in ten is a price, the rest are trades
+        """
+        owner = self.rand.choice(GEN_OWNERS)
+        yield owner
+        yield "{} Holdings".format(START_DATE.strftime('%d-%b-%Y'))
+        yield "{} {} (Joint) {}, {}".format(PL_OPEN, JOINT_PLAN_ID, MON_MARK, MON_LULU)
+        num_prices = max(1, num // 10)
+        prices = self.gen_prices(num_prices)
+        trades = self.gen_trades(num - num_prices)
+        for plan in GEN_PLANS:
+            yield "{} Plan: {} {}".format(FUND.upper(), plan, GEN_PLAN_IDS[plan])
+            for pr_plan, fund, bal, price in prices:
+                if pr_plan == plan:
+                    company, code = fund.split()
+                    yield "{} Fund Series A {}-{} {} {:.4f} ${:.4f} {} {} $0.00 0.00% {} 0.00 A".format(
+                          name_key(company), company, code, ACCOUNT_NUM, bal, price, dollars(bal * price),
+                          dollars(bal * price), START_DATE.strftime('%d-%b-%Y'))
+            yield "{} {}".format(TXS, plan)
+            for tx in trades:
+                if tx[PLAN_DATA] == plan:
+                    company, code = tx[FUND].split()
+                    yield "{} {} {} Fund Series {} {} A {} {} {} ${:.4f} {:.4f}".format(
+                          tx[DATE].strftime('%d-%b-%Y'), tx[DESC], name_key(company), company, code, tx[LOAD],
+                          dollars(tx[GROSS]), dollars(tx[GROSS]), tx[PRICE], tx[UNITS])
+
+    def iter_funds(self, num:int):
+        """
+        copied funds report: owner, date, then for each plan the fund balances and prices
+        """
+        yield self.rand.choice(GEN_OWNERS)
+        yield "{} Holdings".format(START_DATE.strftime('%d-%b-%Y'))
+        prices = self.gen_prices(num)
+        for plan in GEN_PLANS:
+            yield "{} Plan: {} {}".format(FUND.upper(), plan, GEN_PLAN_IDS[plan])
+            for pr_plan, fund, bal, price in prices:
+                if pr_plan == plan:
+                    company, code = fund.split()
+                    yield "{} Fund Series A {}-{} {} {:.4f} ${:.4f} {} {} $0.00 0.00% 0.00 A".format(
+                          name_key(company), company, code, ACCOUNT_NUM, bal, price, dollars(bal * price),
+                          dollars(bal * price))
+
+    def iter_qtrep(self, num:int):
+        """
+        lines as pdftotext gives them for a Monarch Quarterly Report: owner, 'Page 1', period, then the plan holdings
+        """
+        yield self.rand.choice(GEN_OWNERS)
+        yield "Page 1 of 12"
+        yield "For the period Jan 1, 2019 to Mar 31, 2019"
+        yield "Account Statement"
+        plan = None
+        for pr_plan, fund, bal, price in self.gen_prices(num):
+            if pr_plan != plan:
+                if plan is not None:
+                    yield "Transaction Details"
+                plan = pr_plan
+                yield "{} {}  (Individual) Client Name".format(plan, GEN_PLAN_IDS[plan])
+            company, code = fund.split()
+            yield "{} - {} - ".format(COMPANY_NAME[company], code)
+            yield "{} Fund Series A".format(name_key(company))
+            yield ACCOUNT_NUM
+            yield "${:.4f}".format(price)
+            yield "{:.4f}".format(bal)
+            yield dollars(bal * price)
+        yield "Transaction Details"
+        yield "Disclosure"
+
+    def iter_lines(self, kind:str, num:int):
+        if kind not in REPORT_KINDS:
+            raise Exception("UNKNOWN report kind '{}'! Use one of {}".format(kind, REPORT_KINDS))
+        for line in getattr(self, 'iter_' + kind)(num):
+            yield line + '\n'
+
+    def write_report(self, kind:str, num:int, out_file:str) -> str:
+        with open(out_file, 'w', encoding='utf-8') as ofp:
+            ofp.writelines(self.iter_lines(kind, num))
+        return out_file
+
+# END class MonarchReportGenerator
+
+
+def report_file_name(out_dir:str, kind:str, num:int, seed:int=0) -> str:
+    return osp.join(out_dir, "gen_{}_{}_s{}.txt".format(kind, num, seed))
+
+
+def gen_monarch_reports_main(args:list) -> list:
+    arg_parser = ArgumentParser(description='Write synthetic Monarch report text files', prog='genMonarchReports.py')
+    arg_parser.add_argument('-k', '--kinds', nargs='+', default=REPORT_KINDS, choices=REPORT_KINDS, help='report kinds')
+    arg_parser.add_argument('-n', '--records', nargs='+', type=int, default=[1000], help='records in each report')
+    arg_parser.add_argument('-o', '--out', default='.', help='folder for the report files')
+    arg_parser.add_argument('-s', '--seed', type=int, default=0, help='random seed: same seed, same reports')
+    opts = arg_parser.parse_args(args)
+
+    os.makedirs(opts.out, exist_ok=True)
+    files = []
+    for kind in opts.kinds:
+        for num in opts.records:
+            out_file = MonarchReportGenerator(opts.seed).write_report(kind, num,
+                                                                      report_file_name(opts.out, kind, num, opts.seed))
+            print_info("{}: {} records".format(out_file, num), GREEN)
+            files.append(out_file)
+    return files
+
+
+if __name__ == '__main__':
+    import sys
+    gen_monarch_reports_main(sys.argv[1:])
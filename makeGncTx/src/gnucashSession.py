@@ -10,23 +10,27 @@ __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __python_version__ = 3.6
 __created__ = '2019-07-01'
-__updated__ = '2019-08-12'
+__updated__ = '2019-08-29'
 
 import copy
 import re
 from gnucash import Session, Book, Account, Transaction, Split, GncNumeric, GncPrice, GncPriceDB, GncCommodity
 from gnucash.gnucash_core_c import CREC
 from Configuration import *
+from perfMetrics import *
+from perfProfile import *
+from recordSnapshot import is_snapshot, load_snapshot
 
 
 class GnucashSession:
     """
     Create and manage a Gnucash session
     """
-    def __init__(self, p_mrec:InvestmentRecord, p_mode:str, p_gncfile:str, p_debug:bool, p_domain:str,
+    def __init__(self, p_mrec, p_mode:str, p_gncfile:str, p_debug:bool, p_domain:str,
                  p_pdb:GncPriceDB=None, p_book:Book=None, p_root:Account=None,
-                 p_curr:GncCommodity=None, p_grec:InvestmentRecord=None):
+                 p_curr:GncCommodity=None, p_grec:InvestmentRecord=None, p_metrics:PerfMetrics=None):
         self.logger = Gnulog(p_debug)
+        self.metrics = p_metrics if p_metrics is not None else PerfMetrics(GNC)
         self.monarch_record = p_mrec
         self.gnucash_record = p_grec
         self.gnc_file  = p_gncfile
@@ -131,6 +135,7 @@ class GnucashSession:
                     # ALREADY HAVE THE FIRST ITEM OF THE PAIR
                     have_pair = True
                     pair_tx = itx
+                    self.metrics.count(PAIRS)
                     self.logger.print_info('*** Found the MATCH of a pair ***', YELLOW)
                     break
 
@@ -272,14 +277,17 @@ class GnucashSession:
         if not gtx.GetImbalanceValue().zero_p():
             self.logger.print_error("Gnc tx IMBALANCE = {}!! Roll back transaction changes!"
                                     .format(gtx.GetImbalanceValue().to_string()))
+            self.metrics.count(ROLLBACKS)
             gtx.RollbackEdit()
             return
 
         if self.mode == PROD:
             self.logger.print_info("Mode = {}: Commit transaction changes.\n".format(self.mode), GREEN)
             gtx.CommitEdit()
+            self.metrics.count(TRADES_CREATED)
         else:
             self.logger.print_info("Mode = {}: Roll back transaction changes!\n".format(self.mode), RED)
+            self.metrics.count(ROLLBACKS)
             gtx.RollbackEdit()
 
     def process_monarch_trade(self, mtx:dict, plan_type:str, ast_parent:Account, rev_acct:Account):
@@ -322,19 +330,20 @@ class GnucashSession:
         commod_tab = self.book.get_table()
         self.currency = commod_tab.lookup("ISO4217", "CAD")
 
-        plans = self.monarch_record.get_plans()
-        for plan_type in plans:
-            self.logger.print_info("\n\t\u0022Plan type = {}\u0022".format(plan_type), YELLOW)
+        # one tx at a time, so the Monarch record can be an InvestmentRecordReader on a file of any size
+        plan_accounts = {}
+        for plan_type, tx_type, mon_tx in self.monarch_record.iter_all_txs():
+            if plan_type not in plan_accounts:
+                self.logger.print_info("\n\t\u0022Plan type = {}\u0022".format(plan_type), YELLOW)
+                plan_accounts[plan_type] = self.get_asset_revenue_info(plan_type)
+            asset_parent, rev_acct = plan_accounts[plan_type]
 
-            asset_parent, rev_acct = self.get_asset_revenue_info(plan_type)
+            if tx_type == TRADE and self.domain != PRICE:
+                self.process_monarch_trade(mon_tx, plan_type, asset_parent, rev_acct)
 
-            if self.domain != PRICE:
-                for mon_tx in plans[plan_type][TRADE]:
-                    self.process_monarch_trade(mon_tx, plan_type, asset_parent, rev_acct)
-
-            if self.domain != TRADE:
-                for mon_tx in plans[plan_type][PRICE]:
-                    self.create_gnc_price_txs(mon_tx, asset_parent, rev_acct)
+            elif tx_type == PRICE and self.domain != TRADE:
+                self.create_gnc_price_txs(mon_tx, asset_parent, rev_acct)
+                self.metrics.count(PRICES_CREATED)
 
     def get_asset_revenue_info(self, plan_type:str):
         """
@@ -369,38 +378,42 @@ class GnucashSession:
     def prepare_session(self):
         """
         initialization needed for a Gnucash session
-        :return: message
+        :return: LogSummary of the session log
         """
         self.logger.print_info("prepare_session()", BLUE)
         msg = TEST
         try:
-            session = Session(self.gnc_file)
-            self.book = session.book
+            with self.metrics.stage('open session'):
+                session = Session(self.gnc_file)
+                self.book = session.book
 
             owner = self.monarch_record.get_owner()
             self.logger.print_info("Owner = {}".format(owner), GREEN)
             self.set_gnc_rec(InvestmentRecord(owner))
 
-            self.create_gnucash_info()
+            with self.metrics.stage('create gnucash info'):
+                self.create_gnucash_info()
 
-            if self.mode == PROD:
-                self.logger.print_info("Mode = {}: COMMIT Price DB edits and Save session.".format(self.mode), GREEN)
+            with self.metrics.stage('save session'):
+                if self.mode == PROD:
+                    self.logger.print_info("Mode = {}: COMMIT Price DB edits and Save session.".format(self.mode), GREEN)
 
-                if self.domain != TRADE:
-                    self.price_db.commit_edit()
+                    if self.domain != TRADE:
+                        self.price_db.commit_edit()
 
-                # only ONE session save for the entire run
-                session.save()
+                    # only ONE session save for the entire run
+                    session.save()
 
-            session.end()
-            session.destroy()
+                session.end()
+                session.destroy()
 
-            msg = self.logger.get_log()
+            msg = self.logger.get_summary()
 
         except Exception as se:
             msg = "prepare_session() EXCEPTION!! '{}'".format(repr(se))
             self.logger.print_error(msg)
             if "session" in locals() and session is not None:
+                self.metrics.count(ROLLBACKS)
                 session.end()
                 session.destroy()
             raise se
@@ -408,13 +421,20 @@ class GnucashSession:
         return msg
 
 
+@profiled('gnucashSession')
 def gnucash_session_main(args:list):
     """
     Take the information from an InvestmentRecord JSON file and produce Gnucash transactions to write to a Gnucash file
     :return: message
     """
     py_name = __file__.split('/')[-1]
-    usage = "usage: py36 {} <Monarch copy-text JSON file> <mode: prod|test> [Gnucash file]".format(py_name)
+    usage = "usage: py36 {} <Monarch copy-text JSON OR snapshot file> <mode: prod|test> [Gnucash file] [{} <JSON file>]" \
+            " [{}] [{} N] [{}] [{}]".format(py_name, METRICS_OPTION, PROFILE_OPTION, PROFILE_TOP_OPTION,
+                                            MEMORY_OPTION, STREAM_OPTION)
+    metrics_file, args = pop_option(args, METRICS_OPTION)
+    trace_memory, args = pop_option(args, MEMORY_OPTION, False)
+    stream, args = pop_option(args, STREAM_OPTION, False)
+    metrics = PerfMetrics(py_name, bool(trace_memory))
     if len(args) < 3:
         Gnulog.print_text("NOT ENOUGH parameters!", RED)
         Gnulog.print_text(usage, MAGENTA)
@@ -427,10 +447,6 @@ def gnucash_session_main(args:list):
         exit(427)
     Gnulog.print_text("\nMonarch file = {}".format(mon_file), GREEN)
 
-    # get Monarch transactions from the Monarch JSON file
-    with open(mon_file, 'r') as fp:
-        tx_coll = json.load(fp)
-
     gnc_file = args[1]
     if not osp.isfile(gnc_file):
         Gnulog.print_text("File path '{}' does not exist. Exiting...".format(gnc_file), RED)
@@ -439,8 +455,26 @@ def gnucash_session_main(args:list):
 
     mode = args[2].upper()
 
-    gncs = GnucashSession(tx_coll, mode, gnc_file, True, BOTH)
-    msg = gncs.prepare_session()
+    # get Monarch transactions from the Monarch JSON file: all at once OR one at a time while creating them
+    # OR all at once from a binary snapshot
+    try:
+        with open(mon_file, 'r', encoding='utf-8') as fp:
+            if is_snapshot(mon_file):
+                with metrics.stage('load snapshot'):
+                    mon_record = load_snapshot(mon_file)
+            else:
+                with metrics.stage('load json'):
+                    mon_record = InvestmentRecordReader(fp) if stream else InvestmentRecord.from_json(json.load(fp))
+
+            gncs = GnucashSession(mon_record, mode, gnc_file, True, BOTH, p_metrics=metrics)
+            msg = gncs.prepare_session().to_json()
+    finally:
+        # also stops tracing memory if the session failed
+        metrics.finish()
+    for line in metrics.report():
+        Gnulog.print_text(line, CYAN, False)
+    if metrics_file:
+        Gnulog.print_text("Saved metrics to: {}".format(metrics.save(metrics_file)), CYAN)
 
     Gnulog.print_text("\n >>> PROGRAM ENDED.", MAGENTA)
     return msg
@@ -0,0 +1,205 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# gnucashStatement.py -- create Gnucash transactions from a credit card statement: one per statement tx,
+#                        between the card account and an account to sort them from, in the same book as the Monarch txs
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-26'
+__updated__ = '2019-08-29'
+
+import copy
+from gnucash import Session, Account, Transaction, Split, GncNumeric
+from Configuration import *
+from perfMetrics import *
+from parseCardOfx import OFX_SUFFIXES, OfxStatementReader
+from parseCardCsv import CSV_SUFFIX, CsvStatementReader
+from parseCardOds import ODS_SUFFIX, OdsStatementReader
+
+CARD_OPTION: str = '--card'
+
+
+def open_statement(file_name:str):
+    """
+    :return: StatementRecord, OR a reader with the same methods that gives the txs one at a time
+    """
+    if file_name.lower().endswith(OFX_SUFFIXES):
+        return OfxStatementReader(file_name)
+    if file_name.lower().endswith(CSV_SUFFIX):
+        return CsvStatementReader(file_name)
+    if file_name.lower().endswith(ODS_SUFFIX):
+        return OdsStatementReader(file_name)
+    with open(file_name, 'r', encoding='utf-8') as fp:
+        return StatementRecord.from_json(json.load(fp))
+
+
+class StatementSession:
+    """
+    Create and manage a Gnucash session for the txs of a card statement
+    """
+    def __init__(self, p_srec, p_mode:str, p_gncfile:str, p_debug:bool, p_card:str=None, p_metrics:PerfMetrics=None):
+        self.logger = Gnulog(p_debug)
+        self.metrics = p_metrics if p_metrics is not None else PerfMetrics(GNC)
+        self.statement = p_srec
+        self.gnc_file = p_gncfile
+        self.mode = p_mode
+        # name of the card account in Gnucash; default is the account of the statement
+        self.card = p_card
+        self.book = None
+        self.root_acct = None
+        self.currency = None
+        self.gnc_util = GncUtilities()
+        self.logger.print_info("class StatementSession: Runtime = {}\n".format(dt.now().strftime(DATE_STR_FORMAT)), MAGENTA)
+
+    def get_card_accounts(self) -> (Account, Account):
+        """
+        :return: card account, account the statement txs go to until sorted in Gnucash
+        """
+        card_path = copy.copy(ACCT_PATHS[CARD])
+        card_path.append(self.card if self.card else self.statement.get_account())
+        self.logger.print_info("card_path = {}".format(str(card_path)))
+        card_acct = self.gnc_util.account_from_path(self.root_acct, card_path)
+        exp_acct = self.gnc_util.account_from_path(self.root_acct, ACCT_PATHS[CARD_EXP])
+        return card_acct, exp_acct
+
+    def create_gnc_statement_tx(self, stx:dict, card_acct:Account, exp_acct:Account):
+        """
+        Create and load a Gnucash transaction to the Gnucash file
+        :param       stx: StatementRecord tx
+        :param card_acct: the card account: a charge is a negative amount
+        :param  exp_acct: the other side of the tx
+        :return: nil
+        """
+        gtx = Transaction(self.book)
+        gtx.BeginEdit()
+
+        gtx.SetCurrency(self.currency)
+        tx_date = dt.strptime(stx[DATE], "%Y-%m-%d")
+        gtx.SetDate(tx_date.day, tx_date.month, tx_date.year)
+        gtx.SetDescription(stx[DESC])
+        if stx.get(TX_ID):
+            gtx.SetNum(stx[TX_ID])
+        gtx.SetNotes(" | ".join(stx[key] for key in (MEMO, CARD) if stx.get(key)))
+
+        spl_card = Split(self.book)
+        spl_card.SetParent(gtx)
+        spl_card.SetAccount(card_acct)
+        spl_card.SetValue(GncNumeric(stx[AMOUNT], 100))
+        spl_card.SetAmount(GncNumeric(stx[AMOUNT], 100))
+
+        spl_exp = Split(self.book)
+        spl_exp.SetParent(gtx)
+        spl_exp.SetAccount(exp_acct)
+        spl_exp.SetValue(GncNumeric(stx[AMOUNT] * -1, 100))
+        spl_exp.SetAmount(GncNumeric(stx[AMOUNT] * -1, 100))
+
+        # ROLL BACK if something went wrong and the two splits DO NOT balance
+        if not gtx.GetImbalanceValue().zero_p():
+            self.logger.print_error("Gnc tx IMBALANCE = {}!! Roll back transaction changes!"
+                                    .format(gtx.GetImbalanceValue().to_string()))
+            self.metrics.count(ROLLBACKS)
+            gtx.RollbackEdit()
+            return
+
+        if self.mode == PROD:
+            gtx.CommitEdit()
+        else:
+            self.metrics.count(ROLLBACKS)
+            gtx.RollbackEdit()
+
+    def create_gnucash_info(self):
+        """
+        one tx at a time, so the statement can be a reader on a file of any size
+        :return: nil
+        """
+        self.logger.print_info("create_gnucash_info()", BLUE)
+        self.root_acct = self.book.get_root_account()
+
+        accounts = None
+        for stx in self.statement.iter_txs():
+            # a reader has the account and currency of the statement, e.g. <CURDEF> of an OFX file, by the first tx
+            if accounts is None:
+                self.currency = self.book.get_table().lookup("ISO4217", self.statement.get_currency())
+                accounts = self.get_card_accounts()
+            self.create_gnc_statement_tx(stx, *accounts)
+            self.metrics.count(CARD_TXS)
+
+    def prepare_session(self):
+        """
+        initialization needed for a Gnucash session
+        :return: LogSummary of the session log
+        """
+        self.logger.print_info("prepare_session()", BLUE)
+        try:
+            with self.metrics.stage('open session'):
+                session = Session(self.gnc_file)
+                self.book = session.book
+
+            with self.metrics.stage('create gnucash info'):
+                self.create_gnucash_info()
+
+            with self.metrics.stage('save session'):
+                if self.mode == PROD:
+                    self.logger.print_info("Mode = {}: Save session.".format(self.mode), GREEN)
+                    session.save()
+                session.end()
+                session.destroy()
+
+            msg = self.logger.get_summary()
+
+        except Exception as se:
+            msg = "prepare_session() EXCEPTION!! '{}'".format(repr(se))
+            self.logger.print_error(msg)
+            if "session" in locals() and session is not None:
+                self.metrics.count(ROLLBACKS)
+                session.end()
+                session.destroy()
+            raise se
+
+        return msg
+
+
+def gnucash_statement_main(args:list):
+    """
+    Take the txs from a card statement file and produce Gnucash transactions to write to a Gnucash file
+    :return: message
+    """
+    usage = "usage: py36 gnucashStatement.py <statement file: OFX, QFX, CSV, ODS OR StatementRecord JSON> <Gnucash file>" \
+            " <mode: prod|test> [{} <Gnucash card account>] [{} <JSON file>]".format(CARD_OPTION, METRICS_OPTION)
+    card, args = pop_option(args, CARD_OPTION)
+    metrics_file, args = pop_option(args, METRICS_OPTION)
+    metrics = PerfMetrics('gnucashStatement.py')
+    if len(args) < 3:
+        print_error("NOT ENOUGH parameters!")
+        print_info(usage, MAGENTA)
+        exit(173)
+
+    stmt_file = args[0]
+    if not osp.isfile(stmt_file):
+        print_error("File path '{}' does not exist. Exiting...".format(stmt_file))
+        exit(178)
+    gnc_file = args[1]
+    if not osp.isfile(gnc_file):
+        print_error("File path '{}' does not exist. Exiting...".format(gnc_file))
+        exit(182)
+    mode = args[2].upper()
+
+    statement = open_statement(stmt_file)
+    msg = StatementSession(statement, mode, gnc_file, True, card, metrics).prepare_session().to_json()
+
+    metrics.finish()
+    for line in metrics.report():
+        print_info(line, CYAN, False)
+    if metrics_file:
+        print_info("Saved metrics to: {}".format(metrics.save(metrics_file)), CYAN)
+
+    print_info("\n >>> PROGRAM ENDED.", MAGENTA)
+    return msg
+
+
+if __name__ == '__main__':
+    gnucash_statement_main(sys.argv[1:])
@@ -0,0 +1,293 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# parseCardCsv.py -- read a credit card OR bank statement CSV file to a StatementRecord:
+#                    the layout is found from the first rows, then the rows are converted in batches
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-27'
+__updated__ = '2019-08-29'
+
+import re
+import csv
+from itertools import islice, repeat
+from operator import itemgetter
+from functools import lru_cache
+from collections import Counter
+from Configuration import *
+
+CSV_SUFFIX: str = '.csv'
+SNIFF_ROWS: int = 20
+CSV_BATCH: int = 4096
+
+# masked card number, e.g. '4500********7414'
+RE_CARD_NUM = re.compile(r"[0-9]{4}\*+[0-9]{4}$")
+# a column of the usual amounts, e.g. '-164.70', one per line; a line is blank if the row has NO debit OR credit
+RE_CENTS_LINES = re.compile(r"(?:-?[0-9]+\.[0-9]{2})?(?:\n(?:-?[0-9]+\.[0-9]{2})?)*")
+RE_BLANK_LINE = re.compile(r"^$", re.MULTILINE)
+# looks like a date of some format, e.g. '25/3/2018' OR '02/30/2018', NOT a note OR a total
+RE_DATE_LIKE = re.compile(r"[0-9]{1,4}[-/]([0-9]{1,2}|[A-Za-z]{3})[-/][0-9]{1,4}$")
+
+
+def mdy_date(text:str) -> str:
+    month, day, year = text.split('/')
+    return year + '-' + month.zfill(2) + '-' + day.zfill(2)
+
+
+def dmy_date(text:str) -> str:
+    day, month, year = text.split('/')
+    return year + '-' + month.zfill(2) + '-' + day.zfill(2)
+
+
+# date format -> function to make 'YYYY-MM-DD' from a date that is known to have that format; None if it already is
+# M/D/YYYY before D/M/YYYY: the Canadian bank downloads are month first when all the days are 12 or less
+CSV_DATES = {
+    '%Y-%m-%d' : None,
+    '%m/%d/%Y' : mdy_date,
+    '%d/%m/%Y' : dmy_date,
+    '%d-%b-%Y' : lambda text: dt.strptime(text, '%d-%b-%Y').strftime('%Y-%m-%d')
+}
+
+
+# a statement has only a few dates, so each one is checked once for all the batches
+@lru_cache(maxsize=4096)
+def is_date(text:str, date_format:str) -> bool:
+    try:
+        dt.strptime(text.strip(), date_format)
+        return True
+    except ValueError:
+        return False
+
+
+def is_amount(text:str) -> bool:
+    try:
+        to_cents(text)
+        return True
+    except Exception:
+        return False
+
+
+class CsvLayout:
+    """
+    Where each field is in the rows of a statement CSV file: found from a sample of the first rows,
+    OR from the first rows of text cells read another way, e.g. from a spreadsheet
+    """
+    def __init__(self, p_sample:str=None, p_rows:list=None):
+        self.dialect = csv.excel
+        if p_rows is None:
+            try:
+                self.dialect = csv.Sniffer().sniff(p_sample, delimiters=',;\t|')
+            except csv.Error:
+                pass
+            p_rows = csv.reader(p_sample.splitlines(), self.dialect)
+        rows = [row for row in p_rows if row]
+        if not rows:
+            raise Exception("NO rows to find the layout from!")
+        self.num_cols = Counter(len(row) for row in rows).most_common(1)[0][0]
+        full = [row for row in rows if len(row) == self.num_cols]
+        self.date_col, self.date_format = self.find_date(full)
+        # a header row has NO date where the other rows have one
+        self.has_header = not (len(rows[0]) > self.date_col and is_date(rows[0][self.date_col], self.date_format))
+        # everything else is found from the txs only, NOT e.g. a note or a total
+        data = [row for row in full if is_date(row[self.date_col], self.date_format)]
+
+        others = [col for col in range(self.num_cols) if col != self.date_col]
+        # the credit column of a card statement can be blank in all the first rows
+        self.amount_cols = [col for col in others if all(is_amount(row[col]) for row in data if row[col].strip())]
+        if len(self.amount_cols) > 2:
+            self.amount_cols = [col for col in self.amount_cols if any(row[col].strip() for row in data)]
+        if not 1 <= len(self.amount_cols) <= 2:
+            raise Exception("found {} amount columns: need a signed amount OR debit and credit!"
+                            .format(len(self.amount_cols)))
+        others = [col for col in others if col not in self.amount_cols]
+        cards = [col for col in others if all(RE_CARD_NUM.match(row[col].strip()) for row in data)]
+        self.card_col = cards[0] if cards else None
+        others = [col for col in others if col != self.card_col]
+        if not others:
+            raise Exception("NO description column!")
+        # the description is the widest text
+        self.desc_col = max(others, key=lambda col: sum(len(row[col]) for row in data))
+
+    def find_date(self, data:list) -> (int, str):
+        """
+        :return: the first column and format with the most dates: NOT in all the rows,
+                 as some can be e.g. a note or a total
+        """
+        best = (0, None, None)
+        for col in range(self.num_cols):
+            for date_format in CSV_DATES:
+                count = sum(1 for row in data if is_date(row[col], date_format))
+                if count > best[0]:
+                    best = (count, col, date_format)
+        if not best[0]:
+            raise Exception("NO date column!")
+        return best[1], best[2]
+
+    def describe(self) -> str:
+        amounts = "signed amount {}".format(self.amount_cols[0]) if len(self.amount_cols) == 1 \
+            else "debit {} credit {}".format(*self.amount_cols)
+        return "{} columns{}: date {} '{}', description {}, {}, card {}".format(
+            self.num_cols, ' + header' if self.has_header else '', self.date_col, self.date_format,
+            self.desc_col, amounts, self.card_col)
+
+# END class CsvLayout
+
+
+def blank_cents(text:str) -> int:
+    return to_cents(text) if text.strip() else 0
+
+
+def column_cents(column:tuple) -> list:
+    """
+    :return: integer cents of each amount in the column, 0 if blank
+    """
+    lines = '\n'.join(column)
+    # the usual column is converted without a python call for each amount
+    if RE_CENTS_LINES.fullmatch(lines):
+        return list(map(int, RE_BLANK_LINE.sub('0', lines.replace('.', '')).split('\n')))
+    return list(map(blank_cents, column))
+
+
+def dated_rows(lay:CsvLayout, rows:list, p_first:int) -> list:
+    """
+    :param     lay: layout of the rows
+    :param    rows: text cells of each row
+    :param p_first: number of the first of these rows in the file, for the error message
+    :return: the rows with the number of columns and a date of the layout, e.g. NOT a blank line, a note or a total
+    """
+    full = [row for row in rows if len(row) == lay.num_cols]
+    good = {text: is_date(text, lay.date_format) for text in set(map(itemgetter(lay.date_col), full))}
+    if all(good.values()):
+        return full
+    for num, row in enumerate(rows, p_first):
+        text = row[lay.date_col] if len(row) == lay.num_cols else ''
+        # e.g. '25/03/2018' in a file of D/M dates that looked like M/D dates in the first rows
+        if not good.get(text, True) and RE_DATE_LIKE.match(text.strip()):
+            raise Exception("row {}: '{}' is NOT a date of format '{}' like the first rows!"
+                            .format(num, text.strip(), lay.date_format))
+    return [row for row in full if good[row[lay.date_col]]]
+
+
+def convert_rows(lay:CsvLayout, rows:list) -> list:
+    """
+    :param lay: layout of the rows
+    :param rows: text cells of each row, all with the number of columns of the layout and a date, see dated_rows()
+    :return: StatementRecord txs
+    """
+    cols = list(zip(*rows))
+    dates = list(map(str.strip, cols[lay.date_col]))
+    to_date = CSV_DATES[lay.date_format]
+    if to_date is not None:
+        # a statement has only a few dates, so convert each one once
+        dates = map({text: to_date(text) for text in set(dates)}.__getitem__, dates)
+    if len(lay.amount_cols) == 1:
+        amounts = column_cents(cols[lay.amount_cols[0]])
+    else:
+        # debit is a charge, so negative, as in the OFX files
+        amounts = map(int.__sub__, column_cents(cols[lay.amount_cols[1]]), column_cents(cols[lay.amount_cols[0]]))
+    # trim the fixed width padding, e.g. 'QUICKIE #60              OTTAWA       ON '
+    descs = map(' '.join, map(str.split, cols[lay.desc_col]))
+    if lay.card_col is None:
+        return list(map(dict, map(zip, repeat([DATE, AMOUNT, DESC]), zip(dates, amounts, descs))))
+    cards = map(str.strip, cols[lay.card_col])
+    return list(map(dict, map(zip, repeat([DATE, AMOUNT, DESC, CARD]), zip(dates, amounts, descs, cards))))
+
+
+class CsvStatementReader:
+    """
+    Read a statement CSV file one batch of rows at a time with the C csv reader; each column of a batch is converted
+    at once. Has the StatementRecord methods that a Gnucash session uses; the txs can only be read ONCE.
+    """
+    def __init__(self, p_file:str, p_batch:int=CSV_BATCH, p_encoding:str='utf-8'):
+        self.filename = p_file
+        self.batch = p_batch
+        self.encoding = p_encoding
+        with open(p_file, 'r', encoding=p_encoding, errors='replace', newline='') as cfp:
+            self.layout = CsvLayout(''.join(islice(cfp, SNIFF_ROWS)))
+        self.date = dtnow
+
+    def get_account(self):
+        return UNKNOWN
+
+    def get_currency(self):
+        return DEF_CURR
+
+    def get_filename(self):
+        return self.filename
+
+    def get_date_str(self):
+        return self.date.strftime(DATE_STR_FORMAT)
+
+    def iter_batches(self):
+        """
+        :return: iterator of lists of StatementRecord txs
+        """
+        lay = self.layout
+        with open(self.filename, 'r', encoding=self.encoding, errors='replace', newline='') as cfp:
+            reader = csv.reader(cfp, lay.dialect)
+            first = 1
+            if lay.has_header:
+                next(reader, None)
+                first += 1
+            while True:
+                rows = list(islice(reader, self.batch))
+                if not rows:
+                    return
+                batch = dated_rows(lay, rows, first)
+                first += len(rows)
+                if batch:
+                    yield convert_rows(lay, batch)
+
+    def iter_txs(self):
+        for batch in self.iter_batches():
+            yield from batch
+
+
+def parse_card_csv(file_name:str) -> StatementRecord:
+    """
+    :return: StatementRecord of all the txs in the CSV file
+    """
+    record = StatementRecord(p_fname=file_name)
+    for batch in CsvStatementReader(file_name).iter_batches():
+        record.txs.extend(batch)
+    return record
+
+
+def parse_card_csv_main(args:list) -> str:
+    usage = "usage: py36 parseCardCsv.py <CSV file> <mode: prod|test> [{}]".format(PRETTY_OPTION)
+    pretty = PRETTY_OPTION in args
+    args = [arg for arg in args if arg != PRETTY_OPTION]
+    if len(args) < 2:
+        print_error("NOT ENOUGH parameters!")
+        print_info(usage, MAGENTA)
+        exit(199)
+
+    csv_file = args[0]
+    if not osp.isfile(csv_file):
+        print_error("File path '{}' does not exist! Exiting...".format(csv_file))
+        exit(204)
+    mode = args[1].upper()
+
+    reader = CsvStatementReader(csv_file)
+    print_info("layout: {}".format(reader.layout.describe()), CYAN)
+    record = parse_card_csv(csv_file)
+    msg = "{}: {} txs".format(csv_file, record.get_size())
+    print_info(msg, GREEN)
+
+    if mode == PROD:
+        basename, _ = osp.splitext(csv_file)
+        out_file = basename + '_' + dt.now().strftime(DATE_STR_FORMAT) + ".json"
+        with open(out_file, 'w', encoding='utf-8') as fp:
+            record.write_json(fp, JSON_INDENT if pretty else None)
+        msg = "parseCardCsv created file: {}".format(out_file)
+        print_info(msg, CYAN)
+
+    return msg
+
+
+if __name__ == '__main__':
+    parse_card_csv_main(sys.argv[1:])
@@ -0,0 +1,224 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# parseCardOds.py -- read a credit card OR bank statement saved as an OpenDocument spreadsheet to a StatementRecord:
+#                    the rows of the first sheet are read from the zipped content.xml one at a time
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-28'
+__updated__ = '2019-08-29'
+
+import zipfile
+from itertools import islice
+from xml.etree.ElementTree import iterparse
+from Configuration import *
+from perfMetrics import pop_option
+from parseCardCsv import CsvLayout, dated_rows, convert_rows, SNIFF_ROWS, CSV_BATCH
+
+ODS_SUFFIX: str = '.ods'
+ODS_CONTENT: str = 'content.xml'
+SHEET_OPTION: str = '--sheet'
+
+TABLE_NS: str  = '{urn:oasis:names:tc:opendocument:xmlns:table:1.0}'
+OFFICE_NS: str = '{urn:oasis:names:tc:opendocument:xmlns:office:1.0}'
+TEXT_NS: str   = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+ODS_TABLE: str       = TABLE_NS + 'table'
+ODS_ROW: str         = TABLE_NS + 'table-row'
+ODS_CELL: str        = TABLE_NS + 'table-cell'
+ODS_COVERED: str     = TABLE_NS + 'covered-table-cell'
+ODS_NAME: str        = TABLE_NS + 'name'
+ODS_ROWS_REP: str    = TABLE_NS + 'number-rows-repeated'
+ODS_COLS_REP: str    = TABLE_NS + 'number-columns-repeated'
+ODS_VALUE_TYPE: str  = OFFICE_NS + 'value-type'
+ODS_VALUE: str       = OFFICE_NS + 'value'
+ODS_DATE_VALUE: str  = OFFICE_NS + 'date-value'
+ODS_PARA: str        = TEXT_NS + 'p'
+ODS_SPACE: str       = TEXT_NS + 's'
+ODS_SPACE_COUNT: str = TEXT_NS + 'c'
+ODS_TAB: str         = TEXT_NS + 'tab'
+ODS_BREAK: str       = TEXT_NS + 'line-break'
+
+# value types with the number in office:value
+ODS_NUMBERS = ('float', 'currency', 'percentage')
+
+
+def element_text(elem) -> str:
+    """
+    :return: text of a <text:p> and all its spans, with the <text:s/> runs of spaces put back
+    """
+    parts = [elem.text or '']
+    for child in elem:
+        if child.tag == ODS_SPACE:
+            parts.append(' ' * int(child.get(ODS_SPACE_COUNT, '1')))
+        elif child.tag == ODS_TAB:
+            parts.append('\t')
+        elif child.tag == ODS_BREAK:
+            parts.append('\n')
+        else:
+            parts.append(element_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def cell_text(cell) -> str:
+    """
+    :return: the value of the cell as it would be in a CSV file: dates as 'YYYY-MM-DD', numbers as the plain value,
+             NOT as displayed, e.g. '-62.2' for '-$62.20'
+    """
+    value_type = cell.get(ODS_VALUE_TYPE)
+    if value_type in ODS_NUMBERS:
+        return cell.get(ODS_VALUE, '')
+    if value_type == 'date':
+        return cell.get(ODS_DATE_VALUE, '')[:10]
+    return '\n'.join(element_text(para) for para in cell if para.tag == ODS_PARA)
+
+
+class OdsStatementReader:
+    """
+    Walk content.xml of the spreadsheet with iterparse straight from the zip file: each row is cleared and removed
+    from its parent once it is read, so memory stays the same for any number of rows.
+    Has the StatementRecord methods that a Gnucash session uses; the txs can only be read ONCE.
+    """
+    def __init__(self, p_file:str, p_sheet:str=None, p_batch:int=CSV_BATCH):
+        self.filename = p_file
+        self.sheet = p_sheet
+        self.batch = p_batch
+        self.layout = None
+        self.date = dtnow
+
+    def get_account(self):
+        return UNKNOWN
+
+    def get_currency(self):
+        return DEF_CURR
+
+    def get_filename(self):
+        return self.filename
+
+    def get_date_str(self):
+        return self.date.strftime(DATE_STR_FORMAT)
+
+    def iter_rows(self):
+        """
+        :return: iterator of the text cells of each row of the sheet that has any text; repeated cells and rows
+                 are expanded, except for the runs of empty cells at the end of a row and empty rows
+        """
+        with zipfile.ZipFile(self.filename) as zfp, zfp.open(ODS_CONTENT) as cfp:
+            parents = []
+            in_sheet = False
+            for event, elem in iterparse(cfp, events=('start', 'end')):
+                if event == 'start':
+                    parents.append(elem)
+                    if elem.tag == ODS_TABLE:
+                        in_sheet = self.sheet is None or elem.get(ODS_NAME) == self.sheet
+                    continue
+                parents.pop()
+                if elem.tag == ODS_TABLE and in_sheet:
+                    return
+                if elem.tag != ODS_ROW:
+                    continue
+                if in_sheet:
+                    row = []
+                    blanks = 0
+                    for cell in elem:
+                        if cell.tag not in (ODS_CELL, ODS_COVERED):
+                            continue
+                        text = cell_text(cell)
+                        num = int(cell.get(ODS_COLS_REP, '1'))
+                        if text:
+                            # the empty cells before this one are real columns
+                            row.extend([''] * blanks)
+                            row.extend([text] * num)
+                            blanks = 0
+                        else:
+                            blanks += num
+                    if row:
+                        for _ in range(int(elem.get(ODS_ROWS_REP, '1'))):
+                            yield row
+                # the row is done: drop it and anything before it from the tree
+                elem.clear()
+                if parents:
+                    del parents[-1][:]
+
+    def get_layout(self, rows:list) -> CsvLayout:
+        if self.layout is None:
+            width = max(map(len, rows))
+            self.layout = CsvLayout(p_rows=[row + [''] * (width - len(row)) for row in rows])
+        return self.layout
+
+    def iter_batches(self):
+        """
+        rows are numbered in the error messages as the rows with text, without the empty rows
+        :return: iterator of lists of StatementRecord txs
+        """
+        rows = self.iter_rows()
+        sniffed = list(islice(rows, SNIFF_ROWS))
+        if not sniffed:
+            return
+        lay = self.get_layout(sniffed)
+        first = 2 if lay.has_header else 1
+        batch = sniffed[1:] if lay.has_header else sniffed
+        while batch:
+            # a row with less text is padded, one with more e.g. has a note at the end;
+            # then the same rows as in a CSV file are skipped, e.g. a note or a total without a date
+            txs = dated_rows(lay, [row[:lay.num_cols] + [''] * (lay.num_cols - len(row)) for row in batch], first)
+            if txs:
+                yield convert_rows(lay, txs)
+            first += len(batch)
+            batch = list(islice(rows, self.batch))
+
+    def iter_txs(self):
+        for batch in self.iter_batches():
+            yield from batch
+
+# END class OdsStatementReader
+
+
+def parse_card_ods(file_name:str, p_sheet:str=None) -> StatementRecord:
+    """
+    :return: StatementRecord of all the txs in the sheet
+    """
+    record = StatementRecord(p_fname=file_name)
+    for batch in OdsStatementReader(file_name, p_sheet).iter_batches():
+        record.txs.extend(batch)
+    return record
+
+
+def parse_card_ods_main(args:list) -> str:
+    usage = "usage: py36 parseCardOds.py <ODS file> <mode: prod|test> [{}] [{} <sheet name>]"\
+            .format(PRETTY_OPTION, SHEET_OPTION)
+    pretty, args = pop_option(args, PRETTY_OPTION, has_value=False)
+    sheet, args = pop_option(args, SHEET_OPTION)
+    if len(args) < 2:
+        print_error("NOT ENOUGH parameters!")
+        print_info(usage, MAGENTA)
+        exit(211)
+
+    ods_file = args[0]
+    if not osp.isfile(ods_file):
+        print_error("File path '{}' does not exist! Exiting...".format(ods_file))
+        exit(216)
+    mode = args[1].upper()
+
+    record = parse_card_ods(ods_file, sheet)
+    msg = "{}: {} txs".format(ods_file, record.get_size())
+    print_info(msg, GREEN)
+
+    if mode == PROD:
+        basename, _ = osp.splitext(ods_file)
+        out_file = basename + '_' + dt.now().strftime(DATE_STR_FORMAT) + ".json"
+        with open(out_file, 'w', encoding='utf-8') as fp:
+            record.write_json(fp, JSON_INDENT if pretty else None)
+        msg = "parseCardOds created file: {}".format(out_file)
+        print_info(msg, CYAN)
+
+    return msg
+
+
+if __name__ == '__main__':
+    parse_card_ods_main(sys.argv[1:])
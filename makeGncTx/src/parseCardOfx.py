@@ -0,0 +1,203 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# parseCardOfx.py -- read a credit card OR bank statement in OFX/QFX format, SGML (1.x) or XML (2.x),
+#                    one <STMTTRN> at a time, to a StatementRecord
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-26'
+__updated__ = '2019-08-26'
+
+import re
+from html import unescape
+from Configuration import *
+
+OFX_SUFFIXES = ('.ofx', '.qfx')
+OFX_CHUNK: int = 256 * 1024
+
+# a start or end tag and the text up to the next tag: SGML leaves have NO end tag, e.g. <TRNAMT>-164.70<FITID>...
+RE_OFX_TOKEN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+# the leaves of one <STMTTRN>, aggregates like <PAYEE> have NO text
+RE_OFX_LEAF = re.compile(r"<([A-Za-z0-9.]+)>([^<]*)")
+RE_STMTTRN_END = re.compile(r"</STMTTRN>", re.IGNORECASE)
+# SGML header CHARSET:1252, OR XML declaration encoding="UTF-8"
+RE_OFX_CHARSET = re.compile(r"CHARSET:\s*([A-Za-z0-9-]+)|encoding=\"([A-Za-z0-9-]+)\"")
+# e.g. 'KANATA, ON;CC#4500********7414'
+RE_MEMO_CARD = re.compile(r";?\s*CC#\s*([0-9]{4}\*+[0-9]{4})")
+
+STMTTRN: str  = 'STMTTRN'
+DTPOSTED: str = 'DTPOSTED'
+TRNAMT: str   = 'TRNAMT'
+TRNTYPE: str  = 'TRNTYPE'
+FITID: str    = 'FITID'
+OFX_NAME: str = 'NAME'
+OFX_MEMO: str = 'MEMO'
+ACCTID: str   = 'ACCTID'
+CURDEF: str   = 'CURDEF'
+
+
+def ofx_encoding(file_name:str) -> str:
+    """
+    :return: python codec for the header: SGML files are usually Windows code pages, XML files UTF-8
+    """
+    with open(file_name, 'rb') as ofp:
+        head = ofp.read(1024).decode('latin-1')
+    re_match = RE_OFX_CHARSET.search(head)
+    charset = (re_match.group(1) or re_match.group(2)) if re_match else ''
+    if charset.isdigit():
+        return 'cp' + charset
+    if charset and charset.upper() not in ('NONE', 'USASCII'):
+        return charset
+    return 'utf-8' if head.lstrip().startswith('<?xml') else 'cp1252'
+
+
+def ofx_date(dt_text:str) -> str:
+    """
+    :param dt_text: OFX datetime, e.g. '20181122120000.000[-5:EST]' OR just '20181122'
+    :return: 'YYYY-MM-DD'
+    """
+    if len(dt_text) < 8 or not dt_text[:8].isdigit():
+        raise Exception("'{}' is NOT an OFX date!".format(dt_text))
+    return "{}-{}-{}".format(dt_text[:4], dt_text[4:6], dt_text[6:8])
+
+
+def ofx_text(text:str) -> str:
+    text = ' '.join(text.split())
+    return unescape(text) if '&' in text else text
+
+
+class OfxStatementReader:
+    """
+    Tokenize an OFX file a chunk at a time, never as a whole document, and give a typed tx for each <STMTTRN>.
+    Has the StatementRecord methods that a Gnucash session uses; the txs can only be read ONCE.
+    The account and currency come before the txs in the file, so are set by the time the first tx is given.
+    """
+    def __init__(self, p_file:str, p_chunk:int=OFX_CHUNK):
+        self.filename = p_file
+        self.chunk = p_chunk
+        self.encoding = ofx_encoding(p_file)
+        # leaves outside the txs, e.g. ACCTID, CURDEF, DTSTART, DTEND
+        self.fields = {}
+        self.date = dtnow
+
+    def get_account(self):
+        return self.fields.get(ACCTID, UNKNOWN)
+
+    def get_currency(self):
+        return self.fields.get(CURDEF, DEF_CURR)
+
+    def get_filename(self):
+        return self.filename
+
+    def get_date_str(self):
+        return self.date.strftime(DATE_STR_FORMAT)
+
+    @staticmethod
+    def make_tx(block:str) -> dict:
+        """
+        :param block: text between <STMTTRN> and </STMTTRN>
+        :return: StatementRecord tx
+        """
+        leaves = {tag.upper(): text for tag, text in RE_OFX_LEAF.findall(block) if text and not text.isspace()}
+        tx = {DATE: ofx_date(leaves[DTPOSTED].strip()), AMOUNT: to_cents(leaves[TRNAMT]),
+              DESC: ofx_text(leaves.get(OFX_NAME, ''))}
+        if FITID in leaves:
+            tx[TX_ID] = leaves[FITID].strip()
+        if TRNTYPE in leaves:
+            tx[TX_KIND] = leaves[TRNTYPE].strip()
+        memo = leaves.get(OFX_MEMO)
+        if memo:
+            re_match = RE_MEMO_CARD.search(memo)
+            if re_match:
+                tx[CARD] = re_match.group(1)
+                memo = memo[:re_match.start()] + memo[re_match.end():]
+            tx[MEMO] = ofx_text(memo)
+        return tx
+
+    def iter_txs(self):
+        """
+        :return: iterator of StatementRecord txs, in the order of the file
+        """
+        with open(self.filename, 'r', encoding=self.encoding, errors='replace') as ofp:
+            buffer = ''
+            pos = 0
+            eof = False
+            while True:
+                re_match = RE_OFX_TOKEN.search(buffer, pos)
+                # the text of a token runs to the next '<', so is only complete if that is in the buffer
+                if not eof and (re_match is None or re_match.end() == len(buffer)):
+                    data = ofp.read(self.chunk)
+                    eof = not data
+                    buffer = buffer[pos:] + data
+                    pos = 0
+                    continue
+                if re_match is None:
+                    return
+                is_end, tag, text = re_match.groups()
+                if not is_end and tag.upper() == STMTTRN:
+                    end_match = RE_STMTTRN_END.search(buffer, re_match.end())
+                    if end_match is None:
+                        if eof:
+                            raise Exception("<{}> is NOT closed in '{}'!".format(STMTTRN, self.filename))
+                        data = ofp.read(self.chunk)
+                        eof = not data
+                        buffer = buffer[re_match.start():] + data
+                        pos = 0
+                        continue
+                    yield self.make_tx(buffer[re_match.end():end_match.start()])
+                    pos = end_match.end()
+                    continue
+                if not is_end and text and not text.isspace():
+                    self.fields[tag.upper()] = text.strip()
+                pos = re_match.end()
+
+
+def parse_ofx(file_name:str) -> StatementRecord:
+    """
+    :return: StatementRecord of all the txs in the OFX file
+    """
+    reader = OfxStatementReader(file_name)
+    record = StatementRecord(p_fname=file_name)
+    for tx in reader.iter_txs():
+        record.add_tx(tx)
+    record.set_account(reader.get_account())
+    record.set_currency(reader.get_currency())
+    return record
+
+
+def parse_card_ofx_main(args:list) -> str:
+    usage = "usage: py36 parseCardOfx.py <OFX OR QFX file> <mode: prod|test> [{}]".format(PRETTY_OPTION)
+    pretty = PRETTY_OPTION in args
+    args = [arg for arg in args if arg != PRETTY_OPTION]
+    if len(args) < 2:
+        print_error("NOT ENOUGH parameters!")
+        print_info(usage, MAGENTA)
+        exit(188)
+
+    ofx_file = args[0]
+    if not osp.isfile(ofx_file):
+        print_error("File path '{}' does not exist! Exiting...".format(ofx_file))
+        exit(193)
+    mode = args[1].upper()
+
+    record = parse_ofx(ofx_file)
+    msg = "{}: {} txs for card {}".format(ofx_file, record.get_size(), record.get_account())
+    print_info(msg, GREEN)
+
+    if mode == PROD:
+        basename, _ = osp.splitext(ofx_file)
+        out_file = basename + '_' + dt.now().strftime(DATE_STR_FORMAT) + ".json"
+        with open(out_file, 'w', encoding='utf-8') as fp:
+            record.write_json(fp, JSON_INDENT if pretty else None)
+        msg = "parseCardOfx created file: {}".format(out_file)
+        print_info(msg, CYAN)
+
+    return msg
+
+
+if __name__ == '__main__':
+    parse_card_ofx_main(sys.argv[1:])
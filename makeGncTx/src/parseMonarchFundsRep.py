@@ -10,11 +10,11 @@ __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __python_version__ = 3.6
 __created__ = '2019-06-02'
-__updated__ = '2019-06-16'
+__updated__ = '2019-08-23'
 
 import re
-import json
 from Configuration import *
+from recordArchive import ARCHIVE_OPTION, archive_record
 
 
 class ParseMonarchFundsReport:
@@ -23,7 +23,7 @@ class ParseMonarchFundsReport:
 
     def parse_funds_info(self, file_name, ts):
         """
-        :param file_name: string: monarch transaction report text file to parse
+        :param file_name: string: monarch transaction report text file to parse OR iterable of the report lines
         :param        ts: string: timestamp for file name
         parsing for NEW format txt files, ~ May 31, 2019, just COPIED from Monarch web page,
         as new Monarch pdf's are no longer practical to use -- extracted text just too inconsistent...
@@ -46,7 +46,7 @@ class ParseMonarchFundsReport:
         tx_coll = InvestmentRecord()
         mon_state = FIND_OWNER
         plan_type = UNKNOWN
-        with open(file_name) as fp:
+        with GncUtilities.line_source(file_name) as fp:
             ct = 0
             for line in fp:
                 ct += 1
@@ -85,14 +85,18 @@ class ParseMonarchFundsReport:
                     print_info("Final price = {}".format(price))
 
                     curr_tx = {TRADE_DATE: tx_date, FUND_CMPY: fd_co, FUND: fund, UNIT_BAL: bal, PRICE: price}
-                    tx_coll.add_tx(plan_type, curr_tx)
+                    tx_coll.add_tx(plan_type, PRICE, curr_tx)
                     print_info('ADD current Tx to Collection!', GREEN)
 
         return tx_coll
 
 
 def mon_funds_rep_main(args):
-    usage = "usage: py36 parseMonarchFundsRep.py <monarch copy-text file> <gnucash file> <mode: prod|test>"
+    usage = "usage: py36 parseMonarchFundsRep.py <monarch copy-text file> <gnucash file> <mode: prod|test>" \
+            " [{}] [{}]".format(PRETTY_OPTION, ARCHIVE_OPTION)
+    pretty = PRETTY_OPTION in args
+    archive = ARCHIVE_OPTION in args
+    args = [arg for arg in args if arg not in (PRETTY_OPTION, ARCHIVE_OPTION)]
     if len(args) < 3:
         print_error("NOT ENOUGH parameters!")
         print_info(usage, MAGENTA)
@@ -139,10 +143,13 @@ def mon_funds_rep_main(args):
             # add a timestamp to get a unique file name
             out_file = path + '/' + basename + '_' + now + ".json"
             print_info("\nOUTPUT FILE: \u0022{}\u0022".format(out_file))
-            fp = open(out_file, 'w', encoding='utf-8')
-            json.dump(record.to_json(), fp, indent=4)
+            with open(out_file, 'w', encoding='utf-8') as fp:
+                record.write_json(fp, JSON_INDENT if pretty else None)
             msg = "parseMonarchTxRep created file: {}".format(out_file)
 
+        if archive:
+            archive_record(record)
+
     except Exception as e:
         msg = "mon_funds_rep_main() EXCEPTION!! '{}'".format(repr(e))
         print_error(msg)
@@ -11,19 +11,58 @@ __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __python_version__ = 3.6
 __created__ = '2019-04-28'
-__updated__ = '2019-06-05'
+__updated__ = '2019-08-29'
 
 import re
 import copy
-import json
-from gnucash import Session, GncNumeric, GncPrice
+from collections import deque
 from Configuration import *
+from perfMetrics import *
+from perfProfile import *
+from recordArchive import ARCHIVE_OPTION, archive_record
+
+
+# events: the named group that matched in each state
+OWNER_EVT: str   = 'owner'
+START_EVT: str   = 'start'
+DATE_EVT: str    = 'year'
+PLAN_EVT: str    = 'plan'
+FINISH_EVT: str  = 'finish'
+ENDPLAN_EVT: str = 'endplan'
+COMP1_EVT: str   = 'code1'
+COMP2_EVT: str   = 'code2'
+
+# state -> (match of ONE pattern with a named group for each event, event -> next state);
+# the events are in the order of the alternatives, which is also the order they were checked before
+# the owner is anywhere in the line, all the others are at the start
+QTREP_STATES = {
+    FIND_OWNER   : (re.compile(r"(?P<owner>{}|{})".format(MON_MARK, MON_LULU)).search,
+                    {OWNER_EVT: FIND_START}),
+    FIND_START   : (re.compile(r"(?P<start>Page 1)").match,
+                    {START_EVT: FIND_DATE}),
+    FIND_DATE    : (re.compile(r"For the period (?P<first>.*) to (?P<month>\w{3}) (?P<day>\d{1,2}), (?P<year>\d{4})").match,
+                    {DATE_EVT: FIND_PLAN}),
+    FIND_PLAN    : (re.compile(r"(?P<finish>Disclosure)|(?P<plan>OPEN|TFSA|RRSP)").match,
+                    {FINISH_EVT: None, PLAN_EVT: FIND_COMPANY}),
+    FIND_COMPANY : (re.compile(r"(?P<endplan>Transaction Details)"
+                               r"|(?P<company1>.*) - (?P<code1>[0-9ATL]{3,5})"
+                               r"|(?:- )?(?P<code2>\d{3,5}) - (?P<company2>.*)").match,
+                    {ENDPLAN_EVT: FIND_PLAN, COMP1_EVT: FIND_COMPANY, COMP2_EVT: FIND_COMPANY})
+}
+RE_QTREP_PRICE = re.compile(r"\$([0-9,]{1,5})\.(\d{2,4})")
+# most lines from a fund to its price: 7 in the sample reports
+PRICE_WINDOW: int = 10
 
 
 # noinspection PyUnresolvedReferences
 class MonarchQrepToGncPrices:
-    def __init__(self, fmon, gnc_file, mode):
+    """
+    gnucash is only imported to open the session and create the prices, so the parsing can run without it
+    """
+    def __init__(self, fmon, gnc_file, mode, metrics=None):
+        from gnucash import Session
         self.prod = (mode == PROD)
+        self.metrics = metrics if metrics is not None else PerfMetrics(MON)
         self.mon_file = fmon
 
         self.session = Session(gnc_file)
@@ -37,119 +76,111 @@ class MonarchQrepToGncPrices:
         commod_tab = self.book.get_table()
         self.currency = commod_tab.lookup("ISO4217", "CAD")
 
-    def parse_monarch_qtrep(self):
+    def parse_monarch_qtrep(self, mon_lines=None):
         """
         PARSE FOR PRICES TO ADD TO THE PRICE DB
-        loop:
-            find: 'For the Period <date1> to <date2>' for the date for the prices
-            find: MON_MARK or MON_LULU as OWNER
-            find: 'Page 1' as the key to start finding prices
-            find: 'OPEN...' or 'TFSA...' or 'RRSP...' as Plan Type
+        :param mon_lines: iterable of the report lines, e.g. straight from a pdf extraction; default is self.mon_file
+        loop: ONE match of the pattern of the current state in QTREP_STATES on each line, then:
+            owner: MON_MARK or MON_LULU as OWNER
+            start: 'Page 1' as the key to start finding prices
+            date: 'For the Period <date1> to <date2>' for the date for the prices
+            plan: 'OPEN...' or 'TFSA...' or 'RRSP...' as Plan Type
                   use that as the key for this section of the Tx_Collection
-            find: '(match1) - (match2) (match3)...'
+            company: '(match1) - (match2) (match3)...'
                     1) use match1 as Fund Company, match2 as Fund Code for the account
                     2) use match3 as Fund Company, match2 as Fund Code for the account
-            find: '$price'
-            find: 'Transaction Details' as key to search for next Plan Type
-                OR: another match of 'Fund Company & Fund Code'
+                  then find '$price' in the next PRICE_WINDOW lines
+            endplan: 'Transaction Details' as key to search for next Plan Type
+            finish: 'Disclosure'
         :return: Configuration.InvestmentRecord object
         """
         print_info("parse_monarch_qtrep()\nRuntime = {}\n".format(strnow), MAGENTA)
 
-        # re searches
-        re_date    = re.compile(r"^For the period (.*) to (\w{3}) (\d{1,2}), (\d{4})")
-        re_mark    = re.compile(".*({}).*".format(MON_MARK))
-        re_lulu    = re.compile(".*({}).*".format(MON_LULU))
-        re_start   = re.compile(r"^Page 1.*")
-        re_comp1   = re.compile(r"^(.*) - ([0-9ATL]{3,5}).*")
-        re_comp2   = re.compile(r"^(- )?(\d{3,5}) - (.*)")
-        re_price   = re.compile(r"^\$([0-9,]{1,5})\.(\d{2,4}).*")
-        re_plan    = re.compile(r"(OPEN|TFSA|RRSP)(\s?.*)")
-        re_endplan = re.compile(r"^Transaction Details.*")
-        re_finish  = re.compile(r"^Disclosure.*")
-
         mon_state = FIND_OWNER
-        with open(self.mon_file) as fp:
+        with GncUtilities.line_source(self.mon_file if mon_lines is None else mon_lines) as fp:
+            # lines looked at for a price but to be parsed again
+            pending = deque()
             ct = 0
-            for line in fp:
-                ct += 1
-                if mon_state == FIND_OWNER:
-                    match_mark = re.match(re_mark, line)
-                    match_lulu = re.match(re_lulu, line)
-                    if match_mark or match_lulu:
-                        if match_mark:
-                            owner = match_mark.group(1)
-                        elif match_lulu:
-                            owner = match_lulu.group(1)
-                        print_info("{}/ Owner: {}".format(ct, owner), RED)
-                        tx_coll = InvestmentRecord(owner)
-                        mon_state = FIND_START
-                        continue
-
-                if mon_state == FIND_START:
-                    match_start = re.match(re_start, line)
-                    if match_start:
-                        print_info("{}/ Found Start!".format(ct), GREEN)
-                        mon_state = FIND_DATE
-                        continue
-
-                if mon_state == FIND_DATE:
-                    match_date = re.match(re_date, line)
-                    if match_date:
-                        day = match_date.group(3)
-                        month = match_date.group(2)
-                        year = match_date.group(4)
-                        datestring = "{}-{}-{}".format(year, month, day)
-                        pr_date = dt.strptime(datestring, '%Y-%b-%d')
-                        tx_coll.set_date(pr_date)
-                        print_info("date: {}".format(pr_date), CYAN)
-                        mon_state = FIND_PLAN
-                        continue
-
-                if mon_state == FIND_PLAN:
-                    match_finish = re.match(re_finish, line)
-                    if match_finish:
-                        print_info("{}/ FINISHED!".format(ct), RED)
+            lines = iter(fp)
+            while True:
+                # num: the number of this line, for the messages; ct: lines read
+                if pending:
+                    num, line = pending.popleft()
+                else:
+                    line = next(lines, None)
+                    if line is None:
                         break
-                    match_plan = re.match(re_plan, line)
-                    if match_plan:
-                        plan_type = match_plan.group(1)
-                        print_info("{}/ Plan type: {}".format(ct, plan_type), BLUE)
-                        mon_state = FIND_COMPANY
-                        continue
-
-                if mon_state == FIND_COMPANY:
-                    match_endsum = re.match(re_endplan, line)
-                    if match_endsum:
-                        print_info("{}/ END of '{}' plan.".format(ct, plan_type), BLUE)
-                        mon_state = FIND_PLAN
-                        continue
-                    match_comp1 = re.match(re_comp1, line)
-                    match_comp2 = re.match(re_comp2, line)
-                    if match_comp1 or match_comp2:
-                        if match_comp1:
-                            company = match_comp1.group(1)
-                            fund_code = match_comp1.group(2)
-                        elif match_comp2:
-                            company = match_comp2.group(3)
-                            fund_code = match_comp2.group(2)
-                        curr_tx = {FUND_CMPY: company, FUND_CODE: fund_code}
-                        print_info("{}/ Fund is: '{}:{}'".format(ct, company, fund_code), MAGENTA)
-                        mon_state = FIND_PRICE
-                        continue
-
-                if mon_state == FIND_PRICE:
-                    match_price = re.match(re_price, line)
-                    if match_price:
-                        dollar_str = match_price.group(1)
-                        cents_str = match_price.group(2)
-                        print_info("{}/ price = '${}.{}'".format(ct, dollar_str, cents_str), GREEN)
-                        curr_tx[DOLLARS] = dollar_str
-                        curr_tx[CENTS] = cents_str
-                        tx_coll.add_tx(plan_type, curr_tx)
-                        mon_state = FIND_COMPANY
-                        continue
+                    ct += 1
+                    num = ct
+                find, transitions = QTREP_STATES[mon_state]
+                match = find(line)
+                if not match:
+                    continue
+                event = next(name for name in transitions if match.group(name) is not None)
+                mon_state = transitions[event]
+
+                if event == OWNER_EVT:
+                    owner = match.group(OWNER_EVT)
+                    print_info("{}/ Owner: {}".format(num, owner), RED)
+                    tx_coll = InvestmentRecord(owner)
+
+                elif event == START_EVT:
+                    print_info("{}/ Found Start!".format(num), GREEN)
+
+                elif event == DATE_EVT:
+                    datestring = "{}-{}-{}".format(match.group('year'), match.group('month'), match.group('day'))
+                    pr_date = dt.strptime(datestring, '%Y-%b-%d')
+                    tx_coll.set_date(pr_date)
+                    print_info("date: {}".format(pr_date), CYAN)
+
+                elif event == FINISH_EVT:
+                    print_info("{}/ FINISHED!".format(num), RED)
+                    break
+
+                elif event == PLAN_EVT:
+                    plan_type = match.group(PLAN_EVT)
+                    print_info("{}/ Plan type: {}".format(num, plan_type), BLUE)
+
+                elif event == ENDPLAN_EVT:
+                    print_info("{}/ END of '{}' plan.".format(num, plan_type), BLUE)
+
+                else:
+                    if event == COMP1_EVT:
+                        company = match.group('company1')
+                        fund_code = match.group(COMP1_EVT)
+                    else:
+                        company = match.group('company2')
+                        fund_code = match.group(COMP2_EVT)
+                    curr_tx = {FUND_CMPY: company, FUND_CODE: fund_code}
+                    print_info("{}/ Fund is: '{}:{}'".format(num, company, fund_code), MAGENTA)
+
+                    # the price is a few lines after the fund: look ahead instead of a state for each line
+                    window = list(pending)
+                    pending.clear()
+                    while len(window) < PRICE_WINDOW:
+                        next_line = next(lines, None)
+                        if next_line is None:
+                            break
+                        ct += 1
+                        window.append((ct, next_line))
+                    for indx, (pr_ct, pr_line) in enumerate(window):
+                        match_price = RE_QTREP_PRICE.match(pr_line)
+                        if match_price:
+                            dollar_str = match_price.group(1)
+                            cents_str = match_price.group(2)
+                            print_info("{}/ price = '${}.{}'".format(pr_ct, dollar_str, cents_str), GREEN)
+                            curr_tx[DOLLARS] = dollar_str
+                            curr_tx[CENTS] = cents_str
+                            tx_coll.add_tx(plan_type, PRICE, curr_tx)
+                            pending.extend(window[indx+1:])
+                            break
+                    else:
+                        print_error("{}/ NO price within {} lines of fund '{}:{}'!"
+                                    .format(num, PRICE_WINDOW, company, fund_code))
+                        pending.extend(window)
 
+        self.metrics.count(LINES, ct)
+        self.metrics.count(PRICES, tx_coll.get_size())
         print_info("Found {} transactions.".format(tx_coll.get_size()))
         return tx_coll
 
@@ -159,6 +190,7 @@ class MonarchQrepToGncPrices:
         :param tx_coll: InvestmentRecord object: transactions to use to extract Gnucash prices
         :return: message
         """
+        from gnucash import GncNumeric, GncPrice
         print_info('get_prices_and_save()', MAGENTA)
 
         gncu = GncUtilities()
@@ -169,7 +201,7 @@ class MonarchQrepToGncPrices:
         try:
             for plan_type in tx_coll.plans:
                 print_info("\n\nPlan type = {}".format(plan_type))
-                for tx in tx_coll.plans[plan_type]:
+                for tx in tx_coll.plans[plan_type][PRICE]:
                     base = pow(10, len(tx[CENTS]))
                     int_price = int(tx[DOLLARS] + tx[CENTS])
                     val = GncNumeric(int_price, base)
@@ -229,6 +261,7 @@ class MonarchQrepToGncPrices:
                     pr.set_source_string("user:price")
                     pr.set_typestr('last')
                     pr.commit_edit()
+                    self.metrics.count(PRICES_CREATED)
 
                     if self.prod:
                         print_info("PROD: Add Price to DB.\n", GREEN)
@@ -249,6 +282,7 @@ class MonarchQrepToGncPrices:
         except Exception as e:
             msg = "get_prices_and_save() EXCEPTION!! '{}'".format(repr(e))
             print_error(msg)
+            self.metrics.count(ROLLBACKS)
             if "session" in locals() and self.session is not None:
                 self.session.end()
                 self.session.destroy()
@@ -257,8 +291,15 @@ class MonarchQrepToGncPrices:
         return msg
 
 
+@profiled('parseMonarchQtrRep')
 def mon_qtr_rep_main(args):
-    usage = "usage: py36 parseMonarchQtrRep.py <monarch pdf-text file> <gnucash file> <mode: prod|test>"
+    usage = "usage: py36 parseMonarchQtrRep.py <monarch pdf-text file> <gnucash file> <mode: prod|test>" \
+            " [{} <JSON file>] [{}] [{} N] [{}] [{}]".format(METRICS_OPTION, PROFILE_OPTION, PROFILE_TOP_OPTION,
+                                                            PRETTY_OPTION, ARCHIVE_OPTION)
+    metrics_file, args = pop_option(args, METRICS_OPTION)
+    pretty, args = pop_option(args, PRETTY_OPTION, False)
+    archive, args = pop_option(args, ARCHIVE_OPTION, False)
+    metrics = PerfMetrics('parseMonarchQtrRep.py')
     if len(args) < 3:
         print_error("NOT ENOUGH parameters!")
         print_info(usage, MAGENTA)
@@ -283,8 +324,10 @@ def mon_qtr_rep_main(args):
     global strnow
     strnow = dt.now().strftime(DATE_STR_FORMAT)
 
-    pr_creator = MonarchQrepToGncPrices(mon_file, gnc_file, mode)
-    record = pr_creator.parse_monarch_qtrep()
+    with metrics.stage('open session'):
+        pr_creator = MonarchQrepToGncPrices(mon_file, gnc_file, mode, metrics)
+    with metrics.stage('parse monarch qtrep'):
+        record = pr_creator.parse_monarch_qtrep()
     record.set_filename(mon_file)
 
     # PRINT RECORD AS JSON FILE
@@ -298,10 +341,21 @@ def mon_qtr_rep_main(args):
         # add a timestamp to get a unique file name
         out_file = path + '/' + basename + '_' + strnow + ".json"
         print_info("\nout_file: {}".format(out_file))
-        fp = open(out_file, 'w', encoding='utf-8')
-        json.dump(record.to_json(), fp, indent=4)
+        with metrics.stage('save json'), open(out_file, 'w', encoding='utf-8') as fp:
+            record.write_json(fp, JSON_INDENT if pretty else None)
+
+    if archive:
+        with metrics.stage('archive'):
+            archive_record(record)
+
+    with metrics.stage('get prices and save'):
+        msg = pr_creator.get_prices_and_save(record)
 
-    msg = pr_creator.get_prices_and_save(record)
+    metrics.finish()
+    for line in metrics.report():
+        print_info(line, CYAN, False)
+    if metrics_file:
+        print_info("Saved metrics to: {}".format(metrics.save(metrics_file)), CYAN)
 
     print_info("\n >>> PROGRAM ENDED.", GREEN)
     return msg
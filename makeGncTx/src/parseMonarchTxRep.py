@@ -10,16 +10,16 @@ __author__ = 'Mark Sattolo'
 __author_email__ = 'epistemik@gmail.com'
 __python_version__ = 3.6
 __created__ = '2018'
-__updated__ = '2019-06-16'
+__updated__ = '2019-08-23'
 
 import re
-import json
 from Configuration import *
+from recordArchive import ARCHIVE_OPTION, archive_record
 
 
 def parse_pdf_txs(file_name, ts):
     """
-    :param file_name: string: monarch transaction report text file to parse
+    :param file_name: string: monarch transaction report text file to parse OR iterable of the report lines
     :param        ts: string: timestamp for file name
     loop:
         check for 'Plan Type:'
@@ -39,24 +39,23 @@ def parse_pdf_txs(file_name, ts):
     """
     print_info("\nparse_pdf_txs({})\nRuntime = {}\n".format(file_name, ts), MAGENTA)
 
-    # re searches
-    re_own  = re.compile(".*({}).*".format(OWNER))
+    # re searches: fund and date are the rightmost match in the line, as with a leading '.*' but without the backtracking
     re_plan = re.compile(r"([OPENTFSAR]{4})(\s?.*)")
-    re_fund = re.compile(r".*([A-Z]{3})\s?([0-9]{3,5}).*")
-    re_date = re.compile(r".*([0-9]{2}/[0-9]{2}/[0-9]{4}).*")
+    re_fund = re.compile(r"(?=([A-Z]{3})\s?([0-9]{3,5}))")
+    re_date = re.compile(r"(?=([0-9]{2}/[0-9]{2}/[0-9]{4}))")
 
     tx_coll = InvestmentRecord()
     own_line = 0
     tx_line = 0
     mon_state = STATE_SEARCH
-    with open(file_name) as fp:
+    with GncUtilities.line_source(file_name) as fp:
         ct = 0
         for line in fp:
             ct += 1
-            print_info("line is type {}".format(type(line)))
-            line_list = line.split()
-            for it in line_list:
-                print_info("it = {}".format(it))
+            if LOG_DEBUG >= Gnulog.level:
+                print_debug("line is type {}", args=(type(line),))
+                for it in line.split():
+                    print_debug("it = {}", args=(it,))
             if mon_state == STATE_SEARCH:
                 re_match = re.match(re_plan, line)
                 if re_match:
@@ -67,8 +66,7 @@ def parse_pdf_txs(file_name, ts):
 
             if mon_state == FIND_OWNER:
                 if own_line == 0:
-                    re_match = re.match(re_own, line)
-                    if re_match:
+                    if OWNER in line:
                         own_line += 1
                 else:
                     owner_name = line.strip()
@@ -79,7 +77,7 @@ def parse_pdf_txs(file_name, ts):
                 continue
 
             if mon_state <= FIND_FUND:
-                re_match = re.match(re_fund, line)
+                re_match = GncUtilities.last_match(re_fund, line)
                 if re_match:
                     fund_company = re_match.group(1)
                     fund_code = re_match.group(2)
@@ -88,7 +86,7 @@ def parse_pdf_txs(file_name, ts):
                     continue
 
             if mon_state <= FIND_NEXT_TX:
-                re_match = re.match(re_date, line)
+                re_match = GncUtilities.last_match(re_date, line) if '/' in line else None
                 if re_match:
                     tx_date = re_match.group(1)
                     print_info("FOUND a NEW tx! Date: {}".format(tx_date), YELLOW)
@@ -111,25 +109,25 @@ def parse_pdf_txs(file_name, ts):
                     curr_tx[DESC] += (entry + ":")
                     continue
                 if tx_line == 3:
-                    print_info("curr_tx[DESC]: {}".format(curr_tx[DESC]))
+                    print_debug("curr_tx[DESC]: {}", args=(curr_tx[DESC],))
                     curr_tx[GROSS] = entry
-                    print_info("curr_tx[GROSS]: {}".format(curr_tx[GROSS]))
+                    print_debug("curr_tx[GROSS]: {}", args=(curr_tx[GROSS],))
                 if tx_line == 4:
                     curr_tx[NET] = entry
                     if curr_tx[NET] != curr_tx[GROSS]:
-                        print_info("curr_tx[NET]: {}".format(curr_tx[NET]))
+                        print_debug("curr_tx[NET]: {}", args=(curr_tx[NET],))
                         print_error("\n>>> PROBLEM!!! GROSS and NET do NOT match!!!\n")
                         continue
                 if tx_line == 5:
                     curr_tx[UNITS] = entry
-                    print_info("curr_tx[UNITS]: {}".format(curr_tx[UNITS]))
+                    print_debug("curr_tx[UNITS]: {}", args=(curr_tx[UNITS],))
                 if tx_line == 6:
                     curr_tx[PRICE] = entry
-                    print_info("curr_tx[PRICE]: {}".format(curr_tx[PRICE]))
+                    print_debug("curr_tx[PRICE]: {}", args=(curr_tx[PRICE],))
                 if tx_line == 7:
                     curr_tx[UNIT_BAL] = entry
-                    print_info("curr_tx[UNIT_BAL]: {}".format(curr_tx[UNIT_BAL]))
-                    tx_coll.add_tx(plan_type, curr_tx)
+                    print_debug("curr_tx[UNIT_BAL]: {}", args=(curr_tx[UNIT_BAL],))
+                    tx_coll.add_tx(plan_type, TRADE, curr_tx)
                     print_info('ADD current Tx to Collection!', GREEN)
                     mon_state = STATE_SEARCH
                     tx_line = 0
@@ -139,7 +137,7 @@ def parse_pdf_txs(file_name, ts):
 
 def parse_copy_txs(file_name, ts):
     """
-    :param file_name: string: monarch transaction report text file to parse
+    :param file_name: string: monarch transaction report text file to parse OR iterable of the report lines
     :param        ts: string: timestamp for file name
     parsing for NEW format txt files, ~ May 31, 2019, just COPIED from Monarch web page,
     as new Monarch pdf's are no longer practical to use -- extracted text just too inconsistent...
@@ -165,11 +163,11 @@ def parse_copy_txs(file_name, ts):
 
     tx_coll = InvestmentRecord()
     mon_state = FIND_OWNER
-    with open(file_name) as fp:
+    with GncUtilities.line_source(file_name) as fp:
         ct = 0
         for line in fp:
             ct += 1
-            print_info("Line {}".format(ct))
+            print_debug("Line {}", args=(ct,))
             if mon_state == FIND_OWNER:
                 owner = line.strip()
                 tx_coll.set_owner(owner)
@@ -194,30 +192,34 @@ def parse_copy_txs(file_name, ts):
 
                 tx_type = words[1]
                 curr_tx[DESC] = TX_TYPES[words[2]] if tx_type == INTRCL else TX_TYPES[tx_type]
-                print_info("curr_tx[DESC]: {}".format(curr_tx[DESC]))
+                print_debug("curr_tx[DESC]: {}", args=(curr_tx[DESC],))
                 curr_tx[GROSS] = words[-4]
-                print_info("curr_tx[GROSS]: {}".format(curr_tx[GROSS]))
+                print_debug("curr_tx[GROSS]: {}", args=(curr_tx[GROSS],))
                 curr_tx[UNITS] = words[-1]
-                print_info("curr_tx[UNITS]: {}".format(curr_tx[UNITS]))
+                print_debug("curr_tx[UNITS]: {}", args=(curr_tx[UNITS],))
                 curr_tx[PRICE] = words[-2]
-                print_info("curr_tx[PRICE]: {}".format(curr_tx[PRICE]))
+                print_debug("curr_tx[PRICE]: {}", args=(curr_tx[PRICE],))
                 curr_tx[LOAD] = words[-5]
-                print_info("curr_tx[LOAD]: {}".format(curr_tx[LOAD]))
+                print_debug("curr_tx[LOAD]: {}", args=(curr_tx[LOAD],))
                 curr_tx[FUND_CODE] = words[-7]
-                print_info("curr_tx[FUND_CODE]: {}".format(curr_tx[FUND_CODE]))
+                print_debug("curr_tx[FUND_CODE]: {}", args=(curr_tx[FUND_CODE],))
                 curr_tx[FUND_CMPY] = words[-8]
-                print_info("curr_tx[FUND_CMPY]: {}".format(curr_tx[FUND_CMPY]))
+                print_debug("curr_tx[FUND_CMPY]: {}", args=(curr_tx[FUND_CMPY],))
 
-                tx_coll.add_tx(plan_type, curr_tx)
+                tx_coll.add_tx(plan_type, TRADE, curr_tx)
                 print_info('ADD current Tx to Collection!', GREEN)
 
     return tx_coll
 
 
 def mon_tx_rep_main(args):
+    pretty = PRETTY_OPTION in args
+    archive = ARCHIVE_OPTION in args
+    args = [arg for arg in args if arg not in (PRETTY_OPTION, ARCHIVE_OPTION)]
     if len(args) < 2:
         print_error("NOT ENOUGH parameters!")
-        print_info("usage: py36 parseMonarchTxRep.py <monarch text file> <mode: prod|test>", MAGENTA)
+        print_info("usage: py36 parseMonarchTxRep.py <monarch text file> <mode: prod|test> [{}] [{}]"
+                   .format(PRETTY_OPTION, ARCHIVE_OPTION), MAGENTA)
         exit(230)
 
     mon_file = args[0]
@@ -250,10 +252,13 @@ def mon_tx_rep_main(args):
         # add a timestamp to get a unique file name
         out_file = path + '/' + basename + '_' + now + ".json"
         print_info("\nOUTPUT FILE: \u0022{}\u0022".format(out_file))
-        fp = open(out_file, 'w', encoding='utf-8')
-        json.dump(record.to_json(), fp, indent=4)
+        with open(out_file, 'w', encoding='utf-8') as fp:
+            record.write_json(fp, JSON_INDENT if pretty else None)
         msg = "parseMonarchTxRep created file: {}".format(out_file)
 
+    if archive:
+        archive_record(record)
+
     print_info("\n >>> PROGRAM ENDED.", GREEN)
     return msg
 
@@ -0,0 +1,285 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# perfGate.py -- run the Monarch report parsers over the sample reports and generated reports,
+#                and compare the throughput and parsed output with a saved baseline
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-18'
+__updated__ = '2019-08-29'
+
+import os
+import re
+import json
+import hashlib
+import platform
+import tempfile
+from time import process_time
+from contextlib import redirect_stdout
+from argparse import ArgumentParser
+from Configuration import *
+from genMonarchReports import MonarchReportGenerator, report_file_name, TXREP, COPY, FUNDS, QTREP
+from benchmarkReports import copy_parser
+
+SRC_DIR = osp.dirname(osp.abspath(__file__))
+CORPUS_DIR = osp.join(osp.dirname(SRC_DIR), 'txtFromPdf')
+# machine specific, so NOT in the repo: make one with --save before changing a parser
+BASELINE_FILE = osp.join(osp.dirname(SRC_DIR), 'perfBaseline.json')
+
+# sample quarterly reports are named like Mon-Mark_2019-Q1.txt; the other samples are transaction reports
+RE_QTREP_FILE = re.compile(r"_[0-9]{4}-Q[1-4]")
+GEN_SIZE: int = 10000
+GEN_SEED: int = 0
+# each report's time is the LEAST cpu time of at least this many rounds over ALL the reports
+MIN_REPEAT: int = 7
+# fail if a parser's calibrated throughput drops by more than this fraction:
+# the same tree varied by up to 23% calibrated, and 39% NOT calibrated
+THRESHOLD: float = 0.35
+UNAVAILABLE: str = 'unavailable'
+
+# report kind -> parsers that read it
+KIND_PARSERS = {
+    TXREP: ['parse_pdf_txs'],
+    COPY:  ['parse_copy_txs', 'parse_report_info'],
+    FUNDS: ['parse_funds_info'],
+    QTREP: ['parse_monarch_qtrep']
+}
+# NOT the same for each run
+VOLATILE_KEYS = ("Date", "Source File", "__module__")
+
+# fixed work timed in the same rounds as the parsers: the throughput is compared in lines per calibration run,
+# so a machine that is slower for the whole gate, e.g. a busy host, does NOT fail it
+RE_CALIBRATION = re.compile(r"([0-9]+)/([0-9]+)/([0-9]{4})\s+(\w+)")
+CALIBRATION_LINES = ["{}/{}/2019 Purchase {} units at ${}.{:02d}".format(i % 12 + 1, i % 28 + 1, i, i % 500, i % 100)
+                     for i in range(5000)]
+
+
+def parse_report(parser:str, report:str):
+    """
+    :return: the InvestmentRecord from parser on report; import errors are left to the caller
+    """
+    if parser == 'parse_pdf_txs':
+        from parseMonarchTxRep import parse_pdf_txs
+        return parse_pdf_txs(report, strnow)
+    if parser == 'parse_copy_txs':
+        from parseMonarchTxRep import parse_copy_txs
+        return parse_copy_txs(report, strnow)
+    if parser == 'parse_funds_info':
+        from parseMonarchFundsRep import ParseMonarchFundsReport
+        return ParseMonarchFundsReport().parse_funds_info(report, strnow)
+    if parser == 'parse_monarch_qtrep':
+        from parseMonarchQtrRep import MonarchQrepToGncPrices
+        from perfMetrics import PerfMetrics
+        # parsing only: skip __init__, which opens the Gnucash session
+        qtrep = object.__new__(MonarchQrepToGncPrices)
+        qtrep.mon_file = report
+        qtrep.prod = False
+        qtrep.metrics = PerfMetrics(MON)
+        return qtrep.parse_monarch_qtrep()
+    if parser == 'parse_report_info':
+        copy_rep = copy_parser(report)
+        copy_rep.parse_report_info()
+        return copy_rep.get_monarch_record()
+    raise Exception("UNKNOWN parser '{}'!".format(parser))
+
+
+def output_hash(record) -> str:
+    """
+    :return: sha256 of the parsed owner and plans, so any change in the parsed values changes the hash
+    """
+    data = {key: value for key, value in record.to_json().items() if key not in VOLATILE_KEYS}
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def gate_files(corpus:str, gen_dir:str, gen_size:int, seed:int) -> list:
+    """
+    :return: (label, parser, file) for every sample report and every generated report
+    """
+    files = []
+    for fname in sorted(os.listdir(corpus)):
+        report = osp.join(corpus, fname)
+        if osp.isfile(report):
+            kind = QTREP if RE_QTREP_FILE.search(fname) else TXREP
+            files += [(fname, parser, report) for parser in KIND_PARSERS[kind]]
+    if gen_size > 0:
+        for kind, parsers in KIND_PARSERS.items():
+            report = report_file_name(gen_dir, kind, gen_size, seed)
+            if not osp.isfile(report):
+                MonarchReportGenerator(seed).write_report(kind, gen_size, report)
+            files += [(osp.basename(report), parser, report) for parser in parsers]
+    return files
+
+
+def calibration_secs() -> float:
+    start = process_time()
+    for line in CALIBRATION_LINES:
+        if RE_CALIBRATION.match(line):
+            line.split()
+    return process_time() - start
+
+
+def time_parser(parser:str, report:str) -> (float, object):
+    """
+    :return: cpu seconds of ONE run and the record
+    """
+    start = process_time()
+    record = parse_report(parser, report)
+    return process_time() - start, record
+
+
+def run_entry(parser:str, report:str) -> dict:
+    """
+    :return: lines, cpu seconds, records found and output hash; a parser error is also an output, to be compared
+    """
+    with open(report, 'r', encoding='utf-8', errors='replace') as rfp:
+        lines = sum(1 for _ in rfp)
+    try:
+        secs, record = time_parser(parser, report)
+    except ImportError as ie:
+        return {"status": UNAVAILABLE, "reason": str(ie)}
+    except Exception as ex:
+        error = repr(ex)
+        return {"lines": lines, "seconds": None, "records": 0, "error": error,
+                "hash": hashlib.sha256(error.encode('utf-8')).hexdigest()}
+    return {"lines": lines, "seconds": secs, "records": record.get_size(), "hash": output_hash(record)}
+
+
+def run_rounds(files:list, repeat:int) -> (dict, float):
+    """
+    time every report once per round, taking turns with the other reports and the calibration:
+    a slow spell of the machine then slows ONE round of all of them, NOT every run of one parser
+    :return: entries with the least cpu seconds of each report, and the least seconds of the calibration
+    """
+    entries = {}
+    calibration = None
+    for rnd in range(max(repeat, MIN_REPEAT)):
+        cal_secs = calibration_secs()
+        calibration = cal_secs if calibration is None else min(calibration, cal_secs)
+        for label, parser, report in files:
+            key = "{}|{}".format(parser, label)
+            if rnd == 0:
+                entries[key] = run_entry(parser, report)
+                entries[key]["parser"] = parser
+                entries[key]["file"] = label
+            elif entries[key].get("seconds"):
+                entries[key]["seconds"] = min(entries[key]["seconds"], time_parser(parser, report)[0])
+    for entry in entries.values():
+        if entry.get("seconds"):
+            entry["seconds"] = round(entry["seconds"], 5)
+    return entries, calibration
+
+
+def parser_throughput(entries:dict) -> dict:
+    """
+    :return: parser -> lines per second over all its reports; the timing of a single small report is too noisy
+    """
+    totals = {}
+    for entry in entries.values():
+        if entry.get("seconds"):
+            lines, secs = totals.get(entry["parser"], (0, 0.0))
+            totals[entry["parser"]] = (lines + entry["lines"], secs + entry["seconds"])
+    return {parser: int(lines / secs) for parser, (lines, secs) in totals.items() if secs > 0}
+
+
+def compare_to_baseline(current:dict, baseline:dict, threshold:float) -> list:
+    """
+    throughput is compared in lines per calibration run, i.e. lines/s times the calibration seconds
+    :return: text of each failure: changed output, missing entry or lower throughput
+    """
+    failures = []
+    for key, base in baseline["entries"].items():
+        if base.get("status") == UNAVAILABLE:
+            continue
+        entry = current["entries"].get(key)
+        if entry is None or entry.get("status") == UNAVAILABLE:
+            failures.append("{}: in the baseline but NOT run now".format(key))
+        elif entry["hash"] != base["hash"] or entry["records"] != base["records"]:
+            failures.append("{}: output CHANGED: {} records (was {}), hash {} (was {})"
+                            .format(key, entry["records"], base["records"], entry["hash"][:12], base["hash"][:12]))
+    for parser, base_rate in baseline["throughput"].items():
+        rate = current["throughput"].get(parser)
+        if rate is None:
+            continue
+        calibrated = rate * current["calibration"]
+        base_calibrated = base_rate * baseline["calibration"]
+        if calibrated < base_calibrated * (1.0 - threshold):
+            failures.append("{}: throughput {} lines/s is {:.0%} below the baseline {} lines/s, after calibration"
+                            .format(parser, rate, 1.0 - calibrated / base_calibrated, base_rate))
+    return failures
+
+
+def perf_gate_main(args:list) -> dict:
+    arg_parser = ArgumentParser(description='Check the Monarch parsers against a saved baseline of throughput and output',
+                                prog='perfGate.py')
+    arg_parser.add_argument('--save', action='store_true', help='save a NEW baseline instead of checking')
+    arg_parser.add_argument('-b', '--baseline', default=BASELINE_FILE, help='baseline JSON file')
+    arg_parser.add_argument('-c', '--corpus', default=CORPUS_DIR, help='folder of sample Monarch text reports')
+    arg_parser.add_argument('-n', '--records', type=int, default=GEN_SIZE,
+                            help='records in each generated report; 0 for NO generated reports')
+    arg_parser.add_argument('-o', '--out', help='folder for the generated reports; default is a temporary folder')
+    arg_parser.add_argument('-s', '--seed', type=int, default=GEN_SEED, help='random seed for the generated reports')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=MIN_REPEAT,
+                            help='rounds over all the reports, least cpu time is used; at least {}'.format(MIN_REPEAT))
+    arg_parser.add_argument('-t', '--threshold', type=float, default=THRESHOLD,
+                            help='fail if throughput drops by more than this fraction of the baseline')
+    opts = arg_parser.parse_args(args)
+
+    # the generated reports are removed after the run unless they go to a folder given with -o
+    temp_dir = None if opts.out else tempfile.TemporaryDirectory(prefix='monarch_gate_')
+    gen_dir = opts.out or temp_dir.name
+    os.makedirs(gen_dir, exist_ok=True)
+    saved_level = Gnulog.level
+    Gnulog.set_level(LOG_OFF)
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            entries, calibration = run_rounds(gate_files(opts.corpus, gen_dir, opts.records, opts.seed), opts.repeat)
+    finally:
+        Gnulog.level = saved_level
+        if temp_dir:
+            temp_dir.cleanup()
+
+    current = {"python": platform.python_version(), "records": opts.records, "seed": opts.seed,
+               "calibration": round(calibration, 6), "entries": entries, "throughput": parser_throughput(entries)}
+    for parser, rate in current["throughput"].items():
+        print_info("{:<22} {:>10} lines/s".format(parser, rate), CYAN)
+    print_info("{:<22} {:>10.6f} s".format('calibration', calibration), CYAN)
+    unavailable = sorted({e["parser"] for e in entries.values() if e.get("status") == UNAVAILABLE})
+    if unavailable:
+        print_info("NOT run: {}".format(unavailable), YELLOW)
+
+    if opts.save:
+        with open(opts.baseline, 'w', encoding='utf-8') as bfp:
+            json.dump(current, bfp, indent=4, sort_keys=True)
+        print_info("Saved baseline to {}".format(opts.baseline), GREEN)
+        current["passed"] = True
+        return current
+
+    if not osp.isfile(opts.baseline):
+        raise Exception("NO baseline file '{}': make one with --save".format(opts.baseline))
+    with open(opts.baseline, 'r', encoding='utf-8') as bfp:
+        baseline = json.load(bfp)
+    if "calibration" not in baseline:
+        raise Exception("baseline '{}' has NO calibration: make a new one with --save".format(opts.baseline))
+    if baseline["records"] != opts.records or baseline["seed"] != opts.seed:
+        raise Exception("baseline was made with {} generated records and seed {}: use the same -n and -s"
+                        .format(baseline["records"], baseline["seed"]))
+
+    failures = compare_to_baseline(current, baseline, opts.threshold)
+    for fail in failures:
+        print_error(fail)
+    current["failures"] = failures
+    current["passed"] = not failures
+    print_info("PASSED" if current["passed"] else "FAILED: {} problems".format(len(failures)),
+               GREEN if current["passed"] else RED)
+    return current
+
+
+if __name__ == '__main__':
+    import sys
+    result = perf_gate_main(sys.argv[1:])
+    exit(0 if result["passed"] else 1)
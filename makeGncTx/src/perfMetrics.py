@@ -0,0 +1,220 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# perfMetrics.py -- wall time, cpu time and item counts for each stage of a Monarch -> Gnucash run,
+#                   and optionally the memory peak and top allocation sites
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-14'
+__updated__ = '2019-08-29'
+
+import json
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter, process_time
+
+# options for the entry points
+METRICS_OPTION: str = '--metrics'
+MEMORY_OPTION: str  = '--trace-memory'
+
+# allocation sites kept for each stage when tracing memory
+MEMORY_TOP: int = 5
+# NOT the allocations of tracemalloc or of these metrics
+MEMORY_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+
+# counter names: each item is counted ONCE per name, as the totals add up the counts of all the stages,
+# so the txs parsed from a report and the Gnucash txs created from them have different names:
+# a trade is created only when its Gnucash tx is committed, NOT for the first of a switch pair or a rolled back tx
+LINES: str     = 'lines'
+PRICES: str    = 'prices'
+TRADES: str    = 'trades'
+PRICES_CREATED: str = 'prices created'
+TRADES_CREATED: str = 'trades created'
+PAIRS: str     = 'pairs'
+ROLLBACKS: str = 'rollbacks'
+CARD_TXS: str  = 'card txs'
+
+# metrics of the most recent run in this process, e.g. for the UI
+_last_metrics = None
+
+
+class StageMetrics:
+    """
+    totals for all the runs of one named stage
+    """
+    def __init__(self, p_name:str):
+        self.name = p_name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.counts = {}
+        # only set when tracing memory: bytes, and allocation site -> bytes added in this stage
+        self.mem_peak = None
+        self.mem_added = None
+        self.mem_sites = {}
+
+    def add(self, key:str, num:int=1):
+        self.counts[key] = self.counts.get(key, 0) + num
+
+    def add_memory(self, peak:int, added:int, sites:dict):
+        self.mem_peak = peak if self.mem_peak is None else max(self.mem_peak, peak)
+        self.mem_added = added + (self.mem_added or 0)
+        for site, size in sites.items():
+            self.mem_sites[site] = self.mem_sites.get(site, 0) + size
+
+    def get_top_sites(self, p_top:int=MEMORY_TOP) -> list:
+        return sorted(self.mem_sites.items(), key=lambda item: item[1], reverse=True)[:p_top]
+
+    def to_json(self) -> dict:
+        data = {"stage": self.name, "calls": self.calls, "wall": round(self.wall, 4), "cpu": round(self.cpu, 4),
+                "counts": dict(self.counts)}
+        if self.mem_peak is not None:
+            data["memory"] = {"peak": self.mem_peak, "added": self.mem_added,
+                              "top sites": [{"site": site, "bytes": size} for site, size in self.get_top_sites()]}
+        return data
+
+# END class StageMetrics
+
+
+class PerfMetrics:
+    """
+    Record each stage of a run with: with metrics.stage(name): ...
+    Counts go to the innermost open stage, so code that does not know which stage it is in can still call count()
+    With p_trace_memory, tracemalloc snapshots before and after each stage give its peak traced memory
+    and the allocation sites that grew the most: this slows the run down a LOT, so only when asked
+    """
+    def __init__(self, p_name:str, p_trace_memory:bool=False):
+        self.name = p_name
+        self.stages = {}
+        self.active = []
+        self.totals = StageMetrics(p_name)
+        # peak seen by each open stage, as the peak is reset when a stage starts
+        self.active_peaks = []
+        self.trace_memory = p_trace_memory
+        self.started_trace = False
+        if p_trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_trace = True
+        self.start_mem = tracemalloc.get_traced_memory()[0] if p_trace_memory else 0
+        self.start_wall = perf_counter()
+        self.start_cpu = process_time()
+
+    @contextmanager
+    def stage(self, p_name:str):
+        stg = self.stages.get(p_name)
+        if stg is None:
+            stg = self.stages[p_name] = StageMetrics(p_name)
+        self.active.append(stg)
+        start_snap = self.start_memory() if self.trace_memory else None
+        start_wall = perf_counter()
+        start_cpu = process_time()
+        try:
+            yield stg
+        finally:
+            stg.wall += perf_counter() - start_wall
+            stg.cpu += process_time() - start_cpu
+            stg.calls += 1
+            if start_snap is not None:
+                self.end_memory(stg, start_snap)
+            self.active.pop()
+
+    def start_memory(self) -> tracemalloc.Snapshot:
+        if self.active_peaks:
+            self.active_peaks[-1] = max(self.active_peaks[-1], tracemalloc.get_traced_memory()[1])
+        # Python < 3.9 has no reset_peak: the peak is then the highest since tracing started
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self.active_peaks.append(0)
+        return tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+
+    def end_memory(self, stg:StageMetrics, start_snap:tracemalloc.Snapshot):
+        end_snap = tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, self.active_peaks.pop())
+        if self.active_peaks:
+            self.active_peaks[-1] = max(self.active_peaks[-1], peak)
+        added = sum(stat.size for stat in end_snap.statistics('filename')) - \
+                sum(stat.size for stat in start_snap.statistics('filename'))
+        sites = {}
+        for diff in end_snap.compare_to(start_snap, 'lineno'):
+            if diff.size_diff > 0:
+                frame = diff.traceback[0]
+                sites["{}:{}".format(frame.filename, frame.lineno)] = diff.size_diff
+        stg.add_memory(peak, added, sites)
+        self.totals.mem_peak = max(self.totals.mem_peak or 0, peak)
+
+    def count(self, key:str, num:int=1):
+        (self.active[-1] if self.active else self.totals).add(key, num)
+
+    def finish(self):
+        """
+        stop the run clock and make these the metrics returned by get_last_metrics()
+        """
+        global _last_metrics
+        self.totals.wall = perf_counter() - self.start_wall
+        self.totals.cpu = process_time() - self.start_cpu
+        self.totals.calls = 1
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.totals.mem_peak = max(self.totals.mem_peak or 0, peak)
+            self.totals.mem_added = current - self.start_mem
+            if self.started_trace:
+                tracemalloc.stop()
+                self.started_trace = False
+        _last_metrics = self
+
+    def to_json(self) -> dict:
+        total = self.totals.to_json()
+        for stg in self.stages.values():
+            for key, num in stg.counts.items():
+                total["counts"][key] = total["counts"].get(key, 0) + num
+        total["stages"] = [stg.to_json() for stg in self.stages.values()]
+        return total
+
+    def report(self) -> list:
+        """
+        :return: one text line per stage, for the log
+        """
+        lines = ["{:<24} {:>6} {:>10} {:>10}  {}".format('stage', 'calls', 'wall', 'cpu', 'counts')]
+        for stg in list(self.stages.values()) + [self.totals]:
+            lines.append("{:<24} {:>6} {:>10.4f} {:>10.4f}  {}".format(stg.name, stg.calls, stg.wall, stg.cpu, stg.counts))
+        if self.trace_memory:
+            lines.append("{:<24} {:>12} {:>12}  {}".format('stage', 'peak KiB', 'added KiB', 'top allocation sites'))
+            for stg in list(self.stages.values()) + [self.totals]:
+                if stg.mem_peak is None:
+                    continue
+                lines.append("{:<24} {:>12.1f} {:>12.1f}".format(stg.name, stg.mem_peak / 1024, stg.mem_added / 1024))
+                for site, size in stg.get_top_sites():
+                    lines.append("{:<24} {:>12} {:>12.1f}  {}".format('', '', size / 1024, site))
+        return lines
+
+    def save(self, p_file:str) -> str:
+        with open(p_file, 'w', encoding='utf-8') as mfp:
+            json.dump(self.to_json(), mfp, indent=4)
+        return p_file
+
+# END class PerfMetrics
+
+
+def get_last_metrics() -> dict:
+    return _last_metrics.to_json() if _last_metrics is not None else {}
+
+
+def pop_option(args:list, option:str, has_value:bool=True) -> (object, list):
+    """
+    take an option out of the arguments of an entry point that only has positional parameters
+    :return: option value (or True if it has no value; None if absent), remaining arguments
+    """
+    if option not in args:
+        return None, args
+    indx = args.index(option)
+    if not has_value:
+        return True, args[:indx] + args[indx+1:]
+    if indx + 1 >= len(args):
+        raise Exception("option '{}' needs a value!".format(option))
+    return args[indx+1], args[:indx] + args[indx+2:]
@@ -0,0 +1,130 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# perfProfile.py -- run an entry point under cProfile: save the .pstats file and a collapsed-stack file
+#                   for flame graphs, and optionally print the hottest functions
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-15'
+__updated__ = '2019-08-29'
+
+import os
+import os.path as osp
+import cProfile
+import pstats
+from functools import wraps
+from datetime import datetime as dt
+from Configuration import *
+from perfMetrics import pop_option
+
+PROFILE_OPTION: str     = '--profile'
+PROFILE_TOP_OPTION: str = '--profile-top'
+# same folder as the session logs
+PROFILE_DIR: str = osp.join(osp.dirname(osp.dirname(osp.abspath(__file__))), 'logs')
+PROFILE_TIME_FORMAT: str = "%Y-%m-%d_%H-%M-%S"
+# deepest call path written to the collapsed-stack file
+MAX_STACK_DEPTH: int = 64
+# a call path with less time than this, including its callees, is NOT followed any further
+MIN_PATH_USECS: float = 1.0
+# the call paths of a large call graph grow exponentially with its depth: stop after this many
+MAX_STACK_PATHS: int = 200000
+
+
+def func_label(func:tuple) -> str:
+    """
+    NO spaces: the collapsed-stack format uses the last space to separate the count
+    """
+    filename, line, name = func
+    if filename == '~':
+        # built-in
+        return name.replace(' ', '_')
+    return "{}:{}:{}".format(osp.basename(filename), line, name).replace(' ', '_')
+
+
+def collapse_stacks(stats:pstats.Stats) -> dict:
+    """
+    cProfile only keeps caller -> callee edges, so each call path gets the share of a function's own time
+    that came through that edge, scaled down the path: an estimate, but good enough to see where the time goes.
+    Paths under MIN_PATH_USECS are dropped and at most MAX_STACK_PATHS paths are walked, so the walk always ends.
+    :return: 'root;caller;callee' -> own time in microseconds
+    """
+    children = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, data in stats.stats.items() if not data[4]]
+
+    stacks = {}
+    num_paths = 0
+
+    def walk(func, path:list, on_path:set, fraction:float):
+        nonlocal num_paths
+        _, _, tottime, cumtime, _ = stats.stats[func]
+        num_paths += 1
+        path.append(func_label(func))
+        on_path.add(func)
+        usecs = int(tottime * fraction * 1e6)
+        if usecs > 0:
+            key = ';'.join(path)
+            stacks[key] = stacks.get(key, 0) + usecs
+        if len(path) < MAX_STACK_DEPTH:
+            for child, edge_cumtime in children.get(func, []):
+                child_cumtime = stats.stats[child][3]
+                # the time of this path through the child, including everything below it
+                if child not in on_path and fraction * edge_cumtime * 1e6 >= MIN_PATH_USECS \
+                        and num_paths < MAX_STACK_PATHS:
+                    walk(child, path, on_path, fraction * edge_cumtime / child_cumtime)
+        on_path.discard(func)
+        path.pop()
+
+    for root in roots:
+        if stats.stats[root][3] * 1e6 >= MIN_PATH_USECS:
+            walk(root, [], set(), 1.0)
+    return stacks
+
+
+def save_profile(profiler:cProfile.Profile, p_name:str, p_top:int=0, p_dir:str=PROFILE_DIR) -> (str, str):
+    """
+    :return: pstats file, collapsed-stack file
+    """
+    os.makedirs(p_dir, exist_ok=True)
+    base = osp.join(p_dir, "{}_{}".format(p_name, dt.now().strftime(PROFILE_TIME_FORMAT)))
+    stats_file = base + '.pstats'
+    profiler.dump_stats(stats_file)
+
+    stats = pstats.Stats(stats_file)
+    stacks_file = base + '.collapsed.txt'
+    with open(stacks_file, 'w', encoding='utf-8') as sfp:
+        for stack, usecs in sorted(collapse_stacks(stats).items()):
+            sfp.write("{} {}\n".format(stack, usecs))
+
+    if p_top > 0:
+        # the hottest functions are those with the most time in their OWN code
+        stats.sort_stats('tottime').print_stats(p_top)
+    print_info("profile saved to {}\n   collapsed stacks to {}".format(stats_file, stacks_file), CYAN)
+    return stats_file, stacks_file
+
+
+def profiled(p_name:str):
+    """
+    decorator for an entry point taking a list of command line args:
+    takes --profile and/or --profile-top N out of the args, and if present runs the entry point under cProfile
+    """
+    def decorator(main):
+        @wraps(main)
+        def wrapper(args:list, *more, **kwargs):
+            profile, args = pop_option(args, PROFILE_OPTION, False)
+            top, args = pop_option(args, PROFILE_TOP_OPTION)
+            if not profile and top is None:
+                return main(args, *more, **kwargs)
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(main, args, *more, **kwargs)
+            finally:
+                save_profile(profiler, p_name, int(top or 0))
+        return wrapper
+    return decorator
@@ -0,0 +1,246 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# recordArchive.py -- append-only JSON Lines archive of parsed Monarch records: one trade or price per line,
+#                     with a sidecar index of (owner, fund, month) -> byte offsets to find them again
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-23'
+__updated__ = '2019-08-29'
+
+import os
+from argparse import ArgumentParser
+from Configuration import *
+from recordSnapshot import SNAPSHOT_SUFFIX, save_snapshot
+
+# option for the entry points that parse a Monarch report
+ARCHIVE_OPTION: str = '--archive'
+ARCHIVE_FILE = osp.join(osp.dirname(osp.dirname(osp.abspath(__file__))), 'archive', 'monarch_records.jsonl')
+INDEX_SUFFIX: str = '.idx.json'
+RUN_ID_FORMAT: str = "%Y-%m-%dT%H-%M-%S.%f"
+# trade dates in the pdf and the copied reports
+TX_DATE_FORMATS = ['%m/%d/%Y', '%d-%b-%Y']
+
+# entry fields
+RUN: str    = 'run'
+PLAN: str   = 'plan'
+TYPE: str   = 'type'
+SOURCE: str = 'source'
+# date of the parsed record, which is the date of e.g. the quarterly report prices
+RECORD_DATE: str = 'record_date'
+MONTH: str  = 'month'
+TX: str     = 'tx'
+
+
+def tx_fund(tx:dict) -> str:
+    """
+    :return: 'CMPY code': the funds and copied reports have FUND, the pdf reports have company and code
+    """
+    if FUND in tx:
+        return tx[FUND]
+    return "{} {}".format(tx.get(FUND_CMPY, UNKNOWN), tx.get(FUND_CODE, UNKNOWN))
+
+
+def tx_date(tx:dict, default:dt=None) -> dt:
+    """
+    :return: the trade date, or default if the tx has no date, e.g. the quarterly report prices
+    """
+    date_str = tx.get(TRADE_DATE)
+    if date_str:
+        for date_format in TX_DATE_FORMATS:
+            try:
+                return dt.strptime(date_str, date_format)
+            except ValueError:
+                continue
+    return default
+
+
+def tx_month(tx:dict, default:str) -> str:
+    """
+    :return: 'YYYY-MM' of the trade date, or default if the tx has no date
+    """
+    date = tx_date(tx)
+    return default if date is None else date.strftime('%Y-%m')
+
+
+def index_key(owner:str, fund:str, month:str) -> str:
+    return "{}|{}|{}".format(owner, fund, month)
+
+
+class RecordArchive:
+    """
+    Records are only ever appended; each line is one normalized tx with its owner, plan, source file and run id.
+    The index is rebuilt from the archive if it is missing or was not saved after the last append.
+    """
+    def __init__(self, p_file:str=ARCHIVE_FILE):
+        self.file = p_file
+        self.index_file = p_file + INDEX_SUFFIX
+        self.index = None
+
+    def get_index(self) -> dict:
+        if self.index is None:
+            size = osp.getsize(self.file) if osp.isfile(self.file) else 0
+            if osp.isfile(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as ifp:
+                    saved = json.load(ifp)
+                if saved.get("size") == size:
+                    self.index = saved["keys"]
+            if self.index is None:
+                self.rebuild_index()
+        return self.index
+
+    def save_index(self):
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as ifp:
+            json.dump({"size": osp.getsize(self.file), "keys": self.index}, ifp)
+        # a partly written index is never left behind
+        os.replace(temp_file, self.index_file)
+
+    def rebuild_index(self):
+        self.index = {}
+        if osp.isfile(self.file):
+            with open(self.file, 'rb') as afp:
+                offset = afp.tell()
+                for line in iter(afp.readline, b''):
+                    entry = json.loads(line.decode('utf-8'))
+                    self.index.setdefault(index_key(entry[OWNER], entry[FUND], entry[MONTH]), []).append(offset)
+                    offset = afp.tell()
+            self.save_index()
+
+    def append_record(self, record, p_run:str=None) -> (str, int):
+        """
+        :param record: InvestmentRecord OR InvestmentRecordReader
+        :param  p_run: id of this run; default is the current time
+        :return: run id, number of txs appended
+        """
+        index = self.get_index()
+        run_id = p_run if p_run else dt.now().strftime(RUN_ID_FORMAT)
+        owner = record.get_owner()
+        source = record.get_filename()
+        record_date = record.get_date_str()
+        default_month = dt.strptime(record_date, DATE_STR_FORMAT).strftime('%Y-%m')
+        os.makedirs(osp.dirname(osp.abspath(self.file)), exist_ok=True)
+        num = 0
+        with open(self.file, 'ab') as afp:
+            for plan, tx_type, tx in record.iter_all_txs():
+                entry = {RUN: run_id, OWNER: owner, PLAN: plan, TYPE: tx_type, SOURCE: source, RECORD_DATE: record_date,
+                         FUND: tx_fund(tx), MONTH: tx_month(tx, default_month), TX: tx}
+                offset = afp.tell()
+                afp.write(json.dumps(entry).encode('utf-8') + b'\n')
+                index.setdefault(index_key(owner, entry[FUND], entry[MONTH]), []).append(offset)
+                num += 1
+        self.save_index()
+        return run_id, num
+
+    def find_offsets(self, owner:str=None, fund:str=None, month:str=None) -> list:
+        """
+        :return: sorted offsets of the entries that match all the given values; None matches any value
+        """
+        offsets = []
+        for key, key_offsets in self.get_index().items():
+            k_owner, k_fund, k_month = key.split('|')
+            if (owner is None or owner == k_owner) and (fund is None or fund == k_fund) \
+                    and (month is None or month == k_month):
+                offsets += key_offsets
+        return sorted(offsets)
+
+    def lookup(self, owner:str=None, fund:str=None, month:str=None, p_run:str=None):
+        """
+        :return: iterator of the matching entries, read by seeking straight to each one
+        """
+        offsets = self.find_offsets(owner, fund, month)
+        if not offsets:
+            return
+        with open(self.file, 'rb') as afp:
+            for offset in offsets:
+                afp.seek(offset)
+                entry = json.loads(afp.readline().decode('utf-8'))
+                if p_run is None or entry[RUN] == p_run:
+                    yield entry
+
+    def replay(self, owner:str, fund:str=None, month:str=None, p_run:str=None) -> InvestmentRecord:
+        """
+        the record gets the date and source file of the archived records, as Gnucash uses the record date
+        for the txs without a trade date, e.g. the quarterly report prices
+        :return: InvestmentRecord of the matching entries, e.g. to create the Gnucash txs again
+        """
+        record = InvestmentRecord()
+        if owner and owner != UNKNOWN:
+            record.set_owner(owner)
+        record_dates = set()
+        undated_dates = set()
+        sources = set()
+        for entry in self.lookup(owner, fund, month, p_run):
+            record.add_tx(entry[PLAN], entry[TYPE], entry[TX])
+            sources.add(entry[SOURCE])
+            # NOT in the entries archived before the record date was saved
+            if entry.get(RECORD_DATE):
+                record_dates.add(entry[RECORD_DATE])
+                if tx_date(entry[TX]) is None:
+                    undated_dates.add(entry[RECORD_DATE])
+        if len(undated_dates) > 1:
+            raise Exception("txs without a trade date from records of {} different dates: replay ONE run!"
+                            .format(len(undated_dates)))
+        if record_dates:
+            record.set_date(dt.strptime(max(undated_dates or record_dates), DATE_STR_FORMAT))
+        if len(sources) == 1 and UNKNOWN not in sources:
+            record.set_filename(sources.pop())
+        return record
+
+# END class RecordArchive
+
+
+def archive_record(record, p_file:str=ARCHIVE_FILE) -> str:
+    """
+    for the entry points: append the record and say where it went
+    :return: message
+    """
+    run_id, num = RecordArchive(p_file).append_record(record)
+    msg = "archived {} txs as run '{}' in {}".format(num, run_id, p_file)
+    print_info(msg, CYAN)
+    return msg
+
+
+def record_archive_main(args:list) -> list:
+    arg_parser = ArgumentParser(description='Find the archived Monarch txs of an owner, fund and/or month',
+                                prog='recordArchive.py')
+    arg_parser.add_argument('-a', '--archive', default=ARCHIVE_FILE, help='archive file')
+    arg_parser.add_argument('-o', '--owner', help="e.g. '{}'".format(MON_LULU))
+    arg_parser.add_argument('-f', '--fund', help="e.g. '{}'".format(FUNDS_LIST[0]))
+    arg_parser.add_argument('-m', '--month', help='YYYY-MM')
+    arg_parser.add_argument('-r', '--run', help='only the txs of this run')
+    arg_parser.add_argument('--replay', metavar='RECORD_FILE', help='save the found txs as an InvestmentRecord JSON file,'
+                            ' OR a snapshot if the name ends with {}; needs an owner'.format(SNAPSHOT_SUFFIX))
+    arg_parser.add_argument('--rebuild', action='store_true', help='rebuild the index from the archive first')
+    opts = arg_parser.parse_args(args)
+
+    archive = RecordArchive(opts.archive)
+    if opts.rebuild:
+        archive.rebuild_index()
+
+    if opts.replay:
+        if not opts.owner:
+            raise Exception("--replay needs an owner!")
+        record = archive.replay(opts.owner, opts.fund, opts.month, opts.run)
+        if opts.replay.endswith(SNAPSHOT_SUFFIX):
+            save_snapshot(record, opts.replay)
+        else:
+            with open(opts.replay, 'w', encoding='utf-8') as rfp:
+                record.write_json(rfp)
+        print_info("Saved {} txs to {}".format(record.get_size(), opts.replay), GREEN)
+        return []
+
+    entries = list(archive.lookup(opts.owner, opts.fund, opts.month, opts.run))
+    for entry in entries:
+        print_info("{} {} {} {} {}: {}".format(entry[RUN], entry[OWNER], entry[PLAN], entry[TYPE], entry[FUND], entry[TX]))
+    print_info("found {} txs".format(len(entries)), GREEN)
+    return entries
+
+
+if __name__ == '__main__':
+    import sys
+    record_archive_main(sys.argv[1:])
@@ -0,0 +1,325 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# recordSnapshot.py -- save and load an InvestmentRecord as a compact, versioned binary snapshot:
+#                      one table of the distinct strings, then columns of string indexes or integer amounts
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-24'
+__updated__ = '2019-08-29'
+
+import re
+import mmap
+import struct
+from array import array
+from collections import deque
+from itertools import starmap, repeat
+from functools import lru_cache
+from operator import setitem
+from Configuration import *
+
+SNAPSHOT_SUFFIX: str = '.snap'
+SNAPSHOT_MAGIC: bytes = b'MONS'
+SNAPSHOT_VERSION: int = 2
+# save the amounts as integers: the smallest file, but each amount text is rebuilt when loaded,
+# so it loads slower than the json file; by default the amount texts are in the string table
+INT_AMOUNTS_OPTION: str = '--int-amounts'
+
+# magic, version, bytes of strings, number of blocks, string index of the owner, source file and date
+HEADER = struct.Struct('<4sHIIIII')
+# the strings are saved as one text, split in one call when loaded
+STR_SEP: str = '\0'
+# a block is a run of txs with the same plan, tx type and keys: plan, tx type, number of txs, number of keys
+BLOCK = struct.Struct('<BBIH')
+# string index of the key, kind, amount format; then the column of values for that key follows the block
+COLUMN = struct.Struct('<IBB')
+# array types: string indexes, amounts
+INDEX_TYPE: str  = 'I'
+AMOUNT_TYPE: str = 'q'
+
+SNAP_PLANS = [PL_OPEN, PL_TFSA, PL_RRSP]
+SNAP_TX_TYPES = [TRADE, PRICE]
+
+# column kinds
+KIND_STR: int    = 0
+# all the values are amounts with the same format, only with INT_AMOUNTS_OPTION
+KIND_AMOUNT: int = 1
+# any other json values, saved as their json text
+KIND_JSON: int   = 2
+
+# amount format: low 4 bits are the number of decimals
+AMT_DECIMALS: int = 0x0f
+AMT_POINT: int    = 0x10
+AMT_DOLLAR: int   = 0x20
+# whole part formatted with '{:,}': ALSO set for a whole part below 1000, so '$234.56' and '$1,234.56' share it
+AMT_COMMAS: int   = 0x40
+# a negative value is in parentheses instead of with a '-', so '$5.00' and '($5.00)' share it
+AMT_PARENS: int   = 0x80
+
+# e.g. '$1,234.56', '(12.3400)', '-$5', '0.1234'
+RE_AMOUNT = re.compile(r"(\()?(-)?(\$)?([0-9]{1,3}(?:,[0-9]{3})+|[0-9]+)(\.[0-9]{1,15})?(\))?$")
+INT64_MAX: int = 2**63 - 1
+
+
+def encode_amount(text:str) -> (int, int):
+    """
+    :return: (value, format) such that decode_amount(value, format) == text; None if text is not an amount like that
+    """
+    re_match = RE_AMOUNT.match(text)
+    if not re_match:
+        return None
+    parens, neg, dollar, whole, frac, close = re_match.groups()
+    if bool(parens) != bool(close) or (parens and neg):
+        return None
+    decimals = len(frac) - 1 if frac else 0
+    value = int(whole.replace(',', '') + (frac[1:] if frac else ''))
+    if value >= INT64_MAX:
+        return None
+    fmt = decimals | (AMT_POINT if frac else 0) | (AMT_DOLLAR if dollar else 0) \
+        | (AMT_COMMAS if ',' in whole or len(whole) <= 3 else 0) | (AMT_PARENS if parens else 0)
+    # a '-' or parentheses are carried by the value as -(digits + 1), so '-0.00' is kept
+    if neg or parens:
+        value = -value - 1
+    # e.g. a leading zero is NOT kept, so leave those as strings
+    if decode_amount(value, fmt) != text:
+        return None
+    return value, fmt
+
+
+def encode_amounts(values:list) -> (array, int):
+    """
+    :return: (values, format) of a column of amounts that all fit ONE format; None if they do not
+    """
+    amounts = array(AMOUNT_TYPE)
+    fmts = set()
+    for value in values:
+        amount = encode_amount(value) if isinstance(value, str) else None
+        if amount is None:
+            return None
+        amounts.append(amount[0])
+        fmts.add(amount[1])
+    bases = {fmt & ~(AMT_COMMAS | AMT_PARENS) for fmt in fmts}
+    if len(bases) != 1:
+        return None
+    # commas unless a value is e.g. '1234'; parentheses if ANY value has them
+    fmt = bases.pop() | (AMT_COMMAS if all(fmt & AMT_COMMAS for fmt in fmts) else 0) \
+        | (AMT_PARENS if any(fmt & AMT_PARENS for fmt in fmts) else 0)
+    # e.g. '$1,234' and '1234', or '-5' and '(5)', do NOT fit one format
+    if decode_amounts(amounts, fmt) != values:
+        return None
+    return amounts, fmt
+
+
+@lru_cache(maxsize=None)
+def amount_templates(fmt:int) -> (int, str, str):
+    """
+    :return: scale, and the format strings of divmod(digits, scale) for a positive and a negative value
+    """
+    decimals = fmt & AMT_DECIMALS
+    template = ('$' if fmt & AMT_DOLLAR else '') + ('{:,}' if fmt & AMT_COMMAS else '{}')
+    if fmt & AMT_POINT:
+        template += '.{:0' + str(decimals) + 'd}'
+    if fmt & AMT_PARENS:
+        return 10 ** decimals, template, '(' + template + ')'
+    return 10 ** decimals, template, '-' + template
+
+
+def decode_amount(value:int, fmt:int) -> str:
+    scale, pos_template, neg_template = amount_templates(fmt)
+    if value < 0:
+        return neg_template.format(*divmod(-value - 1, scale))
+    return pos_template.format(*divmod(value, scale))
+
+
+def decode_amounts(values:array, fmt:int) -> list:
+    """
+    :return: text of each value; the usual column of positive values is done without a python call for each one
+    """
+    scale, pos_template, neg_template = amount_templates(fmt)
+    if values and min(values) >= 0:
+        return list(starmap(pos_template.format, map(divmod, values, repeat(scale))))
+    return [neg_template.format(*divmod(-value - 1, scale)) if value < 0 else pos_template.format(*divmod(value, scale))
+            for value in values]
+
+
+def is_snapshot(file_name:str) -> bool:
+    """
+    :return: True if the file starts with the snapshot magic, whatever its name
+    """
+    with open(file_name, 'rb') as sfp:
+        return sfp.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def to_little_endian(arr:array) -> array:
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+def save_snapshot(record, file_name:str, int_amounts:bool=False) -> int:
+    """
+    :param      record: InvestmentRecord OR InvestmentRecordReader
+    :param   file_name: snapshot file to write
+    :param int_amounts: save each column of amounts of the same format as integers, instead of the amount texts
+    :return: number of txs saved
+    """
+    strings = {}
+
+    def str_index(text:str) -> int:
+        indx = strings.get(text)
+        if indx is None:
+            if STR_SEP in text:
+                raise Exception("CANNOT save a key or name with a NUL character: {!r}".format(text))
+            indx = strings[text] = len(strings)
+        return indx
+
+    owner = str_index(record.get_owner())
+    source = str_index(record.get_filename())
+    date = str_index(record.get_date_str())
+
+    blocks = bytearray()
+    num_blocks = 0
+    num_txs = 0
+
+    def add_block(shape:tuple, txs:list):
+        plan, tx_type, keys = shape
+        columns = bytearray()
+        data = bytearray()
+        for key in keys:
+            values = [tx[key] for tx in txs]
+            column = encode_amounts(values) if int_amounts else None
+            if column:
+                amounts, fmt = column
+                columns += COLUMN.pack(str_index(key), KIND_AMOUNT, fmt)
+                data += to_little_endian(amounts).tobytes()
+            elif all(isinstance(value, str) and STR_SEP not in value for value in values):
+                columns += COLUMN.pack(str_index(key), KIND_STR, 0)
+                data += to_little_endian(array(INDEX_TYPE, [str_index(value) for value in values])).tobytes()
+            else:
+                columns += COLUMN.pack(str_index(key), KIND_JSON, 0)
+                data += to_little_endian(array(INDEX_TYPE, [str_index(json.dumps(value)) for value in values])).tobytes()
+        blocks.extend(BLOCK.pack(SNAP_PLANS.index(plan), SNAP_TX_TYPES.index(tx_type), len(txs), len(keys)))
+        blocks.extend(columns + data)
+
+    curr_shape = None
+    curr_txs = []
+    for plan, tx_type, tx in record.iter_all_txs():
+        shape = (plan, tx_type, tuple(tx.keys()))
+        if shape != curr_shape and curr_txs:
+            add_block(curr_shape, curr_txs)
+            num_blocks += 1
+            curr_txs = []
+        curr_shape = shape
+        curr_txs.append(tx)
+        num_txs += 1
+    if curr_txs:
+        add_block(curr_shape, curr_txs)
+        num_blocks += 1
+
+    blob = STR_SEP.join(strings).encode('utf-8')
+
+    with open(file_name, 'wb') as sfp:
+        sfp.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(blob), num_blocks, owner, source, date))
+        sfp.write(blob)
+        sfp.write(blocks)
+    return num_txs
+
+
+def load_snapshot(file_name:str) -> InvestmentRecord:
+    """
+    map the file and read each column straight from the map: the only copies are the arrays, strings and txs
+    :return: InvestmentRecord, the same as InvestmentRecord.from_json() of the record's JSON file
+    """
+    with open(file_name, 'rb') as sfp, mmap.mmap(sfp.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            memoryview(mm) as mv:
+        magic, version, str_size, num_blocks, owner, source, date = HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise Exception("'{}' is NOT a record snapshot!".format(file_name))
+        if version != SNAPSHOT_VERSION:
+            raise Exception("snapshot version {} of '{}' is NOT supported!".format(version, file_name))
+
+        def read_array(type_code:str, pos:int, size:int) -> (array, int):
+            arr = array(type_code)
+            arr.frombytes(mv[pos:pos + size * arr.itemsize])
+            return to_little_endian(arr), pos + size * arr.itemsize
+
+        pos = HEADER.size
+        strings = str(mv[pos:pos + str_size], 'utf-8').split(STR_SEP)
+        pos += str_size
+
+        record = InvestmentRecord()
+        if strings[owner] != UNKNOWN:
+            record.set_owner(strings[owner])
+        record.set_date(dt.strptime(strings[date], DATE_STR_FORMAT))
+        if strings[source] != UNKNOWN:
+            record.set_filename(strings[source])
+
+        plans = record.get_plans()
+        for _ in range(num_blocks):
+            plan, tx_type, size, num_keys = BLOCK.unpack_from(mm, pos)
+            pos += BLOCK.size
+            columns = []
+            for _ in range(num_keys):
+                columns.append(COLUMN.unpack_from(mm, pos))
+                pos += COLUMN.size
+            keys = []
+            values = []
+            for key, kind, fmt in columns:
+                keys.append(strings[key])
+                if kind == KIND_AMOUNT:
+                    amounts, pos = read_array(AMOUNT_TYPE, pos, size)
+                    values.append(decode_amounts(amounts, fmt))
+                else:
+                    indexes, pos = read_array(INDEX_TYPE, pos, size)
+                    texts = map(strings.__getitem__, indexes)
+                    values.append(list(texts) if kind == KIND_STR else list(map(json.loads, texts)))
+            # copies of a dict that already has the keys, then filled one column at a time: NO tuple for each value
+            txs = list(map(dict.copy, repeat(dict.fromkeys(keys), size)))
+            for key, column in zip(keys, values):
+                deque(map(setitem, txs, repeat(key), column), 0)
+            plans[SNAP_PLANS[plan]][SNAP_TX_TYPES[tx_type]].extend(txs)
+    return record
+
+
+def record_snapshot_main(args:list) -> str:
+    """
+    convert an InvestmentRecord JSON file to a snapshot, or a snapshot back to JSON
+    :return: message
+    """
+    usage = "usage: py36 recordSnapshot.py <record JSON file | snapshot file> [output file] [{}] [{}]"\
+            .format(PRETTY_OPTION, INT_AMOUNTS_OPTION)
+    pretty = PRETTY_OPTION in args
+    int_amounts = INT_AMOUNTS_OPTION in args
+    args = [arg for arg in args if arg not in (PRETTY_OPTION, INT_AMOUNTS_OPTION)]
+    if len(args) < 1:
+        print_error("NOT ENOUGH parameters!")
+        print_info(usage, MAGENTA)
+        exit(203)
+
+    in_file = args[0]
+    if not osp.isfile(in_file):
+        print_error("File path '{}' does not exist! Exiting...".format(in_file))
+        exit(208)
+
+    basename, _ = osp.splitext(in_file)
+    if is_snapshot(in_file):
+        out_file = args[1] if len(args) > 1 else basename + ".json"
+        record = load_snapshot(in_file)
+        with open(out_file, 'w', encoding='utf-8') as fp:
+            record.write_json(fp, JSON_INDENT if pretty else None)
+    else:
+        out_file = args[1] if len(args) > 1 else basename + SNAPSHOT_SUFFIX
+        with open(in_file, 'r', encoding='utf-8') as fp:
+            save_snapshot(InvestmentRecord.from_json(json.load(fp)), out_file, int_amounts)
+
+    msg = "recordSnapshot created file: {}".format(out_file)
+    print_info(msg, GREEN)
+    return msg
+
+
+if __name__ == '__main__':
+    record_snapshot_main(sys.argv[1:])
@@ -0,0 +1,133 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# stressParsers.py -- feed very long, nearly-matching lines to the Monarch report parsers
+#                     and check that the time per line stays bounded and grows linearly with the line length
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-08-19'
+__updated__ = '2019-08-19'
+
+import os
+from contextlib import redirect_stdout
+from time import perf_counter
+from argparse import ArgumentParser
+from Configuration import *
+
+# line lengths in characters
+LENGTHS = [10000, 100000]
+# most seconds for one line of the longest length
+LINE_BUDGET: float = 0.05
+# most growth in time for 10 x the line length: linear is ~10, quadratic ~100
+MAX_GROWTH: float = 25.0
+
+# lines that almost match a pattern at every position: name -> repeated text
+NEAR_MISSES = {
+    'upper case, no digits' : "ABCD",                  # fund: [A-Z]{3} then no number
+    'fund, short number'    : "ABC 12",                # fund: number too short
+    'date, no year'         : "12/34/",                # date: no 4 digit year
+    'dash, no code'         : " - x",                  # company: ' - ' then no fund code
+    'owner, no surname'     : "Mark H. Sattol",        # owner: name cut short
+    'owner, surname only'   : MON_SATT + " "
+}
+# lines to put the quarterly report parser in the state to look for a fund company
+QTREP_HEADER = [MON_MARK, "Page 1 of 12", "For the period Jan 1, 2019 to Mar 31, 2019", "OPEN 78512"]
+
+
+def pdf_txs_parser():
+    from parseMonarchTxRep import parse_pdf_txs
+    return lambda lines: parse_pdf_txs(lines, strnow)
+
+
+def qtrep_parser():
+    from parseMonarchQtrRep import MonarchQrepToGncPrices
+    from perfMetrics import PerfMetrics
+    # parsing only: skip __init__, which opens the Gnucash session
+    qtrep = object.__new__(MonarchQrepToGncPrices)
+    qtrep.mon_file = None
+    qtrep.prod = False
+    qtrep.metrics = PerfMetrics(MON)
+    return qtrep.parse_monarch_qtrep
+
+
+# name -> (make the parser, lines before the long line, lines after the long line)
+STRESS_PARSERS = {
+    'parse_pdf_txs'             : (pdf_txs_parser, [], []),
+    'parse_monarch_qtrep owner' : (qtrep_parser, [], [MON_MARK]),
+    'parse_monarch_qtrep fund'  : (qtrep_parser, QTREP_HEADER, [])
+}
+
+
+def time_line(parse, before:list, line:str, after:list, repeat:int) -> float:
+    """
+    :return: best seconds to parse the lines, less the time without the long line
+    """
+    best = best_base = None
+    for _ in range(repeat):
+        start = perf_counter()
+        parse(before + [line] + after)
+        mid = perf_counter()
+        parse(before + after)
+        end = perf_counter()
+        best = mid - start if best is None else min(best, mid - start)
+        best_base = end - mid if best_base is None else min(best_base, end - mid)
+    return max(best - best_base, 0.0)
+
+
+def stress_parsers_main(args:list) -> dict:
+    arg_parser = ArgumentParser(description='Check the time of the Monarch parsers on very long nearly-matching lines',
+                                prog='stressParsers.py')
+    arg_parser.add_argument('-n', '--lengths', nargs='+', type=int, default=LENGTHS, help='line lengths to try')
+    arg_parser.add_argument('-b', '--budget', type=float, default=LINE_BUDGET,
+                            help='most seconds for one line of the longest length')
+    arg_parser.add_argument('-r', '--repeat', type=int, default=5, help='runs of each line, best is used')
+    opts = arg_parser.parse_args(args)
+
+    lengths = sorted(opts.lengths)
+    saved_level = Gnulog.level
+    Gnulog.set_level(LOG_OFF)
+    results = {}
+    failures = []
+    try:
+        for name, (make_parser, before, after) in STRESS_PARSERS.items():
+            try:
+                parse = make_parser()
+            except ImportError as ie:
+                print_info("{}: NOT available: {}".format(name, ie), YELLOW)
+                continue
+            for miss, text in NEAR_MISSES.items():
+                secs = []
+                with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                    for length in lengths:
+                        line = text * (length // len(text))
+                        secs.append(time_line(parse, before, line, after, opts.repeat))
+                results["{}: {}".format(name, miss)] = dict(zip(lengths, secs))
+                if secs[-1] > opts.budget:
+                    failures.append("{}: {}: {:.4f}s for a line of {} characters".format(name, miss, secs[-1], lengths[-1]))
+                for i in range(1, len(lengths)):
+                    # times below a tenth of a millisecond are just noise
+                    if secs[i-1] > 1e-4:
+                        growth = (secs[i] / secs[i-1]) * (lengths[i-1] * 10.0 / lengths[i])
+                        if growth > MAX_GROWTH:
+                            failures.append("{}: {}: time grew {:.0f} x from {} to {} characters"
+                                            .format(name, miss, growth, lengths[i-1], lengths[i]))
+    finally:
+        Gnulog.level = saved_level
+
+    for key, by_length in results.items():
+        print_info("{:<50}".format(key) + ''.join("{:>12.5f}".format(s) for s in by_length.values()), CYAN)
+    for fail in failures:
+        print_error(fail)
+    if failures:
+        raise Exception("{} parser lines over the time bounds!".format(len(failures)))
+    print_info("all lines within {}s and linear growth".format(opts.budget), GREEN)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    stress_parsers_main(sys.argv[1:])
@@ -179,7 +179,7 @@ class MonarchGnucashServices(QDialog):
         try:
             ui_lgr.info('Calling mon_copy_rep_main...')
             response = mon_copy_rep_main(cl_params)
-            reply = {'response': response}
+            reply = {'response': response, 'metrics': get_last_metrics()}
         except Exception as bcce:
             msg = repr(bcce)
             ui_lgr.error(msg)
@@ -0,0 +1,147 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# benchmarkBackends.py -- compare the pdf text extraction backends on a folder of pdf reports:
+#                         throughput, peak memory and a line-level diff against a reference
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-05-26'
+__updated__ = '2019-08-29'
+
+import os
+import os.path as osp
+import json
+import difflib
+import tracemalloc
+from time import perf_counter
+from argparse import ArgumentParser
+from pdfBackends import BACKENDS, PDFMINER, PDFTOTEXT, TIKA, extract, available_backends
+
+SCRIPT_DIR = osp.dirname(osp.abspath(__file__))
+CORPUS_DIR = osp.join(SCRIPT_DIR, 'in')
+# backends that extract in a child process: Tika with NO server runs pdftotext
+CHILD_BACKENDS = (PDFTOTEXT, TIKA)
+
+
+def get_corpus(folder:str) -> list:
+    return sorted(osp.join(folder, f) for f in os.listdir(folder) if f.lower().endswith('.pdf'))
+
+
+def get_reference(pdf_path:str, reference:str) -> list:
+    """
+    :param  pdf_path: pdf file
+    :param reference: name of a backend OR a folder with a '<pdf basename>.txt' file for each pdf
+    :return: list of reference lines
+    """
+    if reference in BACKENDS:
+        return "".join(extract(pdf_path, reference)).splitlines()
+    basename, _ = osp.splitext(osp.basename(pdf_path))
+    with open(osp.join(reference, basename + '.txt'), encoding='utf-8') as rfp:
+        return rfp.read().splitlines()
+
+
+def diff_lines(lines:list, ref_lines:list) -> dict:
+    added = removed = 0
+    for line in difflib.unified_diff(ref_lines, lines, lineterm='', n=0):
+        if line.startswith('+') and not line.startswith('+++'):
+            added += 1
+        elif line.startswith('-') and not line.startswith('---'):
+            removed += 1
+    return {"Added": added, "Removed": removed,
+            "Ratio": round(difflib.SequenceMatcher(None, ref_lines, lines, autojunk=False).ratio(), 4)}
+
+
+def run_backend(backend:str, corpus:list, references:dict, repeat:int) -> dict:
+    """
+    extract every file in the corpus with one backend: first timed with NO tracing, then once more to measure memory
+    peak memory is the python heap for in-process backends and the largest of its own child processes for subprocess backends
+    """
+    result = {"Backend": backend, "Files": 0, "Pages": 0, "Bytes": 0, "Seconds": 0.0, "Errors": [], "Diff": {}}
+    done = []
+    for pdf_path in corpus:
+        try:
+            start = perf_counter()
+            for _ in range(repeat):
+                pages = extract(pdf_path, backend)
+            result["Seconds"] += (perf_counter() - start) / repeat
+        except Exception as rbe:
+            result["Errors"].append("{}: {}".format(osp.basename(pdf_path), repr(rbe)))
+            continue
+        done.append(pdf_path)
+        result["Files"] += 1
+        result["Pages"] += len(pages)
+        result["Bytes"] += osp.getsize(pdf_path)
+        if pdf_path in references:
+            result["Diff"][osp.basename(pdf_path)] = diff_lines("".join(pages).splitlines(), references[pdf_path])
+
+    # tracemalloc slows the in-process backends but NOT the subprocess ones, so keep it out of the timing
+    child_peaks = []
+    settings = {'on_child_exit': lambda usage: child_peaks.append(usage.ru_maxrss)} \
+        if backend in CHILD_BACKENDS else {}
+    tracemalloc.start()
+    try:
+        for pdf_path in done:
+            extract(pdf_path, backend, **settings)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result["Peak KB"] = peak // 1024
+    result["Child Peak KB"] = max(child_peaks) if child_peaks else 0
+    secs = result["Seconds"]
+    result["Pages/s"] = round(result["Pages"] / secs, 2) if secs else 0.0
+    result["MB/s"] = round(result["Bytes"] / secs / 1e6, 3) if secs else 0.0
+    ratios = [d["Ratio"] for d in result["Diff"].values()]
+    result["Mean Ratio"] = round(sum(ratios) / len(ratios), 4) if ratios else None
+    return result
+
+
+def print_table(results:list):
+    cols = ["Backend", "Files", "Pages", "Seconds", "Pages/s", "MB/s", "Peak KB", "Child Peak KB", "Mean Ratio"]
+    print(" | ".join("{:>13}".format(c) for c in cols))
+    for res in results:
+        print(" | ".join("{:>13}".format(round(res[c], 3) if isinstance(res[c], float) else str(res[c])) for c in cols))
+        for err in res["Errors"]:
+            print("    ERROR: {}".format(err))
+
+
+def process_args():
+    arg_parser = ArgumentParser(description='Benchmark the pdf text extraction backends', prog='benchmarkBackends.py')
+    arg_parser.add_argument('-c', '--corpus', default=CORPUS_DIR, help='folder of pdf files')
+    arg_parser.add_argument('-b', '--backends', nargs='+', default=available_backends(),
+                            choices=available_backends(), help='backends to compare')
+    arg_parser.add_argument('-r', '--reference', default=PDFMINER,
+                            help='backend name OR folder of reference .txt files to diff against')
+    arg_parser.add_argument('-n', '--repeat', type=int, default=1, help='extractions of each file per backend')
+    arg_parser.add_argument('-j', '--json', help='also save the results to this json file')
+    return arg_parser
+
+
+def benchmark_backends_main(args:list) -> list:
+    opts = process_args().parse_args(args)
+    corpus = get_corpus(opts.corpus)
+    print("{} pdf files in {}".format(len(corpus), opts.corpus))
+
+    references = {}
+    for pdf_path in corpus:
+        try:
+            references[pdf_path] = get_reference(pdf_path, opts.reference)
+        except Exception as bme:
+            print("NO reference for {}: {}".format(osp.basename(pdf_path), repr(bme)))
+
+    results = [run_backend(backend, corpus, references, opts.repeat) for backend in opts.backends]
+    print_table(results)
+
+    if opts.json:
+        with open(opts.json, 'w', encoding='utf-8') as jfp:
+            json.dump(results, jfp, indent=4)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_backends_main(sys.argv[1:])
@@ -1,11 +1,177 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# callPdfToText.py -- run a bounded pool of pdftotext processes over many pdf files and/or page ranges,
+#                     streaming the output of each job straight to its own text file
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-05'
+__updated__ = '2019-08-29'
 
-import os, subprocess
+import os
+import os.path as osp
+import re
+import shutil
+import subprocess
+from time import perf_counter
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-args = ["/usr/local/bin/pdftotext",
-        '-enc',
-        'UTF-8',
-        "{}/my-pdf.pdf".format(SCRIPT_DIR),
-        '-']
-res = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-output = res.stdout.decode('utf-8')
+SCRIPT_DIR = osp.dirname(osp.abspath(__file__))
+PDFTOTEXT_EXE: str = shutil.which('pdftotext') or '/usr/local/bin/pdftotext'
+PDFINFO_EXE: str   = shutil.which('pdfinfo') or '/usr/local/bin/pdfinfo'
+DEFAULT_TIMEOUT: float = 120.0
+
+# job status
+DONE: str    = 'done'
+FAILED: str  = 'failed'
+TIMEOUT: str = 'timeout'
+
+
+class PdfToTextJob:
+    """
+    one pdftotext run: a whole pdf file or the page range first to last
+    a job with an error, e.g. the pages could not be counted, is reported as failed without running
+    """
+    def __init__(self, p_pdf:str, p_out:str, p_first:int=0, p_last:int=0, p_error:str=None):
+        self.pdf_file = p_pdf
+        self.out_file = p_out
+        self.first = p_first
+        self.last = p_last
+        self.error = p_error
+
+    def get_args(self, p_exe:str, p_layout:bool) -> list:
+        args = [p_exe, '-enc', 'UTF-8']
+        if p_layout:
+            args.append('-layout')
+        if self.first:
+            args += ['-f', str(self.first)]
+        if self.last:
+            args += ['-l', str(self.last)]
+        return args + [self.pdf_file, '-']
+
+# END class PdfToTextJob
+
+
+class PdfToTextPool:
+    """
+    run pdftotext jobs concurrently -- each job is a separate process, so threads are enough to use all the cores
+    """
+    def __init__(self, p_workers:int=None, p_timeout:float=DEFAULT_TIMEOUT, p_exe:str=PDFTOTEXT_EXE,
+                 p_layout:bool=False):
+        self.workers = p_workers or os.cpu_count() or 1
+        self.timeout = p_timeout
+        self.exe = p_exe
+        self.layout = p_layout
+
+    def run_job(self, p_job:PdfToTextJob) -> dict:
+        """
+        stdout of the process is the output file, so the text never passes through this process
+        :return: status information for the job
+        """
+        result = {"pdf": p_job.pdf_file, "out": p_job.out_file, "first": p_job.first, "last": p_job.last}
+        start = perf_counter()
+        if p_job.error:
+            result["status"] = FAILED
+            result["error"] = p_job.error
+            result["seconds"] = 0.0
+            return result
+        try:
+            with open(p_job.out_file, 'wb') as ofp:
+                proc = subprocess.Popen(p_job.get_args(self.exe, self.layout), stdout=ofp, stderr=subprocess.PIPE)
+                try:
+                    _, err = proc.communicate(timeout=self.timeout)
+                    result["status"] = DONE if proc.returncode == 0 else FAILED
+                    if proc.returncode:
+                        result["error"] = err.decode('utf-8', 'replace').strip()
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.communicate()
+                    result["status"] = TIMEOUT
+        except OSError as rje:
+            result["status"] = FAILED
+            result["error"] = repr(rje)
+        if result["status"] != DONE and osp.isfile(p_job.out_file):
+            # do not leave partial output
+            os.remove(p_job.out_file)
+        result["seconds"] = round(perf_counter() - start, 4)
+        return result
+
+    def run(self, p_jobs:list) -> list:
+        """
+        :return: the results in the same order as the jobs
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(self.run_job, p_jobs))
+
+# END class PdfToTextPool
+
+
+def get_num_pages(pdf_file:str, exe:str=PDFINFO_EXE) -> int:
+    res = subprocess.run([exe, pdf_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    match = re.search(r"^Pages:\s+(\d+)", res.stdout.decode('utf-8', 'replace'), re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def make_jobs(pdf_files:list, out_dir:str, pages_per_job:int=0) -> list:
+    """
+    one job per pdf file, OR split each pdf file into ranges of pages_per_job pages
+    """
+    jobs = []
+    for pdf_file in pdf_files:
+        basename, _ = osp.splitext(osp.basename(pdf_file))
+        try:
+            num_pages = get_num_pages(pdf_file) if pages_per_job > 0 else 0
+        except (OSError, subprocess.CalledProcessError) as mje:
+            # report it with the other results instead of stopping the whole batch
+            jobs.append(PdfToTextJob(pdf_file, osp.join(out_dir, basename + '.txt'),
+                                     p_error="could NOT count the pages: {}".format(repr(mje))))
+            continue
+        if num_pages <= pages_per_job:
+            jobs.append(PdfToTextJob(pdf_file, osp.join(out_dir, basename + '.txt')))
+            continue
+        for first in range(1, num_pages + 1, pages_per_job):
+            last = min(first + pages_per_job - 1, num_pages)
+            jobs.append(PdfToTextJob(pdf_file, osp.join(out_dir, "{}_p{}-{}.txt".format(basename, first, last)),
+                                     first, last))
+    return jobs
+
+
+def process_args():
+    arg_parser = ArgumentParser(description='Extract the text of pdf files with a pool of pdftotext processes',
+                                prog='callPdfToText.py')
+    arg_parser.add_argument('pdf_files', nargs='+', help='pdf files to extract')
+    arg_parser.add_argument('-o', '--out', default=osp.join(SCRIPT_DIR, 'out'), help='folder for the text files')
+    arg_parser.add_argument('-w', '--workers', type=int, default=0, help='number of pdftotext processes; 0 = cpu count')
+    arg_parser.add_argument('-t', '--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds allowed per job')
+    arg_parser.add_argument('-p', '--pages', type=int, default=0, help='pages per job; 0 = whole file per job')
+    arg_parser.add_argument('--layout', action='store_true', help='keep the physical layout of the text')
+    arg_parser.add_argument('--exe', default=PDFTOTEXT_EXE, help='path of the pdftotext executable')
+    return arg_parser
+
+
+def call_pdf_to_text_main(args:list) -> list:
+    opts = process_args().parse_args(args)
+    os.makedirs(opts.out, exist_ok=True)
+
+    jobs = make_jobs(opts.pdf_files, opts.out, opts.pages)
+    pool = PdfToTextPool(opts.workers, opts.timeout, opts.exe, opts.layout)
+    start = perf_counter()
+    results = pool.run(jobs)
+    elapsed = perf_counter() - start
+
+    for res in results:
+        print("{:>7} {:>8.3f}s {}".format(res["status"], res["seconds"], res["out"]))
+        if res.get("error"):
+            print("        {}".format(res["error"]))
+    print("{} jobs on {} workers in {:.3f}s".format(len(results), pool.workers, elapsed))
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    call_pdf_to_text_main(sys.argv[1:])
@@ -8,13 +8,18 @@
 # @author Mark Sattolo <epistemik@gmail.com>
 # @version Python 3.6
 # @created 2018-12
-# @updated 2019-05-25
+# @updated 2019-08-15
 
 import os.path as osp
-import collections
-import json
 import PyPDF2
 from Configuration import *
+from pdfCache import PdfTextCache
+from pdfBackends import PYPDF2, extract, iter_lines
+from parseMonarchTxRep import parse_pdf_txs
+from perfProfile import PROFILE_OPTION, PROFILE_TOP_OPTION, profiled
+
+# parse the pdf straight to an InvestmentRecord instead of a text file
+TXS_OPTION = 'txs'
 
 
 # noinspection PyPep8
@@ -25,19 +30,34 @@ def get_page(read_pdf, page_num):
     print_info(page_content.encode('utf-8'), GREEN)
 
 
-def get_all_pages(pdf_reader, fp):
-    c = collections.Counter(range(pdf_reader.getNumPages()))
-    for i in c:
-        page = pdf_reader.getPage(i)
-        page_text = page.extractText()
+def get_all_pages(pdf_path, fp, cache=None):
+    """
+    write the text of all the pages to fp -- from the cache if this pdf content has been extracted before
+    """
+    if cache is None:
+        cache = PdfTextCache()
+    for page_text in extract(pdf_path, PYPDF2, cache):
         print_info(page_text, BLUE)
         fp.write(page_text)
 
 
+def parse_pdf_report(pdf_path, ts, backend=PYPDF2, cache=None):
+    """
+    stream the lines of each page straight into the Monarch transaction report parser:
+    NO intermediate text file, and parsing starts as soon as the first page is extracted
+    :return: Configuration.InvestmentRecord object
+    """
+    record = parse_pdf_txs(iter_lines(pdf_path, backend, cache), ts)
+    record.set_filename(pdf_path)
+    return record
+
+
+@profiled('parsePdf')
 def parse_pdf_main(args):
     print_info("len(args) = {}".format(len(args)))
     if len(args) < 1:
-        print_error("Usage: py36 parsePdf.py <pdf_input_path> [page_num]")
+        print_error("Usage: py36 parsePdf.py <pdf_input_path> [page_num | {}] [{}] [{} N]"
+                    .format(TXS_OPTION, PROFILE_OPTION, PROFILE_TOP_OPTION))
         exit()
 
     monarch = args[0]
@@ -45,17 +65,13 @@ def parse_pdf_main(args):
 
     page_num = 0
     read_all = True
+    parse_txs = False
     if len(args) > 1:
-        page_num = int(args[1]) - 1
-        read_all = False
-
-    # parse an external Monarch pdf report file
-    pdf_file = open(monarch, 'rb')
-    pdf_reader = PyPDF2.PdfFileReader(pdf_file)
-
-    doc_info = pdf_reader.getDocumentInfo()
-    print_info("doc_info: {0}".format(json.dumps(doc_info)), BLUE)
-    print_info("number of pages = {0}".format(pdf_reader.getNumPages()), CYAN)
+        if args[1] == TXS_OPTION:
+            parse_txs = True
+        else:
+            page_num = int(args[1]) - 1
+            read_all = False
 
     # print info as txt file
     # pluck path and basename from pdf file name to use for the saved file
@@ -66,15 +82,23 @@ def parse_pdf_main(args):
     now = dt.now().strftime(DATE_STR_FORMAT)
     path = path.replace('in', 'out')
     (basename, ext) = osp.splitext(fname)
+    if parse_txs:
+        record = parse_pdf_report(monarch, now)
+        out_file = GncUtilities.save_to_json(path + '/' + basename, record, now)
+        print_info("\n >>> PROGRAM ENDED.", CYAN)
+        return "parsePdf created file: {}".format(out_file)
+
     # add a timestamp to get a unique file name
     out_file = path + '/' + basename + '_' + now + '.txt'
     print_info("\nout_file: {}".format(out_file), GREEN)
     fp = open(out_file, 'w')
 
     if read_all:
-        get_all_pages(pdf_reader, fp)
+        get_all_pages(monarch, fp)
     else:
-        get_page(pdf_reader, page_num)
+        # parse an external Monarch pdf report file
+        with open(monarch, 'rb') as pdf_file:
+            get_page(PyPDF2.PdfFileReader(pdf_file), page_num)
 
     fp.close()
 
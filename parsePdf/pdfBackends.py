@@ -0,0 +1,220 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# pdfBackends.py -- registry of the different ways to get the text out of a Monarch pdf report,
+#                   all returning a list with the text of each page
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-05-26'
+__updated__ = '2019-08-29'
+
+import os
+import re
+import atexit
+import codecs
+import socket
+import subprocess
+from html import unescape
+from urllib.parse import urlparse
+from callPdfToText import PDFTOTEXT_EXE
+
+PYPDF2: str    = 'pypdf2'
+PDFMINER: str  = 'pdfminer'
+PDFTOTEXT: str = 'pdftotext'
+TIKA: str      = 'tika'
+
+DEFAULT_BACKEND: str = PDFMINER
+TIKA_SERVER: str     = 'http://localhost:9998'
+# pdftotext separates the pages with a form feed
+PAGE_BREAK: str = '\f'
+
+# name -> generator function(pdf_path, **settings) yielding the text of each page as soon as it is extracted
+BACKENDS = {}
+# settings -> pdfminerContext.PdfminerContext
+PDFMINER_CONTEXTS = {}
+
+
+def register_backend(name:str):
+    """
+    decorator to add an extraction function to the registry
+    """
+    def add_backend(func):
+        BACKENDS[name] = func
+        return func
+    return add_backend
+
+
+def extract(pdf_path:str, backend:str=DEFAULT_BACKEND, cache=None, **settings) -> list:
+    """
+    get the text of each page of a pdf file
+    :param  pdf_path: pdf file to read
+    :param   backend: name of a registered backend
+    :param     cache: optional pdfCache.PdfTextCache to save and re-use the extracted text
+    :param  settings: backend specific options
+    :return: list of page text
+    """
+    if backend not in BACKENDS:
+        raise Exception("UNKNOWN pdf backend '{}'! Use one of {}".format(backend, sorted(BACKENDS)))
+    backend, settings = actual_backend(backend, settings)
+    func = BACKENDS[backend]
+    if cache is None:
+        return list(func(pdf_path, **settings))
+    return cache.extract(pdf_path, backend, lambda p: func(p, **settings), settings)
+
+
+def iter_lines(pdf_path:str, backend:str=DEFAULT_BACKEND, cache=None, **settings):
+    """
+    generator of the text lines of a pdf file, page by page, so a parser can start on the first page
+    while the later pages are still being extracted
+    """
+    if backend not in BACKENDS:
+        raise Exception("UNKNOWN pdf backend '{}'! Use one of {}".format(backend, sorted(BACKENDS)))
+    pages = BACKENDS[backend](pdf_path, **settings) if cache is None else extract(pdf_path, backend, cache, **settings)
+    for page in pages:
+        for line in page.splitlines(True):
+            yield line
+
+
+def actual_backend(backend:str, settings:dict) -> (str, dict):
+    """
+    :return: the backend that really extracts the text and its settings: Tika with NO server is its stand-in,
+             so e.g. the cache keeps that text under the stand-in's name, NOT as Tika text
+    """
+    if backend == TIKA and not tika_available(settings.get('server', TIKA_SERVER)):
+        stand_in_settings = {k: v for k, v in settings.items() if k not in ('server', 'stand_in')}
+        return settings.get('stand_in', PDFTOTEXT), stand_in_settings
+    return backend, settings
+
+
+def wait_child(proc:subprocess.Popen):
+    """
+    wait for the child with os.wait4 to get the usage of THIS child, NOT the largest of all the children so far;
+    sets proc.returncode, as Popen.wait()
+    :return: resource usage of the child, e.g. ru_maxrss is its peak memory in KB
+    """
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    return usage
+
+
+@register_backend(PYPDF2)
+def pypdf2_pages(pdf_path:str):
+    import PyPDF2
+    with open(pdf_path, 'rb') as pfp:
+        pdf_reader = PyPDF2.PdfFileReader(pfp)
+        for i in range(pdf_reader.getNumPages()):
+            yield pdf_reader.getPage(i).extractText()
+
+
+@register_backend(PDFMINER)
+def pdfminer_pages(pdf_path:str, preset:str='default', **laparams):
+    """
+    the pdfminer objects are kept for the whole batch -- one shared context per group of settings;
+    if that context is still reading another pdf, e.g. two of these generators are interleaved,
+    this pdf gets its own context so the font caches of the two documents are never mixed
+    """
+    from pdfminerContext import PdfminerContext
+    key = (preset, tuple(sorted(laparams.items())))
+    if key not in PDFMINER_CONTEXTS:
+        PDFMINER_CONTEXTS[key] = PdfminerContext(preset, **laparams)
+    context = PDFMINER_CONTEXTS[key]
+    if not context.busy:
+        yield from context.iter_pages(pdf_path)
+        return
+    with PdfminerContext(preset, **laparams) as own_context:
+        yield from own_context.iter_pages(pdf_path)
+
+
+@atexit.register
+def close_pdfminer_contexts():
+    for context in PDFMINER_CONTEXTS.values():
+        context.close()
+    PDFMINER_CONTEXTS.clear()
+
+
+@register_backend(PDFTOTEXT)
+def pdftotext_pages(pdf_path:str, exe:str=PDFTOTEXT_EXE, layout:bool=False, chunk_size:int=64*1024,
+                    on_child_exit=None):
+    """
+    read the pdftotext output as it is produced and yield each page at its page break;
+    if the reader stops early, e.g. at the end of a report, the child is killed and NOT an error
+    :param on_child_exit: optional function(resource usage) called when the child has ended, e.g. for a benchmark
+    """
+    args = [exe, '-enc', 'UTF-8']
+    if layout:
+        args.append('-layout')
+    args += [pdf_path, '-']
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    reader = codecs.getincrementaldecoder('utf-8')()
+    partial = ''
+    at_end = False
+    try:
+        for chunk in iter(lambda: proc.stdout.read1(chunk_size), b''):
+            pages = (partial + reader.decode(chunk)).split(PAGE_BREAK)
+            partial = pages.pop()
+            for page in pages:
+                yield page
+        at_end = True
+        # the output ends with a page break, so anything left over is a final page without one
+        partial += reader.decode(b'', final=True)
+        if partial:
+            yield partial
+    finally:
+        if not at_end:
+            # closed OR an error before all the output was read: the rest is NOT needed
+            proc.kill()
+        proc.stdout.close()
+        usage = wait_child(proc)
+        if on_child_exit:
+            on_child_exit(usage)
+    # only the return code of a child whose output was read to the end
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+def tika_available(server:str=TIKA_SERVER) -> bool:
+    try:
+        from tika import parser
+    except ImportError:
+        return False
+    return tika_server_running(server)
+
+
+def tika_server_running(server:str=TIKA_SERVER) -> bool:
+    url = urlparse(server)
+    try:
+        with socket.create_connection((url.hostname, url.port or 80), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+@register_backend(TIKA)
+def tika_pages(pdf_path:str, server:str=TIKA_SERVER, stand_in:str=PDFTOTEXT, **stand_in_settings):
+    """
+    Tika is optional: if the package is missing or NO server is running, use a local backend as a stand-in
+    rather than having tika download and start a server
+    """
+    if not tika_available(server):
+        yield from BACKENDS[stand_in](pdf_path, **stand_in_settings)
+        return
+
+    from tika import parser
+    raw = parser.from_file(pdf_path, serverEndpoint=server, xmlContent=True)
+    content = raw.get('content') or ''
+    # each page is a separate div in the xhtml content
+    for chunk in content.split('<div class="page">')[1:]:
+        yield strip_xhtml(chunk.split('</div>')[0])
+
+
+def strip_xhtml(chunk:str) -> str:
+    text = re.sub(r"</p>|<br\s*/?>", '\n', chunk)
+    return unescape(re.sub(r"<[^>]+>", '', text))
+
+
+def available_backends() -> list:
+    return sorted(BACKENDS)
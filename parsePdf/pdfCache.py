@@ -0,0 +1,195 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# pdfCache.py -- content-addressed cache of the text extracted from PDF reports,
+#                keyed by the pdf content hash plus the extraction backend and its settings
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-05-26'
+__updated__ = '2019-05-26'
+
+import os
+import os.path as osp
+import json
+import hashlib
+from argparse import ArgumentParser
+
+SCRIPT_DIR = osp.dirname(osp.abspath(__file__))
+CACHE_DIR: str = osp.join(SCRIPT_DIR, 'out', '.cache')
+CACHE_SFX: str = '.json'
+# default size limit of the whole cache folder
+CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+HASH_CHUNK: int = 1024 * 1024
+
+# entry fields
+PAGES: str    = "Pages"
+SOURCE: str   = "Source File"
+BACKEND: str  = "Backend"
+SETTINGS: str = "Settings"
+UNKNOWN: str  = "UNKNOWN"
+
+
+class PdfTextCache:
+    """
+    Store the per-page text extracted from a pdf file so that repeat extractions are just disk reads
+    """
+    def __init__(self, p_dir:str=CACHE_DIR, p_max_bytes:int=CACHE_MAX_BYTES):
+        self.cache_dir = p_dir
+        self.max_bytes = p_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def content_hash(p_pdf:str) -> str:
+        """
+        :param p_pdf: path to the pdf file
+        :return: sha256 hex digest of the file CONTENT, so renamed or copied reports share a cache entry
+        """
+        sha = hashlib.sha256()
+        with open(p_pdf, 'rb') as pfp:
+            for chunk in iter(lambda: pfp.read(HASH_CHUNK), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    @staticmethod
+    def make_key(p_hash:str, p_backend:str, p_settings:dict=None) -> str:
+        """
+        combine the content hash with the backend name and settings: any change to these gives a new entry
+        """
+        settings = json.dumps(p_settings or {}, sort_keys=True, default=str)
+        return hashlib.sha256("{}|{}|{}".format(p_hash, p_backend, settings).encode('utf-8')).hexdigest()
+
+    def entry_path(self, p_key:str) -> str:
+        return osp.join(self.cache_dir, p_key + CACHE_SFX)
+
+    def get(self, p_key:str):
+        """
+        :return: list of page text strings or None if NOT in the cache
+        """
+        entry = self.entry_path(p_key)
+        try:
+            with open(entry, 'r', encoding='utf-8') as cfp:
+                pages = json.load(cfp)[PAGES]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        # update the time stamps so that eviction removes the least recently used entries first
+        os.utime(entry, None)
+        self.hits += 1
+        return pages
+
+    def put(self, p_key:str, p_pages:list, p_source:str='', p_backend:str='', p_settings:dict=None):
+        """
+        write the entry to a temp file then rename, so an interrupted run never leaves a partial entry
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(p_key)
+        tmp_file = entry + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as cfp:
+            json.dump({SOURCE: osp.basename(p_source), BACKEND: p_backend, SETTINGS: p_settings or {},
+                       PAGES: list(p_pages)}, cfp, default=str)
+        os.replace(tmp_file, entry)
+        self.evict()
+
+    def extract(self, p_pdf:str, p_backend:str, p_extractor, p_settings:dict=None) -> list:
+        """
+        get the pages from the cache or run the extractor and save the result
+        :param       p_pdf: path to the pdf file
+        :param   p_backend: name of the extraction backend
+        :param p_extractor: function(p_pdf) -> list of page text
+        :param  p_settings: backend settings that affect the extracted text
+        :return: list of page text strings
+        """
+        key = self.make_key(self.content_hash(p_pdf), p_backend, p_settings)
+        pages = self.get(key)
+        if pages is None:
+            pages = list(p_extractor(p_pdf))
+            self.put(key, pages, p_pdf, p_backend, p_settings)
+        return pages
+
+    def entries(self) -> list:
+        """
+        :return: list of (path, size, mtime) for each cache entry, oldest first
+        """
+        if not osp.isdir(self.cache_dir):
+            return []
+        found = []
+        for ent in os.scandir(self.cache_dir):
+            if ent.is_file() and ent.name.endswith(CACHE_SFX):
+                st = ent.stat()
+                found.append((ent.path, st.st_size, st.st_mtime))
+        return sorted(found, key=lambda e: e[2])
+
+    def evict(self, p_max_bytes:int=None) -> int:
+        """
+        remove the least recently used entries until the cache is no bigger than the size limit
+        :return: number of entries removed
+        """
+        limit = self.max_bytes if p_max_bytes is None else p_max_bytes
+        found = self.entries()
+        total = sum(e[1] for e in found)
+        removed = 0
+        for path, size, _ in found:
+            if total <= limit:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def clear(self) -> int:
+        return self.evict(0)
+
+    def stats(self) -> dict:
+        found = self.entries()
+        backends = {}
+        for path, _, _ in found:
+            try:
+                with open(path, 'r', encoding='utf-8') as cfp:
+                    name = json.load(cfp).get(BACKEND, UNKNOWN)
+            except (OSError, ValueError):
+                name = UNKNOWN
+            backends[name] = backends.get(name, 0) + 1
+        return {
+            "Directory" : self.cache_dir ,
+            "Entries"   : len(found) ,
+            "Bytes"     : sum(e[1] for e in found) ,
+            "Max Bytes" : self.max_bytes ,
+            "Backends"  : backends ,
+            "Hits"      : self.hits ,
+            "Misses"    : self.misses ,
+            "Evictions" : self.evictions
+        }
+
+# END class PdfTextCache
+
+
+def process_args():
+    arg_parser = ArgumentParser(description='Manage the cache of text extracted from pdf reports', prog='pdfCache.py')
+    arg_parser.add_argument('command', choices=['stats', 'evict', 'clear'], help='cache operation to run')
+    arg_parser.add_argument('-d', '--dir', default=CACHE_DIR, help='cache folder')
+    arg_parser.add_argument('-m', '--max-bytes', type=int, default=CACHE_MAX_BYTES, help='size limit for evict')
+    return arg_parser
+
+
+def pdf_cache_main(args:list):
+    opts = process_args().parse_args(args)
+    cache = PdfTextCache(opts.dir, opts.max_bytes)
+    if opts.command == 'evict':
+        print("evicted {} entries".format(cache.evict()))
+    elif opts.command == 'clear':
+        print("removed {} entries".format(cache.clear()))
+    result = cache.stats()
+    print(json.dumps(result, indent=4))
+    return result
+
+
+if __name__ == '__main__':
+    import sys
+    pdf_cache_main(sys.argv[1:])
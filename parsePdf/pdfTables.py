@@ -0,0 +1,203 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# pdfTables.py -- recover the transaction tables of a Monarch pdf report from the pdfminer layout,
+#                 clustering the text line coordinates into rows and columns, and return Monarch trade records
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-05-26'
+__updated__ = '2019-05-26'
+
+import re
+from time import perf_counter
+from argparse import ArgumentParser
+from pdfminer.layout import LAParams, LTTextBox, LTTextLine
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.pdfpage import PDFPage
+from Configuration import *
+
+# the table header labels in column order
+TABLE_COLUMNS = [TRADE_DATE, DESC, GROSS, NET, UNITS, PRICE, UNIT_BAL]
+# max vertical distance, in points, between text lines in the same row
+ROW_TOLERANCE: float = 3.0
+
+re_tbl_date = re.compile(r"^([0-9]{2}/[0-9]{2}/[0-9]{4})$")
+re_tbl_fund = re.compile(r"^(.*)/([A-Z]{3})\s?([0-9]{3,5})-")
+re_tbl_plan = re.compile(r"^(OPEN|TFSA|RRSP)\b")
+
+
+def get_text_lines(layout) -> list:
+    """
+    :param layout: pdfminer LTPage
+    :return: list of (top, x0, x1, text) for every text line on the page
+    """
+    lines = []
+    for element in layout:
+        if isinstance(element, LTTextBox):
+            for line in element:
+                if isinstance(line, LTTextLine):
+                    text = line.get_text().strip()
+                    if text:
+                        lines.append((line.y1, line.x0, line.x1, text))
+    return lines
+
+
+def group_rows(lines:list, tolerance:float=ROW_TOLERANCE) -> list:
+    """
+    cluster the text lines into rows from the top of the page down, each row sorted left to right
+    """
+    rows = []
+    for top, x0, x1, text in sorted(lines, key=lambda ln: (-ln[0], ln[1])):
+        if rows and rows[-1][0] - top <= tolerance:
+            rows[-1][1].append((x0, x1, text))
+        else:
+            rows.append([top, [(x0, x1, text)]])
+    return [sorted(cells) for _, cells in rows]
+
+
+def find_header(row:list) -> list:
+    """
+    :return: the left x of each of the table columns if this row is the transaction table header, else None
+    """
+    labels = {text: x0 for x0, _, text in row}
+    if all(col in labels for col in TABLE_COLUMNS):
+        return [labels[col] for col in TABLE_COLUMNS]
+    return None
+
+
+def assign_columns(row:list, col_x:list) -> dict:
+    """
+    put each cell of the row in the column whose header starts nearest on its left
+    right-aligned numbers can start left of their header, so use the midpoints between the headers as the boundaries
+    """
+    bounds = [(col_x[i] + col_x[i + 1]) / 2.0 for i in range(len(col_x) - 1)]
+    cells = {}
+    for x0, x1, text in row:
+        centre = (x0 + x1) / 2.0
+        indx = 0
+        while indx < len(bounds) and centre >= bounds[indx]:
+            indx += 1
+        col = TABLE_COLUMNS[indx]
+        cells[col] = (cells[col] + ' ' + text) if col in cells else text
+    return cells
+
+
+class MonarchTableExtractor:
+    """
+    Get the trade records from the transaction tables of a Monarch pdf report
+    """
+    def __init__(self, p_laparams:LAParams=None):
+        self.rsrc_mgr = PDFResourceManager(caching=True)
+        self.device = PDFPageAggregator(self.rsrc_mgr, laparams=p_laparams or LAParams())
+        self.interpreter = PDFPageInterpreter(self.rsrc_mgr, self.device)
+
+    def get_page_rows(self, pdf_file:str):
+        """
+        :return: generator of the rows of each page
+        """
+        with open(pdf_file, 'rb') as pfp:
+            for page in PDFPage.get_pages(pfp, caching=True):
+                self.interpreter.process_page(page)
+                yield group_rows(get_text_lines(self.device.get_result()))
+
+    def extract_trades(self, pdf_file:str) -> list:
+        """
+        a row with a date in the Trade Date column starts a new trade
+        following rows without a date continue the description of that trade
+        :return: list of (plan type, trade dict) with the same keys as parseMonarchTxRep.parse_pdf_txs
+        """
+        trades = []
+        plan_type = UNKNOWN
+        fund_company = fund_code = UNKNOWN
+        col_x = None
+        curr_tx = None
+        for rows in self.get_page_rows(pdf_file):
+            # the header is repeated on each page
+            col_x = None
+            for row in rows:
+                first_text = row[0][2]
+                match_plan = re.match(re_tbl_plan, first_text)
+                if match_plan:
+                    plan_type = match_plan.group(1)
+                    col_x = curr_tx = None
+                    continue
+                match_fund = re.match(re_tbl_fund, first_text)
+                if match_fund:
+                    fund_company, fund_code = match_fund.group(2), match_fund.group(3)
+                    col_x = curr_tx = None
+                    continue
+                header = find_header(row)
+                if header:
+                    col_x = header
+                    continue
+                if col_x is None:
+                    continue
+
+                cells = assign_columns(row, col_x)
+                date_cell = cells.get(TRADE_DATE, '')
+                if re.match(re_tbl_date, date_cell):
+                    curr_tx = {FUND_CMPY: fund_company, FUND_CODE: fund_code, TRADE_DATE: date_cell,
+                               DESC: cells.get(DESC, '')}
+                    for col in TABLE_COLUMNS[2:]:
+                        curr_tx[col] = cells.get(col, '')
+                    trades.append((plan_type, curr_tx))
+                elif curr_tx is not None and set(cells) == {DESC}:
+                    curr_tx[DESC] += (':' + cells[DESC])
+                else:
+                    # end of this table
+                    col_x = curr_tx = None
+        return trades
+
+    def close(self):
+        self.device.close()
+
+# END class MonarchTableExtractor
+
+
+def extract_trade_record(pdf_file:str) -> InvestmentRecord:
+    extractor = MonarchTableExtractor()
+    try:
+        trades = extractor.extract_trades(pdf_file)
+    finally:
+        extractor.close()
+    record = InvestmentRecord()
+    record.set_filename(pdf_file)
+    for plan_type, trade in trades:
+        record.add_tx(plan_type, TRADE, trade)
+    return record
+
+
+def time_tabula(pdf_file:str) -> float:
+    import tabula
+    start = perf_counter()
+    tabula.read_pdf(pdf_file, pages='all', output_format='json')
+    return perf_counter() - start
+
+
+def pdf_tables_main(args:list):
+    arg_parser = ArgumentParser(description='Extract the transaction tables of Monarch pdf reports',
+                                prog='pdfTables.py')
+    arg_parser.add_argument('pdf_files', nargs='+', help='Monarch pdf reports')
+    arg_parser.add_argument('--compare', action='store_true', help='also time tabula on the same files')
+    opts = arg_parser.parse_args(args)
+
+    for pdf_file in opts.pdf_files:
+        start = perf_counter()
+        record = extract_trade_record(pdf_file)
+        elapsed = perf_counter() - start
+        print_info("{}: {} trades in {:.3f}s with pdfminer".format(pdf_file, record.get_size(), elapsed), GREEN)
+        if opts.compare:
+            try:
+                print_info("{}: {:.3f}s with tabula".format(pdf_file, time_tabula(pdf_file)), YELLOW)
+            except ImportError:
+                print_error("tabula is NOT installed!")
+
+
+if __name__ == '__main__':
+    import sys
+    pdf_tables_main(sys.argv[1:])
@@ -0,0 +1,160 @@
+###############################################################################################################################
+# coding=utf-8
+#
+# pdfminerContext.py -- long-lived pdfminer extraction context: one resource manager, text converter and
+#                       page interpreter for all the pages of a document and all the documents of a batch
+#
+# Copyright (c) 2019 Mark Sattolo <epistemik@gmail.com>
+#
+__author__ = 'Mark Sattolo'
+__author_email__ = 'epistemik@gmail.com'
+__python_version__ = 3.6
+__created__ = '2019-05-27'
+__updated__ = '2019-08-29'
+
+import os
+import os.path as osp
+from io import StringIO
+from time import perf_counter
+from argparse import ArgumentParser
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+
+SCRIPT_DIR = osp.dirname(osp.abspath(__file__))
+
+# LAParams settings to choose from
+DEFAULT: str = 'default'
+MONARCH: str = 'monarch'
+FAST: str    = 'fast'
+LAPARAMS_PRESETS = {
+    # pdfminer defaults
+    DEFAULT : {} ,
+    # Monarch reports: tight line spacing in the tables, keep the columns of a row apart
+    MONARCH : {'line_margin': 0.3, 'char_margin': 1.5, 'word_margin': 0.1} ,
+    # NO advanced layout analysis, just the text in content stream order
+    FAST    : {'boxes_flow': None, 'detect_vertical': False, 'all_texts': False}
+}
+
+
+def make_laparams(preset:str=DEFAULT, **overrides) -> LAParams:
+    if preset not in LAPARAMS_PRESETS:
+        raise Exception("UNKNOWN LAParams preset '{}'! Use one of {}".format(preset, sorted(LAPARAMS_PRESETS)))
+    settings = dict(LAPARAMS_PRESETS[preset])
+    settings.update(overrides)
+    return LAParams(**settings)
+
+
+class PdfminerContext:
+    """
+    Keep the pdfminer objects alive between pages and documents instead of building new ones for each page file.
+    CMaps are cached by pdfminer for the whole process, and the fonts are cached by the resource manager
+    for all the pages of a document -- the font cache is keyed by pdf object id, which is only unique inside
+    ONE document, so it is cleared when the context moves to the next document -- and only ONE document
+    can be read at a time: a second iter_pages() while the first is still being read is refused.
+    """
+    def __init__(self, p_preset:str=DEFAULT, **overrides):
+        self.preset = p_preset
+        self.laparams = make_laparams(p_preset, **overrides)
+        self.rsrc_mgr = PDFResourceManager(caching=True)
+        self.retstr = StringIO()
+        self.device = TextConverter(self.rsrc_mgr, self.retstr, laparams=self.laparams)
+        self.interpreter = PDFPageInterpreter(self.rsrc_mgr, self.device)
+        self.documents = 0
+        self.pages = 0
+        self.busy = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_settings(self) -> dict:
+        """
+        :return: the settings that affect the extracted text, e.g. for a cache key
+        """
+        settings = {k: v for k, v in vars(self.laparams).items() if not k.startswith('_')}
+        settings['preset'] = self.preset
+        return settings
+
+    def iter_pages(self, pdf_path:str, page_numbers=None):
+        """
+        generator of the text of each page
+        :param     pdf_path: pdf file
+        :param page_numbers: optional set of zero-based page numbers to extract
+        """
+        if self.busy:
+            raise Exception("pdfminer context is still reading another document: CANNOT start '{}'!".format(pdf_path))
+        self.busy = True
+        try:
+            if self.documents:
+                self.rsrc_mgr._cached_fonts.clear()
+            self.documents += 1
+            with open(pdf_path, 'rb') as pfp:
+                for page in PDFPage.get_pages(pfp, page_numbers, caching=True, check_extractable=True):
+                    self.interpreter.process_page(page)
+                    self.pages += 1
+                    text = self.retstr.getvalue()
+                    self.retstr.seek(0)
+                    self.retstr.truncate(0)
+                    yield text
+        finally:
+            # also when the generator is closed before the last page
+            self.busy = False
+
+    def extract_pages(self, pdf_path:str, page_numbers=None) -> list:
+        return list(self.iter_pages(pdf_path, page_numbers))
+
+    def close(self):
+        self.device.close()
+        self.retstr.close()
+
+# END class PdfminerContext
+
+
+def time_fresh_per_page(corpus:list, preset:str) -> (float, int):
+    """
+    the old way: new pdfminer objects for every page
+    """
+    pages = 0
+    start = perf_counter()
+    for pdf_path in corpus:
+        with open(pdf_path, 'rb') as pfp:
+            num_pages = sum(1 for _ in PDFPage.get_pages(pfp))
+        for indx in range(num_pages):
+            with PdfminerContext(preset) as ctx:
+                pages += len(ctx.extract_pages(pdf_path, {indx}))
+    return perf_counter() - start, pages
+
+
+def time_shared(corpus:list, preset:str) -> (float, int):
+    start = perf_counter()
+    with PdfminerContext(preset) as ctx:
+        for pdf_path in corpus:
+            ctx.extract_pages(pdf_path)
+        pages = ctx.pages
+    return perf_counter() - start, pages
+
+
+def pdfminer_context_main(args:list) -> dict:
+    arg_parser = ArgumentParser(description='Measure the speedup of a shared pdfminer context on a pdf corpus',
+                                prog='pdfminerContext.py')
+    arg_parser.add_argument('-c', '--corpus', default=osp.join(SCRIPT_DIR, 'in'), help='folder of pdf files')
+    arg_parser.add_argument('-p', '--preset', default=DEFAULT, choices=sorted(LAPARAMS_PRESETS), help='LAParams preset')
+    opts = arg_parser.parse_args(args)
+
+    corpus = sorted(osp.join(opts.corpus, f) for f in os.listdir(opts.corpus) if f.lower().endswith('.pdf'))
+    fresh_secs, fresh_pages = time_fresh_per_page(corpus, opts.preset)
+    shared_secs, shared_pages = time_shared(corpus, opts.preset)
+    results = {"files": len(corpus), "preset": opts.preset, "fresh per page": [fresh_pages, round(fresh_secs, 3)],
+               "shared": [shared_pages, round(shared_secs, 3)],
+               "speedup": round(fresh_secs / shared_secs, 2) if shared_secs else None}
+    print(results)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    pdfminer_context_main(sys.argv[1:])
@@ -1,5 +1,5 @@
+from pdfBackends import TIKA, extract
 
-from tika import parser
-
-raw = parser.from_file('sample.pdf')
-print(raw['content'])
+# uses a local backend as a stand-in if NO Tika server is running
+pages = extract('sample.pdf', TIKA)
+print("".join(pages))
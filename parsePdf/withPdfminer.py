@@ -1,27 +1,40 @@
 
 # This works in python 3
 # required python packages
-# tabula-py==1.0.0
 # PyPDF2==1.26.0
 # Pillow==4.0.0
 # pdfminer.six==20170720
 
 import os
 import shutil
+import struct
 import warnings
-from io import StringIO
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 
 import requests
-import tabula
 from PIL import Image
 from PyPDF2 import PdfFileWriter, PdfFileReader
-from pdfminer.converter import TextConverter
-from pdfminer.layout import LAParams
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.pdfpage import PDFPage
+from pdfCache import PdfTextCache
+from pdfTables import MonarchTableExtractor
+from pdfminerContext import PdfminerContext, DEFAULT
 
 warnings.filterwarnings("ignore")
 
+# image streams written to disk as they are
+RAW_IMAGE_SUFFIX = {
+    '/FlateDecode'    : "_Flate.zlib",
+    '/DCTDecode'      : "_DCT.jpg",
+    '/JPXDecode'      : "_JPX.jp2",
+    '/CCITTFaxDecode' : "_CCITT.tiff"
+}
+
+IMAGE_MODES = {
+    '/DeviceRGB'  : "RGB",
+    '/DeviceGray' : "L",
+    '/DeviceCMYK' : "CMYK"
+}
+
 
 def download_file(url):
     local_filename = url.split('/')[-1]
@@ -34,9 +47,27 @@ def download_file(url):
     return local_filename
 
 
+def save_flate_png(data, inflated, mode, size, image_name):
+    """
+    runs in a worker process: decode a Flate image stream and save as png
+    :return: bytes written
+    """
+    if not inflated:
+        data = zlib.decompress(data)
+    img = Image.frombytes(mode, size, data)
+    img.save(image_name)
+    return os.path.getsize(image_name)
+
+
 class PDFExtractor():
-    def __init__(self, url):
+    def __init__(self, url, cache=None, la_preset=DEFAULT):
         self.url = url
+        # repeat extractions of the same pdf content are read from the cache
+        self.cache = PdfTextCache() if cache is None else cache
+        # one pdfminer layout extractor for all the tables -- NO JVM started for each page as with tabula
+        self.table_extractor = MonarchTableExtractor()
+        # the same pdfminer resource manager, converter and interpreter for all the pages
+        self.pdfminer_context = PdfminerContext(la_preset)
 
     # Downloading File in local
     def break_pdf(self, filename, start_page=-1, end_page=-1):
@@ -73,28 +104,14 @@ class PDFExtractor():
         text = text.replace("\n", "").replace("\t", "")
         return text
 
+    def extract_pages_algo_2(self, file):
+        # keep the text of each page separately
+        return self.pdfminer_context.extract_pages(file)
+
     def extract_text_algo_2(self, file):
-        pdfResourceManager = PDFResourceManager()
-        retstr = StringIO()
-        la_params = LAParams()
-        device = TextConverter(pdfResourceManager, retstr, codec='utf-8', laparams=la_params)
-        fp = open(file, 'rb')
-        interpreter = PDFPageInterpreter(pdfResourceManager, device)
-        password = ""
-        max_pages = 0
-        caching = True
-        page_num = set()
-
-        for page in PDFPage.get_pages(fp, page_num, maxpages=max_pages, password=password, caching=caching,
-                                      check_extractable=True):
-            interpreter.process_page(page)
-
-        text = retstr.getvalue()
+        pages = self.cache.extract(file, 'pdfminer', self.extract_pages_algo_2, self.pdfminer_context.get_settings())
+        text = "".join(pages)
         text = text.replace("\t", "").replace("\n", "")
-
-        fp.close()
-        device.close()
-        retstr.close()
         return text
 
     def extract_text(self, file):
@@ -108,15 +125,16 @@ class PDFExtractor():
 
     def extarct_table(self, file):
 
-        # Read pdf into DataFrame
+        # Read the transaction table rows as Monarch trade records
         try:
-            df = tabula.read_pdf(file, output_format="csv")
-        except:
-            print("Error Reading Table")
+            trades = self.table_extractor.extract_trades(file)
+        except Exception as ete:
+            print("Error Reading Table: {}".format(repr(ete)))
             return
 
-        print("\nPrinting Table Content: \n", df)
+        print("\nPrinting Table Content: \n", trades)
         print("\nDone Printing Table Content\n")
+        return trades
 
     def tiff_header_for_CCITT(self, width, height, img_size, CCITT_group=4):
         tiff_header_struct = '<' + '2s' + 'h' + 'l' + 'h' + 'hhll' * 8 + 'h'
@@ -136,76 +154,81 @@ class PDFExtractor():
                            0  # last IFD
                            )
 
-    def extract_image(self, filename):
+    def extract_image(self, filename, png=False, workers=None):
+        """
+        Write each image stream of the pdf to a file: DCT, JPX and CCITT streams are written raw, without decoding.
+        Flate streams are also written raw unless png is requested, then they are decoded in a pool of workers.
+        :return: list with the image count, bytes written and errors for each page
+        """
+        report = []
+        pending = []
         number = 1
-        pdf_reader = PdfFileReader(open(filename, 'rb'))
-
-        for i in range(0, pdf_reader.numPages):
-
-            page = pdf_reader.getPage(i)
-
-            try:
-                xObject = page['/Resources']['/XObject'].getObject()
-            except:
-                print("No XObject Found")
-                return
+        with open(filename, 'rb') as pdf_file, ProcessPoolExecutor(max_workers=workers) as executor:
+            pdf_reader = PdfFileReader(pdf_file)
 
-            for obj in xObject:
+            for i in range(0, pdf_reader.numPages):
+                page_info = {"page": i + 1, "images": 0, "bytes": 0, "errors": []}
+                report.append(page_info)
 
-                try:
+                page = pdf_reader.getPage(i)
+                resources = page['/Resources'] if '/Resources' in page else {}
+                if '/XObject' not in resources:
+                    continue
+                xObject = resources['/XObject'].getObject()
 
-                    if xObject[obj]['/Subtype'] == '/Image':
-                        size = (xObject[obj]['/Width'], xObject[obj]['/Height'])
-                        data = xObject[obj]._data
-                        if xObject[obj]['/ColorSpace'] == '/DeviceRGB':
-                            mode = "RGB"
-                        else:
-                            mode = "P"
+                for obj in xObject:
+                    try:
+                        image = xObject[obj].getObject()
+                        if image.get('/Subtype') != '/Image':
+                            continue
 
                         image_name = filename.split(".")[0] + str(number)
-
-                        print(xObject[obj]['/Filter'])
-
-                        if xObject[obj]['/Filter'] == '/FlateDecode':
-                            data = xObject[obj].getData()
-                            img = Image.frombytes(mode, size, data)
-                            img.save(image_name + "_Flate.png")
-                            # save_to_s3(imagename + "_Flate.png")
-                            print("Image_Saved")
-
-                            number += 1
-                        elif xObject[obj]['/Filter'] == '/DCTDecode':
-                            img = open(image_name + "_DCT.jpg", "wb")
-                            img.write(data)
-                            # save_to_s3(imagename + "_DCT.jpg")
-                            img.close()
-                            number += 1
-                        elif xObject[obj]['/Filter'] == '/JPXDecode':
-                            img = open(image_name + "_JPX.jp2", "wb")
-                            img.write(data)
-                            # save_to_s3(imagename + "_JPX.jp2")
-                            img.close()
-                            number += 1
-                        elif xObject[obj]['/Filter'] == '/CCITTFaxDecode':
-                            if xObject[obj]['/DecodeParms']['/K'] == -1:
-                                CCITT_group = 4
+                        img_filter = image['/Filter'] if '/Filter' in image else None
+                        if isinstance(img_filter, list):
+                            # only a single filter can be written out without decoding
+                            img_filter = img_filter[0] if len(img_filter) == 1 else None
+                        data = image._data
+
+                        if img_filter == '/FlateDecode' and png:
+                            size = (image['/Width'], image['/Height'])
+                            mode = IMAGE_MODES.get(image['/ColorSpace'] if '/ColorSpace' in image else None, "P")
+                            # a predictor needs the full PyPDF2 decoding, otherwise the worker just inflates the raw stream
+                            if '/DecodeParms' in image:
+                                data, inflated = image.getData(), True
                             else:
-                                CCITT_group = 3
-                            width = xObject[obj]['/Width']
-                            height = xObject[obj]['/Height']
-                            data = xObject[obj]._data  # sorry, getData() does not work for CCITTFaxDecode
-                            img_size = len(data)
-                            tiff_header = self.tiff_header_for_CCITT(width, height, img_size, CCITT_group)
-                            img_name = image_name + '_CCITT.tiff'
-                            with open(img_name, 'wb') as img_file:
-                                img_file.write(tiff_header + data)
-
-                            # save_to_s3(img_name)
-                            number += 1
-                except:
-                    continue
-
-        return number
+                                inflated = False
+                            pending.append((page_info, executor.submit(save_flate_png, data, inflated, mode, size,
+                                                                       image_name + "_Flate.png")))
+                        elif img_filter in RAW_IMAGE_SUFFIX:
+                            header = b''
+                            if img_filter == '/CCITTFaxDecode':
+                                CCITT_group = 4 if image['/DecodeParms']['/K'] == -1 else 3
+                                header = self.tiff_header_for_CCITT(image['/Width'], image['/Height'], len(data),
+                                                                    CCITT_group)
+                            with open(image_name + RAW_IMAGE_SUFFIX[img_filter], 'wb') as img_file:
+                                img_file.write(header)
+                                img_file.write(data)
+                            page_info["bytes"] += len(header) + len(data)
+                        else:
+                            page_info["errors"].append("{}: unsupported filter {}".format(obj, img_filter))
+                            continue
+                        page_info["images"] += 1
+                        number += 1
+                    except Exception as eie:
+                        page_info["errors"].append("{}: {}".format(obj, repr(eie)))
+
+            for page_info, future in pending:
+                try:
+                    page_info["bytes"] += future.result()
+                except Exception as fie:
+                    page_info["images"] -= 1
+                    page_info["errors"].append(repr(fie))
+
+        for page_info in report:
+            print("page {page}: {images} images, {bytes} bytes".format(**page_info))
+            for err in page_info["errors"]:
+                print("    ERROR: {}".format(err))
+        return report
 
     def read_pages(self, start_page=-1, end_page=-1):
 